@@ -3,6 +3,9 @@ alerts_automation.py
 
 This module handles real-time notifications for predefined thresholds.
 It triggers alerts for warehouse managers when metrics exceed critical values.
+Thresholds are evaluated vectorized over the whole frame, repeated alerts for the same warehouse
+are suppressed during a cooldown period, and emails are sent as per-recipient digests over one
+persistent SMTP session from a background queue.
 Author: Satej
 """
 
@@ -10,6 +13,14 @@ import smtplib  # For sending email notifications
 from email.mime.text import MIMEText  # For email message formatting
 from email.mime.multipart import MIMEMultipart  # For multi-part email formatting
 import pandas as pd  # For handling data
+import os  # For handling the cooldown state file
+import json  # For persisting the cooldown state
+import time  # For cooldown timestamps
+import queue  # For the asynchronous send queue
+import threading  # For the background sender
+import atexit  # For flushing pending alerts on exit
+import dashboard_setup  # For reading the partitioned dashboard export
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
 
 # SMTP configuration for email alerts
 SMTP_SERVER = "smtp.gmail.com"
@@ -17,6 +28,21 @@ SMTP_PORT = 587
 EMAIL_ADDRESS = "satej@example.com"  # Replace with your email
 EMAIL_PASSWORD = "your_password"  # Replace with your password
 
+# Default alert thresholds, overridable per warehouse
+LOW_INVENTORY_THRESHOLD = 100
+HIGH_UTILIZATION_THRESHOLD = 90  # In percentage
+THRESHOLDS_CONFIG_PATH = "/home/satej/config/alert_thresholds.json"
+WAREHOUSE_THRESHOLDS = {}  # Warehouse ID -> {"low_inventory": value, "high_utilization": value}
+
+# Alert recipients
+ALERT_RECIPIENTS = ["manager@satejwarehouse.com"]
+WAREHOUSE_RECIPIENTS = {}  # Warehouse ID -> recipient list, overriding ALERT_RECIPIENTS
+
+# Deduplication and batching
+ALERT_COOLDOWN_SECONDS = 6 * 60 * 60
+ALERT_STATE_PATH = "/home/satej/data/state/alert_cooldowns.json"
+ALERT_BATCH_WINDOW_SECONDS = 2
+
 def send_email_alert(subject, message, recipients):
     """
     Sends an email alert to the specified recipients.
@@ -47,48 +73,390 @@ def send_email_alert(subject, message, recipients):
     except Exception as e:
         print(f"Error sending email alert: {e}")
 
-def check_thresholds_and_alerts(df):
+def load_thresholds(path=THRESHOLDS_CONFIG_PATH):
+    """
+    Loads per-warehouse threshold overrides from a JSON file.
+
+    The file maps warehouse IDs to {"low_inventory": value, "high_utilization": value};
+    either key may be omitted to keep the default for that warehouse.
+
+    Args:
+        path (str): Path of the threshold configuration file.
+
+    Returns:
+        dict: Per-warehouse thresholds, or WAREHOUSE_THRESHOLDS if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return WAREHOUSE_THRESHOLDS
+    with open(path) as f:
+        return json.load(f)
+
+def _threshold_series(warehouse_ids, thresholds, key, default):
+    """
+    Resolves one threshold for every row, falling back to the default.
+
+    Args:
+        warehouse_ids (pd.Series): Warehouse ID per row.
+        thresholds (dict): Per-warehouse thresholds.
+        key (str): Threshold name.
+        default (float): Value for warehouses without an override.
+
+    Returns:
+        pd.Series: Threshold per row.
+    """
+    overrides = {str(warehouse): limits[key] for warehouse, limits in thresholds.items() if key in limits}
+    return warehouse_ids.map(overrides).astype(float).fillna(default)
+
+@instrument
+def evaluate_thresholds(df, thresholds=None, low_inventory_threshold=LOW_INVENTORY_THRESHOLD,
+                        high_utilization_threshold=HIGH_UTILIZATION_THRESHOLD):
+    """
+    Evaluates all thresholds with vectorized comparisons.
+
+    Args:
+        df (pd.DataFrame): Dashboard data with 'Warehouse ID', 'Total Inventory' and
+            'inventory_utilization' columns.
+        thresholds (dict, optional): Per-warehouse overrides. Defaults to WAREHOUSE_THRESHOLDS.
+        low_inventory_threshold (float): Default inventory level below which an alert is raised.
+        high_utilization_threshold (float): Default utilization percentage above which an alert is raised.
+
+    Returns:
+        pd.DataFrame: One row per breach with warehouse_id, alert_type, value and message columns.
+    """
+    thresholds = WAREHOUSE_THRESHOLDS if thresholds is None else thresholds
+    warehouse_ids = df['Warehouse ID'].astype(str)
+    low_inventory_limits = _threshold_series(warehouse_ids, thresholds, "low_inventory", low_inventory_threshold)
+    high_utilization_limits = _threshold_series(warehouse_ids, thresholds, "high_utilization", high_utilization_threshold)
+
+    low = df['Total Inventory'] < low_inventory_limits
+    low_inventory = pd.DataFrame({
+        'warehouse_id': warehouse_ids[low],
+        'alert_type': "Low Inventory",
+        'value': df.loc[low, 'Total Inventory']
+    })
+    low_inventory['message'] = (
+        "Alert: Inventory in Warehouse " + low_inventory['warehouse_id']
+        + " is critically low at " + low_inventory['value'].astype(str) + " units."
+    )
+
+    high = df['inventory_utilization'] > high_utilization_limits
+    high_utilization = pd.DataFrame({
+        'warehouse_id': warehouse_ids[high],
+        'alert_type': "High Utilization",
+        'value': df.loc[high, 'inventory_utilization']
+    })
+    high_utilization['message'] = (
+        "Alert: Warehouse " + high_utilization['warehouse_id']
+        + " has high storage utilization at " + high_utilization['value'].astype(str) + "%."
+    )
+
+    return pd.concat([low_inventory, high_utilization], ignore_index=True)
+
+class AlertCooldownStore:
+    """
+    Remembers when each (warehouse, alert type) was last alerted, so the same warehouse is not
+    re-alerted on every run.
+
+    Args:
+        path (str): JSON file persisting the last alert times.
+        cooldown_seconds (float): Minimum time between two alerts of the same kind for a warehouse.
+    """
+
+    def __init__(self, path=ALERT_STATE_PATH, cooldown_seconds=ALERT_COOLDOWN_SECONDS):
+        self.path = path
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._last_alerted = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._last_alerted = json.load(f)
+
+    @staticmethod
+    def _keys(alerts):
+        """Builds the cooldown keys of an alerts frame."""
+        return alerts['warehouse_id'] + "|" + alerts['alert_type']
+
+    def reserve(self, alerts, now=None):
+        """
+        Filters out alerts still in cooldown and marks the remaining ones as alerted.
+
+        Args:
+            alerts (pd.DataFrame): Output of evaluate_thresholds.
+            now (float, optional): Current epoch time.
+
+        Returns:
+            pd.DataFrame: Alerts that should be sent.
+        """
+        now = time.time() if now is None else now
+        alerts = alerts.drop_duplicates(subset=['warehouse_id', 'alert_type'], keep='last')
+        keys = self._keys(alerts)
+        with self._lock:
+            last_alerted = keys.map(self._last_alerted).astype(float).fillna(float("-inf"))
+            due = (now - last_alerted) >= self.cooldown_seconds
+            self._last_alerted.update(dict.fromkeys(keys[due], now))
+            self._save()
+        return alerts[due]
+
+    def release(self, alerts):
+        """
+        Clears the cooldown of alerts that could not be delivered, so the next run retries them.
+
+        Args:
+            alerts (pd.DataFrame): Alerts whose delivery failed.
+        """
+        with self._lock:
+            for key in self._keys(alerts):
+                self._last_alerted.pop(key, None)
+            self._save()
+
+    def _save(self):
+        """Persists the cooldown state atomically. Caller holds the lock."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self._last_alerted, f)
+        os.replace(temp_path, self.path)
+
+class AlertDispatcher:
+    """
+    Sends alerts from a background queue as per-recipient digests over one persistent SMTP session.
+
+    Alerts submitted within ALERT_BATCH_WINDOW_SECONDS of each other are combined, so a morning
+    with hundreds of breaches produces one email per recipient rather than one per warehouse.
+
+    Args:
+        smtp_server (str): SMTP host.
+        smtp_port (int): SMTP port.
+        username (str, optional): Login user; no login when None.
+        password (str, optional): Login password.
+        use_starttls (bool): Upgrade the session with STARTTLS.
+        cooldown_store (AlertCooldownStore, optional): Store used to release failed alerts.
+        batch_window_seconds (float): How long to wait for more alerts before sending a digest.
+    """
+
+    _STOP = object()
+
+    def __init__(self, smtp_server=SMTP_SERVER, smtp_port=SMTP_PORT, username=EMAIL_ADDRESS,
+                 password=EMAIL_PASSWORD, use_starttls=True, cooldown_store=None,
+                 batch_window_seconds=ALERT_BATCH_WINDOW_SECONDS):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.username = username
+        self.password = password
+        self.use_starttls = use_starttls
+        self.cooldown_store = cooldown_store
+        self.batch_window_seconds = batch_window_seconds
+
+        self._queue = queue.Queue()
+        self._session = None
+        self._worker = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, alerts):
+        """
+        Queues alerts for delivery without waiting for the mail server.
+
+        Args:
+            alerts (pd.DataFrame): Alerts with warehouse_id, alert_type and message columns.
+        """
+        if not alerts.empty:
+            self._queue.put(alerts)
+
+    def close(self):
+        """
+        Sends everything still queued, then closes the SMTP session.
+        """
+        if self._worker.is_alive():
+            self._queue.put(self._STOP)
+            self._worker.join()
+
+    def _open_session(self):
+        """Opens and authenticates a new SMTP session."""
+        session = smtplib.SMTP(self.smtp_server, self.smtp_port)
+        if self.use_starttls:
+            session.starttls()
+        if self.username:
+            session.login(self.username, self.password)
+        return session
+
+    def _get_session(self):
+        """Returns the open SMTP session, reconnecting if the server dropped it."""
+        if self._session is not None:
+            try:
+                if self._session.noop()[0] == 250:
+                    return self._session
+            except smtplib.SMTPException:
+                pass
+            self._close_session()
+        self._session = self._open_session()
+        return self._session
+
+    def _close_session(self):
+        """Closes the SMTP session if one is open."""
+        if self._session is not None:
+            try:
+                self._session.quit()
+            except smtplib.SMTPException:
+                pass
+            self._session = None
+
+    def _send_digest(self, recipient, alerts):
+        """
+        Sends one digest email listing all alerts for a recipient.
+
+        Args:
+            recipient (str): Email address.
+            alerts (pd.DataFrame): Alerts for that recipient.
+        """
+        msg = MIMEMultipart()
+        msg['From'] = self.username or EMAIL_ADDRESS
+        msg['To'] = recipient
+        msg['Subject'] = f"Warehouse Alerts: {len(alerts)} new alert(s)"
+
+        sections = [
+            f"{alert_type} ({len(group)}):\n" + "\n".join(group['message'])
+            for alert_type, group in alerts.groupby('alert_type', sort=True)
+        ]
+        msg.attach(MIMEText("\n\n".join(sections), 'plain'))
+
+        try:
+            self._get_session().send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._close_session()
+            self._get_session().send_message(msg)
+
+    @instrument
+    def _dispatch(self, alerts):
+        """
+        Groups a batch of alerts by recipient and sends one digest each.
+
+        Alerts no recipient received are released from the cooldown, so the next run retries them.
+        Alerts at least one recipient received stay in cooldown, so they are not sent to that
+        recipient a second time.
+
+        Args:
+            alerts (pd.DataFrame): Batch of alerts.
+        """
+        recipients = alerts['warehouse_id'].map(lambda warehouse: WAREHOUSE_RECIPIENTS.get(warehouse, ALERT_RECIPIENTS))
+        by_recipient = alerts.assign(recipient=recipients).explode('recipient')
+
+        delivered, undelivered = [], []
+        for recipient, recipient_alerts in by_recipient.groupby('recipient', sort=True):
+            try:
+                self._send_digest(recipient, recipient_alerts)
+                delivered.append(recipient_alerts)
+                print(f"Alert digest with {len(recipient_alerts)} alert(s) sent to: {recipient}")
+            except Exception as e:
+                print(f"Error sending alert digest to {recipient}: {e}")
+                undelivered.append(recipient_alerts)
+
+        if undelivered and self.cooldown_store is not None:
+            undelivered = pd.concat(undelivered, ignore_index=True)
+            if delivered:
+                delivered_keys = AlertCooldownStore._keys(pd.concat(delivered, ignore_index=True))
+                undelivered = undelivered[~AlertCooldownStore._keys(undelivered).isin(delivered_keys)]
+            self.cooldown_store.release(undelivered)
+
+    def _release(self, batch):
+        """
+        Clears the cooldown of every alert in a batch that could not be dispatched.
+
+        Args:
+            batch (list): Alert frames as submitted.
+        """
+        if self.cooldown_store is None:
+            return
+        for alerts in batch:
+            try:
+                self.cooldown_store.release(alerts)
+            except Exception as e:
+                print(f"Error releasing the cooldown of undelivered alerts: {e}")
+
+    def _run(self):
+        """Worker loop: collects alerts for a batch window, then sends them as digests."""
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            if batch[0] is self._STOP:
+                break
+            deadline = time.monotonic() + self.batch_window_seconds
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            # A failing batch must not end the worker, or every later alert would be queued and never sent
+            try:
+                self._dispatch(pd.concat(batch, ignore_index=True))
+            except Exception as e:
+                print(f"Error dispatching a batch of {len(batch)} alert submission(s): {e}")
+                self._release(batch)
+        self._close_session()
+
+_default_dispatcher = None
+_default_cooldown_store = None
+_default_lock = threading.Lock()
+
+def get_default_dispatcher():
+    """
+    Returns the process-wide dispatcher and cooldown store, starting them on first use.
+
+    Returns:
+        tuple: (AlertDispatcher, AlertCooldownStore).
+    """
+    global _default_dispatcher, _default_cooldown_store
+    with _default_lock:
+        if _default_dispatcher is None:
+            _default_cooldown_store = AlertCooldownStore()
+            _default_dispatcher = AlertDispatcher(cooldown_store=_default_cooldown_store)
+            atexit.register(_default_dispatcher.close)
+        return _default_dispatcher, _default_cooldown_store
+
+@instrument
+def check_thresholds_and_alerts(df, dispatcher=None, cooldown_store=None, thresholds=None):
     """
     Checks if any metrics exceed predefined thresholds and triggers alerts.
 
+    Alerts still in cooldown are dropped, and the rest are queued on the dispatcher, so this
+    function returns without waiting for the mail server.
+
     Args:
         df (pd.DataFrame): DataFrame containing metrics to evaluate.
+        dispatcher (AlertDispatcher, optional): Dispatcher to queue alerts on. Defaults to the
+            process-wide dispatcher.
+        cooldown_store (AlertCooldownStore, optional): Deduplication store. Defaults to the
+            process-wide store.
+        thresholds (dict, optional): Per-warehouse overrides. Defaults to the configured thresholds.
+
+    Returns:
+        pd.DataFrame: Alerts queued for delivery.
     """
     try:
-        # Example thresholds
-        LOW_INVENTORY_THRESHOLD = 100
-        HIGH_UTILIZATION_THRESHOLD = 90  # In percentage
-
-        # Filter rows with critical conditions
-        low_inventory = df[df['Total Inventory'] < LOW_INVENTORY_THRESHOLD]
-        high_utilization = df[df['inventory_utilization'] > HIGH_UTILIZATION_THRESHOLD]
-
-        # Trigger alerts for low inventory
-        for _, row in low_inventory.iterrows():
-            message = f"Alert: Inventory in Warehouse {row['Warehouse ID']} is critically low at {row['Total Inventory']} units."
-            send_email_alert(
-                subject="Low Inventory Alert",
-                message=message,
-                recipients=["manager@satejwarehouse.com"]
-            )
-
-        # Trigger alerts for high storage utilization
-        for _, row in high_utilization.iterrows():
-            message = f"Alert: Warehouse {row['Warehouse ID']} has high storage utilization at {row['inventory_utilization']}%."
-            send_email_alert(
-                subject="High Utilization Alert",
-                message=message,
-                recipients=["manager@satejwarehouse.com"]
-            )
-
-        print("Threshold checks and alerts completed.")
+        if dispatcher is None or cooldown_store is None:
+            default_dispatcher, default_store = get_default_dispatcher()
+            dispatcher = dispatcher or default_dispatcher
+            cooldown_store = cooldown_store or default_store
+
+        thresholds = load_thresholds() if thresholds is None else thresholds
+        alerts = cooldown_store.reserve(evaluate_thresholds(df, thresholds))
+        dispatcher.submit(alerts)
+
+        print(f"Threshold checks and alerts completed. {len(alerts)} alert(s) queued.")
+        return alerts
     except Exception as e:
         print(f"Error during threshold checks and alerts: {e}")
+        return pd.DataFrame()
 
 if __name__ == "__main__":
     # Example usage
-    dashboard_data_path = "/home/satej/data/dashboard_ready_data.csv"
-    dashboard_data = pd.read_csv(dashboard_data_path)
+    # Read only the partitions covering the last week instead of the whole export
+    dashboard_data = dashboard_setup.read_dashboard_data(start_date=pd.Timestamp.today().normalize() - pd.Timedelta(days=7))
 
     # Perform threshold checks and send alerts
     check_thresholds_and_alerts(dashboard_data)
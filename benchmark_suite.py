@@ -0,0 +1,383 @@
+"""
+benchmark_suite.py
+
+This module benchmarks the pipeline stages on reproducible synthetic data.
+A seeded generator produces Inventory, Orders, IoT sensor files and KPI inputs scaled by warehouse
+count, products and days. Every stage is timed at several data sizes, with throughput and peak
+memory recorded, and results are compared against a stored baseline so regressions are flagged.
+Author: Satej
+"""
+
+import os  # For handling benchmark files
+import sys  # For the exit status on regressions
+import json  # For the stored baseline
+import math  # For sizing the synthetic data
+import time  # For stage timings
+import platform  # For the environment fingerprint
+import shutil  # For removing scratch directories
+import tempfile  # For scratch directories
+import tracemalloc  # For peak memory per stage
+import numpy as np  # For vectorized data generation
+import pandas as pd  # For handling data
+import data_transformation  # Stages under benchmark
+import kpi_analysis
+import alerts_automation
+import iot_ingestion
+
+# Benchmark sizes in raw rows; LARGE_BENCHMARK_SIZES need tens of GB of memory
+BENCHMARK_SIZES = [10 ** 4, 10 ** 5, 10 ** 6]
+LARGE_BENCHMARK_SIZES = [10 ** 7, 10 ** 8]
+BENCHMARK_REPEATS = 3
+BENCHMARK_SEED = 42
+
+# Shape of the synthetic data
+BENCHMARK_PRODUCTS = 100
+BENCHMARK_MAX_DAYS = 365
+BENCHMARK_IOT_FILES = 32
+BENCHMARK_IOT_FRACTION = 0.1  # IoT readings generated per raw row
+
+# Baseline location and regression tolerances (fractional slowdown or memory growth)
+BENCHMARK_BASELINE_PATH = "/home/satej/benchmarks/baseline.json"
+TIME_REGRESSION_TOLERANCE = 0.2
+MEMORY_REGRESSION_TOLERANCE = 0.2
+
+def scale_for_rows(rows, products=BENCHMARK_PRODUCTS, max_days=BENCHMARK_MAX_DAYS):
+    """
+    Chooses warehouse count, products and days so inventory and orders together have about `rows` rows.
+
+    Args:
+        rows (int): Target number of raw rows.
+        products (int): Products per warehouse.
+        max_days (int): Upper bound on the number of days.
+
+    Returns:
+        dict: 'warehouses', 'products' and 'days'.
+    """
+    per_source = max(rows // 2, 1)
+    days = int(min(max_days, max(10, per_source // 1000)))
+    warehouses = max(1, math.ceil(per_source / (days * products)))
+    return {"warehouses": warehouses, "products": products, "days": days}
+
+def _ids(prefix, count):
+    """
+    Builds zero-padded IDs such as W0001.
+
+    Args:
+        prefix (str): ID prefix.
+        count (int): Number of IDs.
+
+    Returns:
+        np.ndarray: Object array of IDs.
+    """
+    width = max(len(str(count)), 4)
+    return np.array([f"{prefix}{i:0{width}d}" for i in range(1, count + 1)], dtype=object)
+
+def generate_warehouse_data(warehouses, products, days, seed=BENCHMARK_SEED, start_date="2024-01-01",
+                            missing_fraction=0.01):
+    """
+    Generates reproducible synthetic warehouse data.
+
+    Inventory has one row per (warehouse, product, day); orders have the same grain with an
+    order value. A small fraction of measures and IDs is missing so the cleaning rules do work.
+
+    Args:
+        warehouses (int): Number of warehouses.
+        products (int): Products per warehouse.
+        days (int): Number of consecutive days.
+        seed (int): Random seed; the same arguments always produce the same data.
+        start_date (str): First day.
+        missing_fraction (float): Fraction of measure values set to NaN.
+
+    Returns:
+        dict: 'inventory', 'orders', 'iot' and 'kpi_inputs' DataFrames, and 'storage_capacity'
+            per warehouse.
+    """
+    rng = np.random.default_rng(seed)
+    warehouse_ids = _ids("W", warehouses)
+    product_ids = _ids("P", products)
+    dates = pd.date_range(start_date, periods=days, freq="D").to_numpy()
+
+    rows = warehouses * products * days
+    warehouse_codes = np.repeat(np.arange(warehouses), products * days)
+    product_codes = np.tile(np.repeat(np.arange(products), days), warehouses)
+    date_codes = np.tile(np.arange(days), warehouses * products)
+
+    def frame(measures):
+        df = pd.DataFrame({
+            "warehouse_id": warehouse_ids[warehouse_codes],
+            "product_id": product_ids[product_codes],
+            "date": dates[date_codes],
+            **measures
+        })
+        for column in measures:
+            df.loc[rng.random(rows) < missing_fraction, column] = np.nan
+        df.loc[rng.random(rows) < missing_fraction / 10, "warehouse_id"] = None
+        return df
+
+    inventory = frame({"quantity": rng.integers(0, 1000, rows).astype("float64")})
+    orders = frame({
+        "quantity": rng.integers(1, 50, rows).astype("float64"),
+        "order_value": rng.gamma(2.0, 40.0, rows).round(2)
+    })
+
+    iot_rows = max(int(rows * BENCHMARK_IOT_FRACTION), 1)
+    iot = pd.DataFrame({
+        "sensor_id": _ids("S", warehouses * 4)[rng.integers(0, warehouses * 4, iot_rows)],
+        "warehouse_id": warehouse_ids[rng.integers(0, warehouses, iot_rows)],
+        "product_id": product_ids[rng.integers(0, products, iot_rows)],
+        "date": pd.DatetimeIndex(dates[rng.integers(0, days, iot_rows)]).strftime("%Y-%m-%d"),
+        "quantity": rng.integers(0, 1000, iot_rows).astype("float64"),
+        "temperature": rng.normal(18, 3, iot_rows).astype("float32"),
+        "humidity": rng.uniform(30, 70, iot_rows).astype("float32")
+    })
+
+    kpi_rows = warehouses * days
+    total_space = np.repeat(rng.integers(50000, 200000, warehouses), days).astype("float64")
+    total_orders = rng.integers(100, 1000, kpi_rows).astype("float64")
+    kpi_inputs = pd.DataFrame({
+        "warehouse_id": np.repeat(warehouse_ids, days),
+        "date": np.tile(dates, warehouses),
+        "cost_of_goods_sold": rng.gamma(5.0, 2000.0, kpi_rows).round(2),
+        "average_inventory": rng.gamma(10.0, 500.0, kpi_rows).round(2),
+        "correct_orders": np.floor(total_orders * rng.uniform(0.9, 1.0, kpi_rows)),
+        "total_orders": total_orders,
+        "used_space": np.floor(total_space * rng.uniform(0.3, 1.0, kpi_rows)),
+        "total_space": total_space
+    })
+
+    storage_capacity = pd.Series(rng.integers(products * 500, products * 1000, warehouses).astype("float64"),
+                                 index=warehouse_ids)
+    return {"inventory": inventory, "orders": orders, "iot": iot, "kpi_inputs": kpi_inputs,
+            "storage_capacity": storage_capacity}
+
+def write_iot_files(readings, directory, files=BENCHMARK_IOT_FILES):
+    """
+    Writes IoT readings as sensor CSV files, as they arrive in the IoT directory.
+
+    Args:
+        readings (pd.DataFrame): IoT readings from generate_warehouse_data.
+        directory (str): Destination directory.
+        files (int): Number of files to split the readings into.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i, part in enumerate(np.array_split(np.arange(len(readings)), files)):
+        path = os.path.join(directory, f"sensor_{i:04d}.csv")
+        readings.iloc[part].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+class _DiscardingDispatcher:
+    """
+    Alert sink that drops alerts, so the benchmark measures evaluation and not the mail server.
+    """
+
+    def submit(self, alerts):
+        pass
+
+def _measure(function, repeats, measure_memory):
+    """
+    Times a stage and optionally measures its peak memory.
+
+    The time is the best of `repeats` runs; peak memory comes from one extra run under
+    tracemalloc, so tracing does not distort the timings.
+
+    Args:
+        function (callable): Stage to run, taking no arguments.
+        repeats (int): Number of timed runs.
+        measure_memory (bool): Whether to measure peak memory.
+
+    Returns:
+        tuple: (float, int) best seconds and peak bytes allocated (None when not measured).
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    peak_bytes = None
+    if measure_memory:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        if not was_tracing:
+            tracemalloc.stop()
+    return min(timings), peak_bytes
+
+def benchmark_size(rows, repeats=BENCHMARK_REPEATS, seed=BENCHMARK_SEED, measure_memory=True, include_iot=True):
+    """
+    Benchmarks every stage at one data size.
+
+    Args:
+        rows (int): Target number of raw rows.
+        repeats (int): Timed runs per stage.
+        seed (int): Random seed of the synthetic data.
+        measure_memory (bool): Whether to measure peak memory per stage.
+        include_iot (bool): Whether to benchmark IoT ingestion, which writes sensor files to a scratch
+            directory. Its CSV parsing runs in worker processes, so its peak memory covers the parent only.
+
+    Returns:
+        list: One result dict per stage.
+    """
+    shape = scale_for_rows(rows)
+    data = generate_warehouse_data(seed=seed, **shape)
+    raw = pd.concat([data["inventory"], data["orders"]], ignore_index=True)
+
+    # Inputs of the later stages come from the earlier stages, as in the pipeline
+    cleaned = data_transformation.clean_data(raw)
+    transformed = data_transformation.transform_data(cleaned)
+    capacity = transformed["warehouse_id"].astype(str).map(data["storage_capacity"])
+    dashboard = pd.DataFrame({
+        "Warehouse ID": transformed["warehouse_id"],
+        "Total Inventory": transformed["total_quantity"],
+        "inventory_utilization": transformed["total_quantity"] / capacity * 100
+    })
+    dispatcher = _DiscardingDispatcher()
+
+    stages = {
+        "clean_data": (len(raw), lambda: data_transformation.clean_data(raw)),
+        "transform_data": (len(cleaned), lambda: data_transformation.transform_data(cleaned)),
+        "calculate_all_kpis": (len(data["kpi_inputs"]), lambda: kpi_analysis.calculate_all_kpis(data["kpi_inputs"])),
+        "check_thresholds_and_alerts": (len(dashboard), lambda: alerts_automation.check_thresholds_and_alerts(
+            dashboard, dispatcher, alerts_automation.AlertCooldownStore(path=None, cooldown_seconds=0), thresholds={}))
+    }
+
+    scratch = tempfile.mkdtemp(prefix="benchmark_")
+    if include_iot:
+        iot_path = os.path.join(scratch, "iot")
+        write_iot_files(data["iot"], iot_path)
+        # A fresh cache directory per run, so every run parses the files
+        stages["ingest_iot_data"] = (len(data["iot"]), lambda: iot_ingestion.ingest_iot_data(
+            iot_path, cache_path=tempfile.mkdtemp(dir=scratch)))
+
+    results = []
+    try:
+        for stage, (stage_rows, function) in stages.items():
+            seconds, peak_bytes = _measure(function, repeats, measure_memory)
+            results.append({
+                "stage": stage, "size": rows, "rows": stage_rows, "seconds": seconds,
+                "rows_per_second": stage_rows / seconds if seconds else None, "peak_bytes": peak_bytes,
+                **shape
+            })
+            print(f"Benchmarked {stage} at {rows:,} rows: {seconds:.4f} s")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+def environment_fingerprint():
+    """
+    Describes the machine and library versions the benchmark ran on.
+
+    Returns:
+        dict: Platform, CPU count and versions.
+    """
+    return {
+        "platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+        "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__
+    }
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, repeats=BENCHMARK_REPEATS, seed=BENCHMARK_SEED, measure_memory=True,
+                   include_iot=True):
+    """
+    Benchmarks every stage at every size.
+
+    Args:
+        sizes (list): Target numbers of raw rows.
+        repeats (int): Timed runs per stage.
+        seed (int): Random seed of the synthetic data.
+        measure_memory (bool): Whether to measure peak memory per stage.
+        include_iot (bool): Whether to benchmark IoT ingestion.
+
+    Returns:
+        pd.DataFrame: One row per (stage, size).
+    """
+    results = []
+    for rows in sizes:
+        results.extend(benchmark_size(rows, repeats, seed, measure_memory, include_iot))
+    return pd.DataFrame(results)
+
+def save_baseline(results, path=BENCHMARK_BASELINE_PATH):
+    """
+    Stores benchmark results as the baseline for later comparisons.
+
+    Args:
+        results (pd.DataFrame): Output of run_benchmarks.
+        path (str): Baseline file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {"environment": environment_fingerprint(), "results": results.to_dict(orient="records")}
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    os.replace(temp_path, path)
+    print(f"Benchmark baseline saved to: {path}")
+
+def load_baseline(path=BENCHMARK_BASELINE_PATH):
+    """
+    Loads a stored baseline.
+
+    Args:
+        path (str): Baseline file.
+
+    Returns:
+        dict: {"environment": dict, "results": pd.DataFrame}, or None if there is no baseline.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)
+    return {"environment": baseline["environment"], "results": pd.DataFrame(baseline["results"])}
+
+def compare_to_baseline(results, baseline, time_tolerance=TIME_REGRESSION_TOLERANCE,
+                        memory_tolerance=MEMORY_REGRESSION_TOLERANCE):
+    """
+    Compares benchmark results with a baseline and flags regressions.
+
+    A stage regresses when it is slower than the baseline by more than time_tolerance, or
+    allocates more than memory_tolerance above the baseline peak.
+
+    Args:
+        results (pd.DataFrame): Output of run_benchmarks.
+        baseline (dict): Output of load_baseline.
+        time_tolerance (float): Allowed fractional slowdown.
+        memory_tolerance (float): Allowed fractional memory growth.
+
+    Returns:
+        pd.DataFrame: Results joined with the baseline, with time_ratio, memory_ratio and regression columns.
+    """
+    if baseline["environment"] != environment_fingerprint():
+        print("Warning: the baseline was recorded on a different environment; ratios may not be comparable.")
+
+    previous = baseline["results"][["stage", "size", "seconds", "peak_bytes"]].rename(
+        columns={"seconds": "baseline_seconds", "peak_bytes": "baseline_peak_bytes"})
+    comparison = results.merge(previous, on=["stage", "size"], how="left")
+    comparison["time_ratio"] = comparison["seconds"] / comparison["baseline_seconds"]
+    comparison["memory_ratio"] = comparison["peak_bytes"] / comparison["baseline_peak_bytes"]
+    comparison["regression"] = (
+        (comparison["time_ratio"] > 1 + time_tolerance) | (comparison["memory_ratio"] > 1 + memory_tolerance)
+    )
+
+    for row in comparison[comparison["regression"]].itertuples():
+        print(f"Regression: {row.stage} at {row.size:,} rows is {row.time_ratio:.2f}x the baseline time "
+              f"and {row.memory_ratio:.2f}x the baseline memory.")
+    return comparison
+
+if __name__ == "__main__":
+    # Example usage
+    benchmark_results = run_benchmarks()
+    print(benchmark_results[["stage", "size", "seconds", "rows_per_second", "peak_bytes"]])
+
+    # Compare with the stored baseline, or record one on the first run
+    stored_baseline = load_baseline()
+    if stored_baseline is None:
+        save_baseline(benchmark_results)
+    elif compare_to_baseline(benchmark_results, stored_baseline)["regression"].any():
+        sys.exit(1)
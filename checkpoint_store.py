@@ -0,0 +1,211 @@
+"""
+checkpoint_store.py
+
+This module persists pipeline stage outputs as content-addressed artifacts.
+Each artifact is keyed by a hash of the stage name, the stage code and the content hashes of the
+stage's inputs, so a re-triggered run can reuse every stage whose inputs and code are unchanged
+and resume from the first invalidated stage.
+Author: Satej
+"""
+
+import os  # For handling artifact files
+import json  # For the artifact index
+import time  # For artifact timestamps
+import pickle  # For serializing stage outputs
+import hashlib  # For artifact keys and content hashes
+import inspect  # For hashing stage code
+import threading  # For serializing index updates
+import types  # For finding the modules a stage refers to
+import pandas as pd  # For hashing DataFrames
+
+# Store location and retention
+CHECKPOINT_STORE_PATH = "/home/satej/data/checkpoints/"
+CHECKPOINT_INDEX_FILE = "index.json"
+CHECKPOINT_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+# Bump to invalidate every checkpoint, e.g. after a change in a module a stage does not refer to directly
+CHECKPOINT_CODE_SALT = "1"
+
+def content_hash(value):
+    """
+    Hashes a stage output by content.
+
+    DataFrames are hashed by their values, index, column names and dtypes; tuples, lists and
+    dicts are hashed element by element; anything else by its pickled bytes.
+
+    Args:
+        value: Stage output.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        digest.update(b"frame")
+        digest.update(repr([(str(column), str(dtype)) for column, dtype in value.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, (tuple, list)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            digest.update(content_hash(item).encode())
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=str):
+            digest.update(repr(key).encode())
+            digest.update(content_hash(value[key]).encode())
+    else:
+        digest.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+def code_version(function):
+    """
+    Hashes the code of a stage: its own source and the source files of the modules it refers to by name.
+
+    Args:
+        function (callable): Stage function.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256(CHECKPOINT_CODE_SALT.encode())
+    function = inspect.unwrap(function)
+    try:
+        digest.update(inspect.getsource(function).encode())
+    except (OSError, TypeError):
+        digest.update(getattr(function, "__qualname__", repr(function)).encode())
+
+    code = getattr(function, "__code__", None)
+    module_globals = getattr(function, "__globals__", {})
+    for name in sorted(code.co_names if code else []):
+        module = module_globals.get(name)
+        source_file = getattr(module, "__file__", None) if isinstance(module, types.ModuleType) else None
+        if source_file and source_file.endswith(".py") and "site-packages" not in source_file:
+            with open(source_file, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def stage_key(stage_name, function, input_hashes, run_id=None, run_scoped=False):
+    """
+    Builds the artifact key of a stage.
+
+    Args:
+        stage_name (str): Stage name.
+        function (callable): Stage function.
+        input_hashes (list): Content hashes of the stage inputs, in order.
+        run_id (str, optional): Run identifier.
+        run_scoped (bool): Include run_id in the key, for stages whose output also depends on
+            state outside their inputs (source systems, persisted watermarks). Stages without
+            inputs are always run-scoped.
+
+    Returns:
+        str: Hex digest.
+    """
+    parts = [stage_name, code_version(function)] + list(input_hashes)
+    if run_scoped or not input_hashes:
+        parts.append(f"run:{run_id}")
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+class CheckpointStore:
+    """
+    Local store of stage outputs keyed by stage_key.
+
+    Args:
+        path (str): Store directory.
+    """
+
+    def __init__(self, path=CHECKPOINT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _index_path(self):
+        return os.path.join(self.path, CHECKPOINT_INDEX_FILE)
+
+    def _load_index(self):
+        """Loads the artifact index. Caller holds the lock."""
+        if not os.path.exists(self._index_path()):
+            return {}
+        with open(self._index_path()) as f:
+            return json.load(f)
+
+    def _save_index(self, index):
+        """Saves the artifact index atomically. Caller holds the lock."""
+        temp_path = f"{self._index_path()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self._index_path())
+
+    def get(self, key):
+        """
+        Loads a stored artifact.
+
+        Args:
+            key (str): Artifact key.
+
+        Returns:
+            tuple: (bool, object, str) whether the artifact exists, the stage output and its content hash.
+        """
+        with self._lock:
+            entry = self._load_index().get(key)
+        if entry is None:
+            return False, None, None
+        file_path = os.path.join(self.path, entry["file"])
+        try:
+            with open(file_path, "rb") as f:
+                return True, pickle.load(f), entry["content_hash"]
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Ignoring unreadable checkpoint for stage '{entry['stage']}': {e}")
+            return False, None, None
+
+    def put(self, key, stage_name, output):
+        """
+        Stores a stage output.
+
+        Args:
+            key (str): Artifact key.
+            stage_name (str): Stage name.
+            output: Stage output.
+
+        Returns:
+            str: Content hash of the output.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        output_hash = content_hash(output)
+        file_name = f"{key}.pkl"
+        file_path = os.path.join(self.path, file_name)
+        with open(f"{file_path}.tmp", "wb") as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{file_path}.tmp", file_path)
+
+        with self._lock:
+            index = self._load_index()
+            index[key] = {"stage": stage_name, "file": file_name, "content_hash": output_hash,
+                          "created": time.time(), "size": os.path.getsize(file_path)}
+            self._save_index(index)
+        return output_hash
+
+    def prune(self, max_age_seconds=CHECKPOINT_RETENTION_SECONDS):
+        """
+        Removes artifacts older than max_age_seconds.
+
+        Args:
+            max_age_seconds (float): Retention period.
+
+        Returns:
+            int: Number of artifacts removed.
+        """
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            index = self._load_index()
+            expired = [key for key, entry in index.items() if entry["created"] < cutoff]
+            for key in expired:
+                file_path = os.path.join(self.path, index.pop(key)["file"])
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            if expired:
+                self._save_index(index)
+        return len(expired)
+
+if __name__ == "__main__":
+    # Example usage
+    store = CheckpointStore()
+    print(f"Checkpoints removed: {store.prune()}")
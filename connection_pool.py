@@ -0,0 +1,274 @@
+"""
+connection_pool.py
+
+This module provides per-DSN connection pools shared by the extraction and loading stages.
+Pools are keyed by the DSN and the connection factory, so a different driver for the same DSN
+gets its own pool.
+Connections are reused across calls within a process, checked for health before reuse when they
+have been idle for a while, and evicted once they exceed the maximum idle time.
+Author: Satej
+"""
+
+import re  # For redacting credentials in pool names
+import threading  # For thread-safe pool access
+import time  # For idle tracking
+from contextlib import contextmanager  # For the with-statement API
+
+# Pool defaults
+POOL_MAX_SIZE = 5
+POOL_MAX_IDLE_SECONDS = 300
+POOL_HEALTH_CHECK_AFTER_SECONDS = 30
+DEFAULT_HEALTH_CHECK_QUERY = "SELECT 1"
+
+class ConnectionPool:
+    """
+    A bounded pool of DB-API connections to a single DSN.
+
+    Args:
+        dsn (str): Connection string passed to the factory.
+        connect (callable): Factory creating a new connection from the DSN.
+        max_size (int): Maximum number of connections checked out at once.
+        max_idle_seconds (float): Idle connections older than this are closed.
+        health_check_query (str): Query run on connections idle for longer than
+            POOL_HEALTH_CHECK_AFTER_SECONDS before they are handed out again.
+    """
+
+    def __init__(self, dsn, connect, max_size=POOL_MAX_SIZE, max_idle_seconds=POOL_MAX_IDLE_SECONDS,
+                 health_check_query=DEFAULT_HEALTH_CHECK_QUERY):
+        self.dsn = dsn
+        self.connect = connect
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_query = health_check_query
+
+        self._idle = []  # (connection, last_used) pairs, most recently used last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._metrics = {
+            "created": 0,
+            "reused": 0,
+            "evicted_idle": 0,
+            "failed_health_checks": 0,
+            "discarded": 0,
+            "in_use": 0,
+            "wait_seconds": 0.0
+        }
+
+    def _close_quietly(self, conn):
+        """Closes a connection, ignoring errors from already-broken connections."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        """Runs the health check query on a connection."""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self, now):
+        """Closes idle connections older than max_idle_seconds. Caller holds the lock."""
+        expired = [conn for conn, last_used in self._idle if now - last_used > self.max_idle_seconds]
+        self._idle = [(conn, last_used) for conn, last_used in self._idle if now - last_used <= self.max_idle_seconds]
+        self._metrics["evicted_idle"] += len(expired)
+        return expired
+
+    def acquire(self, timeout=None):
+        """
+        Checks out a connection, reusing the most recently used healthy idle connection.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free slot.
+
+        Returns:
+            Connection object.
+        """
+        wait_start = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No connection available in pool '{self.name}' within {timeout} seconds.")
+        with self._lock:
+            self._metrics["wait_seconds"] += time.monotonic() - wait_start
+
+        try:
+            while True:
+                now = time.monotonic()
+                with self._lock:
+                    expired = self._evict_idle(now)
+                    conn, last_used = self._idle.pop() if self._idle else (None, None)
+                for stale in expired:
+                    self._close_quietly(stale)
+
+                if conn is None:
+                    conn = self.connect(self.dsn)
+                    with self._lock:
+                        self._metrics["created"] += 1
+                        self._metrics["in_use"] += 1
+                    return conn
+
+                if now - last_used > POOL_HEALTH_CHECK_AFTER_SECONDS and not self._is_healthy(conn):
+                    with self._lock:
+                        self._metrics["failed_health_checks"] += 1
+                    self._close_quietly(conn)
+                    continue
+
+                with self._lock:
+                    self._metrics["reused"] += 1
+                    self._metrics["in_use"] += 1
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """
+        Returns a connection to the pool.
+
+        Args:
+            conn: Connection obtained from acquire.
+            discard (bool): Close the connection instead of keeping it, e.g. after an error.
+        """
+        if not discard:
+            # End any transaction left open by the caller before the connection is reused
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._lock:
+            self._metrics["in_use"] -= 1
+            if discard:
+                self._metrics["discarded"] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+        if discard:
+            self._close_quietly(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager that checks out a connection and returns it afterwards.
+        Connections used by a block that raised are discarded rather than reused.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free slot.
+
+        Yields:
+            Connection object.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """
+        Closes every idle connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    @property
+    def name(self):
+        """DSN with credentials redacted, safe for logs and metrics."""
+        return re.sub(r"(?i)\b(pwd|password)=[^;]*", r"\1=***", self.dsn)
+
+    def metrics(self):
+        """
+        Returns a snapshot of the pool metrics.
+
+        Returns:
+            dict: Counters plus the current number of idle connections.
+        """
+        with self._lock:
+            return dict(self._metrics, idle=len(self._idle), max_size=self.max_size)
+
+# Process-wide pools and the options they were created with, keyed by (DSN, connection factory)
+_pools = {}
+_pool_options = {}
+_pools_lock = threading.Lock()
+
+def get_pool(dsn, connect, **pool_options):
+    """
+    Returns the shared pool for a DSN and connection factory, creating it on first use.
+
+    Factories are compared with ==, so callers that build a factory per call should pass one
+    that compares equal for equal settings rather than a new lambda.
+
+    Args:
+        dsn (str): Connection string.
+        connect (callable): Factory creating a new connection from the DSN.
+        **pool_options: Options passed to ConnectionPool when the pool is created.
+
+    Returns:
+        ConnectionPool: Pool for the DSN and factory.
+
+    Raises:
+        ValueError: If the pool exists with different options.
+    """
+    key = (dsn, connect)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(dsn, connect, **pool_options)
+            _pool_options[key] = pool_options
+        elif _pool_options[key] != pool_options:
+            raise ValueError(f"Pool '{_pools[key].name}' already exists with options {_pool_options[key]}, "
+                             f"not {pool_options}.")
+        return _pools[key]
+
+@contextmanager
+def pooled_connection(dsn, connect, **pool_options):
+    """
+    Context manager yielding a warm connection from the shared pool for a DSN.
+
+    Args:
+        dsn (str): Connection string.
+        connect (callable): Factory creating a new connection from the DSN.
+        **pool_options: Options passed to ConnectionPool when the pool is created.
+
+    Yields:
+        Connection object.
+    """
+    with get_pool(dsn, connect, **pool_options).connection() as conn:
+        yield conn
+
+def pool_metrics():
+    """
+    Returns metrics of every shared pool.
+
+    Returns:
+        dict: Mapping of redacted DSN to pool metrics; pools of further factories for the same DSN
+            are numbered, e.g. "<dsn> #2".
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    metrics = {}
+    for pool in pools:
+        name = pool.name
+        copies = 1
+        while name in metrics:
+            copies += 1
+            name = f"{pool.name} #{copies}"
+        metrics[name] = pool.metrics()
+    return metrics
+
+def close_all_pools():
+    """
+    Closes the idle connections of every shared pool.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
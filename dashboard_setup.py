@@ -3,14 +3,55 @@ dashboard_setup.py
 
 This module prepares and exports data for integration with Tableau and Power BI dashboards.
 It focuses on structuring the data for visualization and saving it in appropriate formats.
+Dashboard data is exported as Parquet partitioned by month of 'Date' and 'Warehouse ID' behind an
+atomically replaced manifest; only partitions whose content changed are rewritten, and readers can
+prune to the partitions they need. CSV remains available as an optional output.
+A pre-aggregated cube (warehouse x day, warehouse x week, region x month, global x day) is built
+from the transformed data and refreshed incrementally, so BI tools do not re-aggregate row-level data.
 Author: Satej
 """
 
+import os  # For handling partition files
+import json  # For the partition manifest
+import hashlib  # For partition content hashes
 import pandas as pd  # For data manipulation
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
 
 # File path for saving dashboard-ready data
 DASHBOARD_EXPORT_PATH = "/home/satej/data/dashboard_ready_data.csv"
 
+# Partitioned Parquet export
+DASHBOARD_PARQUET_PATH = "/home/satej/data/dashboard_parquet/"
+DASHBOARD_MANIFEST_FILE = "_manifest.json"
+DASHBOARD_ROW_GROUP_SIZE = 100000
+
+# Output formats written by export_dashboard_data ("parquet", "csv")
+DASHBOARD_EXPORT_FORMATS = ["parquet"]
+
+# Pre-aggregated dashboard cube: grain name -> (key columns, period frequency)
+DASHBOARD_CUBE_PATH = "/home/satej/data/dashboard_cube/"
+DASHBOARD_CUBE_BASE_FILE = "_base.parquet"
+CUBE_GRAINS = {
+    "warehouse_day": (["warehouse_id"], "D"),
+    "warehouse_week": (["warehouse_id"], "W"),
+    "region_month": (["region"], "M"),
+    "global_day": ([], "D")
+}
+WAREHOUSE_REGIONS = {}  # Warehouse ID -> region, used when the data has no 'region' column
+DEFAULT_REGION = "Unassigned"
+
+# Display names of the cube columns
+CUBE_COLUMN_NAMES = {
+    'warehouse_id': 'Warehouse ID',
+    'region': 'Region',
+    'period_start': 'Period Start',
+    'total_inventory': 'Total Inventory',
+    'peak_daily_inventory': 'Peak Daily Inventory',
+    'average_order_value': 'Average Order Value',
+    'days': 'Days'
+}
+
+@instrument
 def prepare_dashboard_data(df):
     """
     Prepares data for dashboard visualization by ensuring appropriate structure and aggregations.
@@ -42,6 +83,7 @@ def prepare_dashboard_data(df):
         print(f"Error during dashboard data preparation: {e}")
         return pd.DataFrame()
 
+@instrument
 def export_to_csv(df, export_path=DASHBOARD_EXPORT_PATH):
     """
     Exports the prepared data to a CSV file for Tableau or Power BI integration.
@@ -56,13 +98,333 @@ def export_to_csv(df, export_path=DASHBOARD_EXPORT_PATH):
     except Exception as e:
         print(f"Error exporting dashboard data to CSV: {e}")
 
+def load_dashboard_manifest(export_path=DASHBOARD_PARQUET_PATH):
+    """
+    Loads the manifest of the partitioned dashboard export.
+
+    Args:
+        export_path (str): Directory of the partitioned export.
+
+    Returns:
+        dict: Mapping of partition key to {"file", "month", "warehouse_id", "rows", "hash", "min_date", "max_date"}.
+    """
+    manifest_path = os.path.join(export_path, DASHBOARD_MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def _save_dashboard_manifest(manifest, export_path):
+    """
+    Saves the manifest atomically, so readers see either the previous or the new export.
+
+    Args:
+        manifest (dict): Partition manifest.
+        export_path (str): Directory of the partitioned export.
+    """
+    manifest_path = os.path.join(export_path, DASHBOARD_MANIFEST_FILE)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+@instrument
+def export_to_parquet(df, export_path=DASHBOARD_PARQUET_PATH, row_group_size=DASHBOARD_ROW_GROUP_SIZE):
+    """
+    Exports the prepared data as Parquet partitioned by month of 'Date' and 'Warehouse ID'.
+
+    The data is treated as a full snapshot: partitions whose content is unchanged keep their
+    files, changed partitions are written to new content-addressed files, and partitions no longer
+    present are dropped. Rows are sorted by 'Date' within each partition so the row-group
+    statistics let readers skip row groups outside a date range.
+
+    Args:
+        df (pd.DataFrame): Dashboard-ready data with 'Date' and 'Warehouse ID' columns.
+        export_path (str): Directory of the partitioned export.
+        row_group_size (int): Maximum rows per Parquet row group.
+
+    Returns:
+        dict: Counts of 'written', 'unchanged' and 'removed' partitions.
+    """
+    try:
+        os.makedirs(export_path, exist_ok=True)
+        previous = load_dashboard_manifest(export_path)
+        manifest = {}
+        written = 0
+
+        dates = pd.to_datetime(df['Date'])
+        keys = pd.DataFrame({'month': dates.dt.to_period('M').astype(str), 'warehouse_id': df['Warehouse ID'].astype(str)})
+        for (month, warehouse_id), positions in keys.groupby(['month', 'warehouse_id'], sort=True).indices.items():
+            partition = df.iloc[positions].sort_values(by='Date', kind='stable')
+            digest = hashlib.sha1(pd.util.hash_pandas_object(partition, index=False).to_numpy().tobytes())
+            digest.update(",".join(f"{column}:{dtype}" for column, dtype in partition.dtypes.items()).encode())
+            content_hash = digest.hexdigest()
+
+            key = f"{month}|{warehouse_id}"
+            entry = previous.get(key)
+            if entry and entry["hash"] == content_hash and os.path.exists(os.path.join(export_path, entry["file"])):
+                manifest[key] = entry
+                continue
+
+            file_name = os.path.join(month, f"{hashlib.sha1(warehouse_id.encode()).hexdigest()[:16]}-{content_hash[:16]}.parquet")
+            file_path = os.path.join(export_path, file_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            partition.to_parquet(f"{file_path}.tmp", index=False, engine="pyarrow",
+                                 row_group_size=row_group_size, write_statistics=True)
+            os.replace(f"{file_path}.tmp", file_path)
+
+            partition_dates = dates.iloc[positions]
+            manifest[key] = {"file": file_name, "month": month, "warehouse_id": warehouse_id,
+                             "rows": len(partition), "hash": content_hash,
+                             "min_date": partition_dates.min().isoformat(), "max_date": partition_dates.max().isoformat()}
+            written += 1
+
+        _save_dashboard_manifest(manifest, export_path)
+
+        # Remove files no longer referenced only after the new manifest is in place
+        referenced = {entry["file"] for entry in manifest.values()}
+        obsolete = {entry["file"] for entry in previous.values()} - referenced
+        for file_name in obsolete:
+            file_path = os.path.join(export_path, file_name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+        removed = len(set(previous) - set(manifest))
+        print(f"Dashboard data exported to: {export_path} "
+              f"(partitions written: {written}, unchanged: {len(manifest) - written}, removed: {removed})")
+        return {"written": written, "unchanged": len(manifest) - written, "removed": removed}
+    except Exception as e:
+        print(f"Error exporting dashboard data to Parquet: {e}")
+        return {"written": 0, "unchanged": 0, "removed": 0}
+
+@instrument
+def read_dashboard_data(export_path=DASHBOARD_PARQUET_PATH, warehouse_ids=None, start_date=None,
+                        end_date=None, columns=None):
+    """
+    Reads the partitioned dashboard export, opening only the partitions that can match.
+
+    Partitions are pruned through the manifest by warehouse and date range, and within each
+    file the 'Date' filter uses the row-group statistics to skip row groups.
+
+    Args:
+        export_path (str): Directory of the partitioned export.
+        warehouse_ids (list, optional): Warehouses to read; all when omitted.
+        start_date (optional): First date to include.
+        end_date (optional): Last date to include.
+        columns (list, optional): Columns to read; all when omitted.
+
+    Returns:
+        pd.DataFrame: Matching dashboard rows.
+    """
+    try:
+        start_date = pd.Timestamp(start_date) if start_date is not None else None
+        end_date = pd.Timestamp(end_date) if end_date is not None else None
+        wanted = None if warehouse_ids is None else {str(warehouse_id) for warehouse_id in warehouse_ids}
+
+        files = [
+            os.path.join(export_path, entry["file"])
+            for _, entry in sorted(load_dashboard_manifest(export_path).items())
+            if (wanted is None or entry["warehouse_id"] in wanted)
+            and (start_date is None or pd.Timestamp(entry["max_date"]) >= start_date)
+            and (end_date is None or pd.Timestamp(entry["min_date"]) <= end_date)
+        ]
+        if not files:
+            return pd.DataFrame()
+
+        filters = []
+        if start_date is not None:
+            filters.append(('Date', '>=', start_date))
+        if end_date is not None:
+            filters.append(('Date', '<=', end_date))
+
+        frames = [pd.read_parquet(file, engine="pyarrow", columns=columns, filters=filters or None) for file in files]
+        return pd.concat(frames, ignore_index=True)
+    except Exception as e:
+        print(f"Error reading dashboard data: {e}")
+        return pd.DataFrame()
+
+def export_dashboard_data(df, formats=DASHBOARD_EXPORT_FORMATS):
+    """
+    Exports the prepared data in every configured format.
+
+    Args:
+        df (pd.DataFrame): DataFrame to export.
+        formats (list): Output formats, any of "parquet" and "csv".
+    """
+    if "parquet" in formats:
+        export_to_parquet(df)
+    if "csv" in formats:
+        export_to_csv(df)
+
+def _cube_base(df):
+    """
+    Reduces transformed data to mergeable partials per (warehouse_id, date) in one grouped pass.
+
+    Args:
+        df (pd.DataFrame): Output of transform_data with warehouse_id, date, total_quantity
+            and average_order_value, and optionally region.
+
+    Returns:
+        pd.DataFrame: One row per (warehouse_id, date) with region and the partial sums, maxima and counts.
+    """
+    df = df.assign(warehouse_id=df['warehouse_id'].astype(str), date=pd.to_datetime(df['date']).dt.normalize())
+    if 'region' in df.columns:
+        regions = df['region'].astype(str)
+    else:
+        regions = df['warehouse_id'].map(WAREHOUSE_REGIONS).fillna(DEFAULT_REGION)
+    df = df.assign(region=regions)
+
+    return df.groupby(['warehouse_id', 'date'], observed=True, sort=True).agg(
+        region=('region', 'last'),
+        quantity_sum=('total_quantity', 'sum'),
+        quantity_max=('total_quantity', 'max'),
+        order_value_sum=('average_order_value', 'sum'),
+        order_value_count=('average_order_value', 'count'),
+        days=('total_quantity', 'size')
+    ).reset_index()
+
+def _cube_keys(base, grain):
+    """
+    Derives the grouping keys of a grain for every base row.
+
+    Args:
+        base (pd.DataFrame): Cube base from _cube_base.
+        grain (str): Name of a grain in CUBE_GRAINS.
+
+    Returns:
+        pd.DataFrame: Key columns and period_start, aligned to base.
+    """
+    key_columns, frequency = CUBE_GRAINS[grain]
+    keys = base[key_columns].copy()
+    keys['period_start'] = base['date'].dt.to_period(frequency).dt.start_time
+    return keys
+
+def _rollup(base, grain):
+    """
+    Rolls the cube base up to one grain.
+
+    Totals are summed, the peak is the largest daily total, and the average order value is the
+    mean of the daily averages, so every grain is consistent with the daily base.
+
+    Args:
+        base (pd.DataFrame): Cube base from _cube_base.
+        grain (str): Name of a grain in CUBE_GRAINS.
+
+    Returns:
+        pd.DataFrame: One row per key and period with display column names.
+    """
+    keys = _cube_keys(base, grain)
+    grouped = base.groupby([keys[column] for column in keys.columns], sort=True).agg(
+        quantity_sum=('quantity_sum', 'sum'),
+        quantity_max=('quantity_max', 'max'),
+        order_value_sum=('order_value_sum', 'sum'),
+        order_value_count=('order_value_count', 'sum'),
+        days=('days', 'sum')
+    )
+    table = pd.DataFrame({
+        'total_inventory': grouped['quantity_sum'],
+        'peak_daily_inventory': grouped['quantity_max'],
+        'average_order_value': grouped['order_value_sum'] / grouped['order_value_count'],
+        'days': grouped['days']
+    }).reset_index()
+    return table.rename(columns=CUBE_COLUMN_NAMES)
+
+def build_dashboard_cube(df):
+    """
+    Builds every grain of the dashboard cube from transformed data.
+
+    The row-level data is grouped once into the (warehouse_id, date) base; every grain is
+    then rolled up from that much smaller base.
+
+    Args:
+        df (pd.DataFrame): Output of transform_data.
+
+    Returns:
+        dict: Mapping of grain name to its table.
+    """
+    base = _cube_base(df)
+    return {grain: _rollup(base, grain) for grain in CUBE_GRAINS}
+
+def _write_parquet_atomic(df, file_path):
+    """
+    Writes a Parquet file through a temporary file so readers never see a partial table.
+
+    Args:
+        df (pd.DataFrame): Table to write.
+        file_path (str): Destination file.
+    """
+    df.to_parquet(f"{file_path}.tmp", index=False, engine="pyarrow")
+    os.replace(f"{file_path}.tmp", file_path)
+
+@instrument
+def refresh_dashboard_cube(df, export_path=DASHBOARD_CUBE_PATH, full=False):
+    """
+    Refreshes the exported cube tables with new or restated days.
+
+    The (warehouse_id, date) rows in df replace the stored base rows, and for each grain only
+    the rows whose keys and period are touched by df are recomputed; the rest of the stored
+    table is kept. Pass full=True to rebuild from df alone, e.g. after WAREHOUSE_REGIONS changes.
+
+    Args:
+        df (pd.DataFrame): Output of transform_data; may cover only the changed days.
+        export_path (str): Directory of the cube tables.
+        full (bool): Whether df replaces the whole cube.
+
+    Returns:
+        dict: Mapping of grain name to its refreshed table.
+    """
+    try:
+        os.makedirs(export_path, exist_ok=True)
+        base_path = os.path.join(export_path, DASHBOARD_CUBE_BASE_FILE)
+        delta = _cube_base(df)
+
+        if full or not os.path.exists(base_path):
+            base = delta
+            cube = {grain: _rollup(base, grain) for grain in CUBE_GRAINS}
+        else:
+            stored = pd.read_parquet(base_path)
+            delta_index = pd.MultiIndex.from_frame(delta[['warehouse_id', 'date']])
+            kept = ~pd.MultiIndex.from_frame(stored[['warehouse_id', 'date']]).isin(delta_index)
+            base = pd.concat([stored[kept], delta], ignore_index=True).sort_values(
+                ['warehouse_id', 'date'], kind='stable', ignore_index=True)
+
+            cube = {}
+            for grain in CUBE_GRAINS:
+                keys = _cube_keys(base, grain)
+                display_keys = [CUBE_COLUMN_NAMES[column] for column in keys.columns]
+                touched = pd.MultiIndex.from_frame(_cube_keys(delta, grain)).unique()
+                affected = pd.MultiIndex.from_frame(keys).isin(touched)
+
+                table_path = os.path.join(export_path, f"{grain}.parquet")
+                stored_table = pd.read_parquet(table_path) if os.path.exists(table_path) else pd.DataFrame()
+                if not stored_table.empty:
+                    stored_keys = stored_table[display_keys].rename(columns={v: k for k, v in CUBE_COLUMN_NAMES.items()})
+                    stored_table = stored_table[~pd.MultiIndex.from_frame(stored_keys).isin(touched)]
+
+                table = pd.concat([stored_table, _rollup(base[affected], grain)], ignore_index=True)
+                cube[grain] = table.sort_values(display_keys, kind='stable', ignore_index=True)
+
+        for grain, table in cube.items():
+            _write_parquet_atomic(table, os.path.join(export_path, f"{grain}.parquet"))
+        _write_parquet_atomic(base, base_path)
+
+        print(f"Dashboard cube refreshed at: {export_path} "
+              f"({', '.join(f'{grain}: {len(table)} rows' for grain, table in cube.items())})")
+        return cube
+    except Exception as e:
+        print(f"Error refreshing dashboard cube: {e}")
+        return {}
+
 if __name__ == "__main__":
     # Example usage
     transformed_data_path = "/home/satej/data/transformed_data.csv"
     transformed_data = pd.read_csv(transformed_data_path)
 
     # Prepare data for dashboards
-    dashboard_data = prepare_dashboard_data(transformed_data)
+    dashboard_data = prepare_dashboard_data(transformed_data.copy())
 
     # Export data for visualization tools
-    export_to_csv(dashboard_data)
+    export_dashboard_data(dashboard_data)
+
+    # Refresh the pre-aggregated cube for BI extracts
+    refresh_dashboard_cube(transformed_data)
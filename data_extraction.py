@@ -6,9 +6,19 @@ and flat files. It is the first step in the ETL pipeline for the warehouse analy
 Author: Satej
 """
 
-import pyodbc  # For database connection
 import pandas as pd  # For handling dataframes
 import os  # For handling file paths
+import re  # For validating SQL identifiers
+import json  # For persisting extraction watermarks
+import time  # For timing each source
+import functools  # For binding the extraction request to each source
+from dataclasses import dataclass, field  # For declarative extraction requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # For concurrent extraction
+import iot_ingestion  # For cached, parallel IoT ingestion
+import flat_file_ingestion  # For cached, streaming Excel ingestion
+import data_transformation  # For the shared date parser
+from connection_pool import pooled_connection  # For reusing warm database connections
+from performance_monitoring import instrument, submit_with_context  # For stage spans, also on worker threads
 
 # Define constants for database connection
 SQL_SERVER_CONNECTION_STRING = "Driver={SQL Server};Server=SATEJ-SQL-SERVER;Database=WarehouseDB;UID=your_username;PWD=your_password"
@@ -16,85 +26,800 @@ ORACLE_CONNECTION_STRING = "Driver={Oracle};DBQ=//SATEJ-ORACLE-SERVER:1521/ORCLP
 IOT_DATA_PATH = "/home/satej/data/iot_data/"
 FLAT_FILE_PATH = "/home/satej/data/flat_files/"
 
-def extract_from_sql_server():
+# Excel workbooks in FLAT_FILE_PATH and the sheets read from each (names or positions; None reads every sheet)
+FLAT_FILE_WORKBOOKS = ["warehouse_data.xlsx"]
+FLAT_FILE_SHEETS = [0]
+
+# Health check queries for pooled connections, by connection string
+HEALTH_CHECK_QUERIES = {
+    ORACLE_CONNECTION_STRING: "SELECT 1 FROM DUAL"
+}
+
+# Defaults for streaming SQL extraction: rows per chunk, projected columns and explicit dtypes
+DEFAULT_CHUNK_SIZE = 50000
+INVENTORY_COLUMNS = ["warehouse_id", "product_id", "date", "quantity"]
+ORDERS_COLUMNS = ["warehouse_id", "product_id", "date", "quantity", "order_value"]
+STREAM_DTYPES = {
+    "warehouse_id": "category",
+    "product_id": "category",
+    "date": "datetime64[ns]",
+    "quantity": "float64",
+    "order_value": "float64"
+}
+
+# Incremental extraction: persisted high-water marks and the change-tracking column per table
+WATERMARK_STATE_PATH = "/home/satej/data/state/watermarks.json"
+SQL_SERVER_WATERMARK_COLUMN = "last_modified"
+ORACLE_WATERMARK_COLUMN = "last_modified"
+
+# Per-source timeouts in seconds for concurrent extraction
+SOURCE_TIMEOUTS = {
+    "sql_server": 900,
+    "oracle": 900,
+    "iot": 600,
+    "flat_files": 300
+}
+
+# DataFrame.attrs key marking the empty result of a failed extraction, so extract_all can report
+# the source as failed instead of as an empty success
+EXTRACTION_ERROR_ATTR = "extraction_error"
+
+# Limits of the SQL dialects the request generator targets: bound parameters per statement and
+# values per IN list. Warehouse filters that would exceed them are applied after the fetch instead.
+# Column names are quoted, as some (e.g. date in Oracle) are reserved words. Quoted names are
+# case-sensitive in Oracle, so there only reserved words are quoted and other names keep matching
+# the upper-case names Oracle stores; None quotes every name.
+ORACLE_RESERVED_WORDS = {
+    "ACCESS", "ADD", "ALL", "ALTER", "AND", "ANY", "AS", "ASC", "AUDIT", "BETWEEN", "BY", "CHAR", "CHECK",
+    "CLUSTER", "COLUMN", "COMMENT", "COMPRESS", "CONNECT", "CREATE", "CURRENT", "DATE", "DECIMAL", "DEFAULT",
+    "DELETE", "DESC", "DISTINCT", "DROP", "ELSE", "EXCLUSIVE", "EXISTS", "FILE", "FLOAT", "FOR", "FROM", "GRANT",
+    "GROUP", "HAVING", "IDENTIFIED", "IMMEDIATE", "IN", "INCREMENT", "INDEX", "INITIAL", "INSERT", "INTEGER",
+    "INTERSECT", "INTO", "IS", "LEVEL", "LIKE", "LOCK", "LONG", "MAXEXTENTS", "MINUS", "MLSLABEL", "MODE",
+    "MODIFY", "NOAUDIT", "NOCOMPRESS", "NOT", "NOWAIT", "NULL", "NUMBER", "OF", "OFFLINE", "ON", "ONLINE",
+    "OPTION", "OR", "ORDER", "PCTFREE", "PRIOR", "PUBLIC", "RAW", "RENAME", "RESOURCE", "REVOKE", "ROW", "ROWID",
+    "ROWNUM", "ROWS", "SELECT", "SESSION", "SET", "SHARE", "SIZE", "SMALLINT", "START", "SUCCESSFUL", "SYNONYM",
+    "SYSDATE", "TABLE", "THEN", "TO", "TRIGGER", "UID", "UNION", "UNIQUE", "UPDATE", "USER", "VALIDATE", "VALUES",
+    "VARCHAR", "VARCHAR2", "VIEW", "WHENEVER", "WHERE", "WITH"
+}
+SQL_DIALECTS = {
+    "sqlserver": {"max_parameters": 2100, "max_in_list": 2000, "quote": ("[", "]"), "reserved": None},
+    "oracle": {"max_parameters": 65535, "max_in_list": 1000, "quote": ('"', '"'), "reserved": ORACLE_RESERVED_WORDS}
+}
+SQL_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def quote_identifier(name, dialect="sqlserver"):
+    """
+    Quotes a column name in a dialect's style where the dialect needs it.
+
+    Args:
+        name (str): Column name.
+        dialect (str): "sqlserver" or "oracle".
+
+    Returns:
+        str: Column name for use in a query.
+    """
+    opening, closing = SQL_DIALECTS[dialect]["quote"]
+    reserved = SQL_DIALECTS[dialect]["reserved"]
+    if reserved is not None and name.upper() not in reserved:
+        return name
+    return f"{opening}{name}{closing}"
+
+@dataclass
+class ExtractionRequest:
+    """
+    Declarative description of the data a pipeline run needs from the sources.
+
+    The same request is pushed down as a parameterized projection and WHERE clause into the
+    SQL Server and Oracle queries, as an Arrow filter into the IoT cache reads, and as column
+    and row filters on the IoT CSVs and the Excel flat file, so rows and columns the later
+    stages would discard are not transferred or materialized.
+
+    Args:
+        columns (list, optional): Columns to return; all columns when None.
+        start_date (optional): First date to return, inclusive.
+        end_date (optional): Last date to return, inclusive.
+        warehouse_ids (list, optional): Warehouses to return; all warehouses when None.
+        not_null (list): Columns that must be non-null in every returned row.
+        date_column (str): Column holding the date.
+        warehouse_column (str): Column identifying the warehouse.
+    """
+    columns: list = None
+    start_date: object = None
+    end_date: object = None
+    warehouse_ids: list = None
+    not_null: list = field(default_factory=list)
+    date_column: str = "date"
+    warehouse_column: str = "warehouse_id"
+
+    def _date_bounds(self):
+        """
+        Returns the date range as a half-open interval, so date-time columns match whole end days.
+
+        Returns:
+            tuple: (pd.Timestamp or None, pd.Timestamp or None) inclusive start and exclusive end.
+        """
+        start = None if self.start_date is None else pd.Timestamp(self.start_date).normalize()
+        end = None if self.end_date is None else pd.Timestamp(self.end_date).normalize() + pd.Timedelta(days=1)
+        return start, end
+
+    def filter_columns(self):
+        """
+        Lists the columns the row filters refer to.
+
+        Returns:
+            list: Column names.
+        """
+        columns = list(self.not_null)
+        if self.start_date is not None or self.end_date is not None:
+            columns.append(self.date_column)
+        if self.warehouse_ids is not None:
+            columns.append(self.warehouse_column)
+        return list(dict.fromkeys(columns))
+
+    def read_columns(self, available_columns):
+        """
+        Lists the columns to read from a source so that both the projection and the filters can be evaluated.
+
+        Args:
+            available_columns (list): Columns the source has.
+
+        Returns:
+            list or None: Columns to read, or None to read every column.
+        """
+        if self.columns is None:
+            return None
+        needed = set(self.columns) | set(self.filter_columns())
+        return [column for column in available_columns if column in needed]
+
+    def to_sql(self, table, dialect="sqlserver", available_columns=None):
+        """
+        Generates a parameterized query with the projection and filters pushed into the source.
+
+        Predicates on columns outside available_columns, and warehouse lists beyond the dialect's
+        parameter limit, are left out of the query; apply() evaluates them after the fetch.
+        Column names are quoted where the dialect needs it, see quote_identifier.
+
+        Args:
+            table (str): Table to read.
+            dialect (str): "sqlserver" or "oracle".
+            available_columns (list, optional): Columns of the table; assumed to hold every requested column when None.
+
+        Returns:
+            tuple: (str, list) query with ? placeholders and its parameters.
+        """
+        limits = SQL_DIALECTS[dialect]
+        for name in [table] + list(self.columns or []) + self.filter_columns():
+            if not SQL_IDENTIFIER_PATTERN.match(name):
+                raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+        def available(column):
+            return available_columns is None or column in available_columns
+
+        def quoted(column):
+            return quote_identifier(column, dialect)
+
+        # Filter columns are fetched too, so predicates left out of the query can still be applied
+        projection = [] if self.columns is None else \
+            [column for column in dict.fromkeys(list(self.columns) + self.filter_columns()) if available(column)]
+        conditions, params = [], []
+
+        start, end = self._date_bounds()
+        if available(self.date_column):
+            if start is not None:
+                conditions.append(f"{quoted(self.date_column)} >= ?")
+                params.append(start.to_pydatetime())
+            if end is not None:
+                conditions.append(f"{quoted(self.date_column)} < ?")
+                params.append(end.to_pydatetime())
+
+        if self.warehouse_ids is not None and available(self.warehouse_column):
+            warehouse_ids = list(dict.fromkeys(self.warehouse_ids))
+            if not warehouse_ids:
+                conditions.append("1 = 0")
+            elif len(params) + len(warehouse_ids) <= limits["max_parameters"]:
+                step = limits["max_in_list"]
+                in_lists = [
+                    f"{quoted(self.warehouse_column)} IN ({', '.join('?' * len(warehouse_ids[i:i + step]))})"
+                    for i in range(0, len(warehouse_ids), step)
+                ]
+                conditions.append(in_lists[0] if len(in_lists) == 1 else f"({' OR '.join(in_lists)})")
+                params.extend(warehouse_ids)
+
+        conditions.extend(f"{quoted(column)} IS NOT NULL" for column in self.not_null if available(column))
+
+        query = f"SELECT {', '.join(quoted(column) for column in projection) or '*'} FROM {table}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query, params
+
+    def to_arrow_filter(self, available_columns):
+        """
+        Builds the row filters as an Arrow expression for columnar reads.
+
+        Args:
+            available_columns (list): Columns of the Arrow data.
+
+        Returns:
+            pyarrow.compute.Expression or None: Filter, or None when no filter applies.
+        """
+        import pyarrow.compute as pc  # For Arrow filter expressions
+
+        conditions = []
+        start, end = self._date_bounds()
+        if self.date_column in available_columns:
+            if start is not None:
+                conditions.append(pc.field(self.date_column) >= start.to_pydatetime())
+            if end is not None:
+                conditions.append(pc.field(self.date_column) < end.to_pydatetime())
+        if self.warehouse_ids is not None and self.warehouse_column in available_columns:
+            conditions.append(pc.field(self.warehouse_column).isin([str(w) for w in self.warehouse_ids]))
+        conditions.extend(pc.field(column).is_valid() for column in self.not_null if column in available_columns)
+        return functools.reduce(lambda left, right: left & right, conditions) if conditions else None
+
+    def apply(self, df):
+        """
+        Applies the row filters and the projection to extracted data.
+
+        Rows are kept with the same semantics as the pushed-down filters, and a not_null column
+        the data lacks drops every row, as the cleaning stage would.
+
+        Args:
+            df (pd.DataFrame): Extracted data.
+
+        Returns:
+            pd.DataFrame: Filtered and projected data.
+        """
+        keep = pd.Series(True, index=df.index)
+        for column in self.not_null:
+            keep &= df[column].notna() if column in df.columns else False
+
+        start, end = self._date_bounds()
+        if (start is not None or end is not None) and self.date_column in df.columns:
+            dates = data_transformation.parse_dates(df[self.date_column])
+            if start is not None:
+                keep &= dates >= start
+            if end is not None:
+                keep &= dates < end
+
+        if self.warehouse_ids is not None and self.warehouse_column in df.columns:
+            keep &= df[self.warehouse_column].astype(str).isin([str(w) for w in self.warehouse_ids])
+
+        if not keep.all():
+            df = df[keep]
+        if self.columns is not None:
+            df = df[[column for column in self.columns if column in df.columns]]
+        return df
+
+def database_connection(connection_string, connect=None):
+    """
+    Checks out a pooled connection for a database connection string.
+
+    Args:
+        connection_string (str): ODBC connection string.
+        connect (callable, optional): Connection factory. Defaults to pyodbc.connect.
+
+    Returns:
+        Context manager yielding a connection from the shared pool.
+    """
+    if connect is None:
+        import pyodbc  # ODBC driver, loaded only when a database source is actually read
+        connect = pyodbc.connect
+    return pooled_connection(
+        connection_string,
+        connect,
+        health_check_query=HEALTH_CHECK_QUERIES.get(connection_string, "SELECT 1")
+    )
+
+def failed_extraction(error):
+    """
+    Builds the result of a failed extraction: an empty DataFrame marked with the error.
+
+    Args:
+        error (Exception or str): Cause of the failure.
+
+    Returns:
+        pd.DataFrame: Empty DataFrame with the error under attrs[EXTRACTION_ERROR_ATTR].
+    """
+    df = pd.DataFrame()
+    df.attrs[EXTRACTION_ERROR_ATTR] = str(error)
+    return df
+
+def extraction_error(df):
+    """
+    Returns the error a failed extraction was marked with.
+
+    Args:
+        df (pd.DataFrame): Result of an extraction function.
+
+    Returns:
+        str: Error message, or None if the extraction succeeded.
+    """
+    return df.attrs.get(EXTRACTION_ERROR_ATTR) if isinstance(df, pd.DataFrame) else None
+
+@instrument
+def extract_from_sql_server(request=None):
     """
     Extract data from SQL Server database.
 
+    Args:
+        request (ExtractionRequest, optional): Columns and filters pushed into the query.
+
     Returns:
         pd.DataFrame: Extracted data in a Pandas DataFrame format.
     """
     try:
-        # Establish connection
-        conn = pyodbc.connect(SQL_SERVER_CONNECTION_STRING)
-        query = "SELECT * FROM Inventory"  # Example query
-        df = pd.read_sql(query, conn)
-        conn.close()
+        # Borrow a pooled connection
+        query, params = "SELECT * FROM Inventory", []  # Example query
+        if request is not None:
+            query, params = request.to_sql("Inventory", "sqlserver", INVENTORY_COLUMNS)
+        with database_connection(SQL_SERVER_CONNECTION_STRING) as conn:
+            df = pd.read_sql(query, conn, params=params)
+        if request is not None:
+            df = request.apply(df)
         print("Data successfully extracted from SQL Server.")
         return df
     except Exception as e:
         print(f"Error while extracting data from SQL Server: {e}")
-        return pd.DataFrame()
+        return failed_extraction(e)
 
-def extract_from_oracle():
+@instrument
+def extract_from_oracle(request=None):
     """
     Extract data from Oracle database.
 
+    Args:
+        request (ExtractionRequest, optional): Columns and filters pushed into the query.
+
     Returns:
         pd.DataFrame: Extracted data in a Pandas DataFrame format.
     """
     try:
-        # Establish connection
-        conn = pyodbc.connect(ORACLE_CONNECTION_STRING)
-        query = "SELECT * FROM Orders"  # Example query
-        df = pd.read_sql(query, conn)
-        conn.close()
+        # Borrow a pooled connection
+        query, params = "SELECT * FROM Orders", []  # Example query
+        if request is not None:
+            query, params = request.to_sql("Orders", "oracle", ORDERS_COLUMNS)
+        with database_connection(ORACLE_CONNECTION_STRING) as conn:
+            df = pd.read_sql(query, conn, params=params)
+        if request is not None:
+            df = request.apply(df)
         print("Data successfully extracted from Oracle database.")
         return df
     except Exception as e:
         print(f"Error while extracting data from Oracle: {e}")
-        return pd.DataFrame()
+        return failed_extraction(e)
+
+def _apply_dtypes(df, dtypes):
+    """
+    Casts the columns of a chunk to explicit dtypes.
+
+    Args:
+        df (pd.DataFrame): Chunk of extracted rows.
+        dtypes (dict): Mapping of column name to dtype; columns not in the chunk are ignored.
+
+    Returns:
+        pd.DataFrame: Chunk with the requested dtypes.
+    """
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            continue
+        if str(dtype).startswith("datetime64"):
+            # The shared parser handles every format in the chunk, not just one inferred from its first value
+            df[column] = data_transformation.parse_dates(df[column]).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+def stream_query(connection_string, table, columns=None, dtypes=None, chunk_size=DEFAULT_CHUNK_SIZE, connect=None,
+                 dialect="sqlserver"):
+    """
+    Streams a table as DataFrame chunks using cursor.fetchmany.
+
+    Rows are pulled from the driver one chunk at a time, so peak memory is bounded by the chunk
+    size rather than the table size. pyodbc reads SQL Server and Oracle results as a forward-only
+    stream, so the full result set is never buffered client-side.
 
-def extract_from_iot():
+    Args:
+        connection_string (str): ODBC connection string.
+        table (str): Table to read.
+        columns (list, optional): Columns to project; all columns when omitted.
+        dtypes (dict, optional): Explicit dtypes applied to each chunk. Defaults to STREAM_DTYPES.
+        chunk_size (int): Number of rows per chunk.
+        connect (callable, optional): Connection factory taking the connection string.
+            Defaults to pyodbc.connect; any DB-API driver such as sqlite3.connect works.
+        dialect (str): "sqlserver" or "oracle", for quoting column names.
+
+    Yields:
+        pd.DataFrame: Chunks of at most chunk_size rows.
+    """
+    dtypes = STREAM_DTYPES if dtypes is None else dtypes
+    for name in [table] + list(columns or []):
+        if not SQL_IDENTIFIER_PATTERN.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+    column_list = ", ".join(quote_identifier(column, dialect) for column in columns) if columns else "*"
+
+    with database_connection(connection_string, connect) as conn:
+        cursor = conn.cursor()
+        # Closed also when a chunk fails or the consumer stops iterating early
+        try:
+            cursor.execute(f"SELECT {column_list} FROM {table}")
+            names = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunk = pd.DataFrame.from_records([tuple(row) for row in rows], columns=names)
+                yield _apply_dtypes(chunk, dtypes)
+        finally:
+            cursor.close()
+
+def stream_from_sql_server(chunk_size=DEFAULT_CHUNK_SIZE, columns=INVENTORY_COLUMNS, dtypes=None):
+    """
+    Streams the SQL Server Inventory table in chunks.
+
+    Args:
+        chunk_size (int): Number of rows per chunk.
+        columns (list, optional): Columns to project.
+        dtypes (dict, optional): Explicit dtypes applied to each chunk.
+
+    Yields:
+        pd.DataFrame: Chunks of inventory rows.
+    """
+    yield from stream_query(SQL_SERVER_CONNECTION_STRING, "Inventory", columns, dtypes, chunk_size)
+
+def stream_from_oracle(chunk_size=DEFAULT_CHUNK_SIZE, columns=ORDERS_COLUMNS, dtypes=None):
+    """
+    Streams the Oracle Orders table in chunks.
+
+    Args:
+        chunk_size (int): Number of rows per chunk.
+        columns (list, optional): Columns to project.
+        dtypes (dict, optional): Explicit dtypes applied to each chunk.
+
+    Yields:
+        pd.DataFrame: Chunks of order rows.
+    """
+    yield from stream_query(ORACLE_CONNECTION_STRING, "Orders", columns, dtypes, chunk_size, dialect="oracle")
+
+@instrument
+def extract_from_iot(use_cache=True, request=None):
     """
     Extract data from IoT-enabled devices stored in CSV files.
 
+    Args:
+        use_cache (bool): Read through the parallel, schema-pinned columnar cache of
+            iot_ingestion, parsing only files that have not been ingested yet.
+        request (ExtractionRequest, optional): Columns and filters applied while reading.
+
     Returns:
         pd.DataFrame: Combined data from all IoT device files.
     """
     try:
-        # Load all CSV files in the IoT data directory
+        if use_cache:
+            schema_columns = list(iot_ingestion.IOT_SENSOR_SCHEMA)
+            combined_df = iot_ingestion.ingest_iot_data(
+                IOT_DATA_PATH,
+                columns=None if request is None else request.read_columns(schema_columns),
+                row_filter=None if request is None else request.to_arrow_filter(schema_columns)
+            )
+            if request is not None:
+                combined_df = request.apply(combined_df)
+            print("Data successfully extracted from IoT devices.")
+            return combined_df
+
+        # Load all CSV files in the IoT data directory, reading only the requested columns
         files = [os.path.join(IOT_DATA_PATH, f) for f in os.listdir(IOT_DATA_PATH) if f.endswith('.csv')]
-        dataframes = [pd.read_csv(file) for file in files]
+        if request is None:
+            dataframes = [pd.read_csv(file) for file in files]
+        else:
+            needed = None if request.columns is None else set(request.columns) | set(request.filter_columns())
+            dataframes = [
+                request.apply(pd.read_csv(file, usecols=None if needed is None else lambda column: column in needed))
+                for file in files
+            ]
         combined_df = pd.concat(dataframes, ignore_index=True)
         print("Data successfully extracted from IoT devices.")
         return combined_df
     except Exception as e:
         print(f"Error while extracting data from IoT devices: {e}")
-        return pd.DataFrame()
+        return failed_extraction(e)
 
-def extract_from_flat_files():
+@instrument
+def extract_from_flat_files(request=None, use_cache=True):
     """
     Extract data from flat files (e.g., CSV, Excel).
 
+    Args:
+        request (ExtractionRequest, optional): Columns and filters applied while reading.
+        use_cache (bool): Read through the columnar cache of flat_file_ingestion, converting
+            only workbooks whose content changed since they were cached.
+
     Returns:
         pd.DataFrame: Extracted data in a Pandas DataFrame format.
     """
     try:
-        file_path = os.path.join(FLAT_FILE_PATH, "warehouse_data.xlsx")
-        df = pd.read_excel(file_path)
+        file_paths = [os.path.join(FLAT_FILE_PATH, name) for name in FLAT_FILE_WORKBOOKS]
+        needed = None if request is None or request.columns is None else \
+            list(dict.fromkeys(list(request.columns) + request.filter_columns()))
+        if use_cache:
+            df = flat_file_ingestion.ingest_workbooks(file_paths, FLAT_FILE_SHEETS, columns=needed)
+        else:
+            df = pd.concat([
+                pd.read_excel(file_path, sheet_name=sheet, usecols=None if needed is None else lambda column: column in needed)
+                for file_path in file_paths for sheet in (FLAT_FILE_SHEETS or pd.ExcelFile(file_path).sheet_names)
+            ], ignore_index=True)
+        if request is not None:
+            df = request.apply(df)
         print("Data successfully extracted from flat files.")
         return df
     except Exception as e:
         print(f"Error while extracting data from flat files: {e}")
-        return pd.DataFrame()
+        return failed_extraction(e)
+
+def load_watermarks(path=WATERMARK_STATE_PATH):
+    """
+    Loads the persisted high-water marks of the incremental extraction.
+
+    Args:
+        path (str): Path of the watermark state file.
+
+    Returns:
+        dict: Mapping of source name to its last high-water mark; empty on the first run.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_watermarks(watermarks, path=WATERMARK_STATE_PATH):
+    """
+    Persists high-water marks atomically, so a crash never leaves a half-written state file.
+
+    Args:
+        watermarks (dict): Mapping of source name to high-water mark.
+        path (str): Path of the watermark state file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(temp_path, path)
+
+def _serialize_watermark(value):
+    """
+    Converts a watermark value into a JSON-serializable query parameter.
+
+    Args:
+        value: Maximum of the watermark column (timestamp or integer row version).
+
+    Returns:
+        str or int: ISO timestamp string or integer.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value, "big")
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value.item() if hasattr(value, "item") else value
+
+@instrument
+def extract_changed_groups(connection_string, table, watermark_column, watermark=None, connect=None,
+                           dialect="sqlserver"):
+    """
+    Extracts every row of the (warehouse_id, date) groups that changed since the watermark.
+
+    Returning whole groups rather than only the changed rows lets the transformation stage
+    re-aggregate each affected group exactly, including groups whose rows were updated.
+
+    Args:
+        connection_string (str): ODBC connection string.
+        table (str): Table to read.
+        watermark_column (str): Timestamp or row-version column that tracks changes.
+        watermark (optional): Last high-water mark; the full table is read when None.
+        connect (callable, optional): Connection factory. Defaults to pyodbc.connect.
+        dialect (str): "sqlserver" or "oracle", for quoting column names.
+
+    Returns:
+        tuple: (pd.DataFrame, new watermark) rows of the affected groups and the new high-water mark.
+    """
+    if watermark is None:
+        query = f"SELECT * FROM {table}"
+        params = []
+    else:
+        for name in [table, watermark_column]:
+            if not SQL_IDENTIFIER_PATTERN.match(name):
+                raise ValueError(f"Invalid SQL identifier: {name!r}")
+        warehouse, date, changed = (quote_identifier(column, dialect) for column in ["warehouse_id", "date", watermark_column])
+        query = f"""
+        SELECT t.* FROM {table} t
+        WHERE EXISTS (
+            SELECT 1 FROM {table} d
+            WHERE d.{warehouse} = t.{warehouse} AND d.{date} = t.{date} AND d.{changed} > ?
+        )
+        """
+        # Timestamp watermarks are stored as ISO strings; bind them as datetimes, as to_sql does, since
+        # comparing a date column with a string depends on the session's date format. Row versions stay integers.
+        params = [pd.Timestamp(watermark).to_pydatetime() if isinstance(watermark, str) else watermark]
+
+    with database_connection(connection_string, connect) as conn:
+        df = pd.read_sql(query, conn, params=params)
+
+    if df.empty:
+        return df, watermark
+    return df, _serialize_watermark(df[watermark_column].max())
+
+@instrument
+def extract_new_iot_files(watermark=None):
+    """
+    Extracts IoT files modified after the watermark.
+
+    IoT drops are treated as immutable, append-only files, so only new files are read.
+
+    Args:
+        watermark (float, optional): Largest file modification time seen in the previous run.
+
+    Returns:
+        tuple: (pd.DataFrame, float) rows from new files and the new high-water mark.
+    """
+    files = [os.path.join(IOT_DATA_PATH, f) for f in os.listdir(IOT_DATA_PATH) if f.endswith('.csv')]
+    mtimes = {file: os.path.getmtime(file) for file in files}
+    new_files = sorted(file for file, mtime in mtimes.items() if watermark is None or mtime > watermark)
+
+    if not new_files:
+        return pd.DataFrame(), watermark
+    df = pd.concat([iot_ingestion.read_sensor_file(file) for file in new_files], ignore_index=True)
+    return df, max(mtimes[file] for file in new_files)
+
+@instrument
+def extract_changed_flat_files(watermark=None):
+    """
+    Extracts the flat files again only if one was modified after the watermark.
+
+    Args:
+        watermark (float, optional): File modification time seen in the previous run.
+
+    Returns:
+        tuple: (pd.DataFrame, float) the full flat files, or an empty DataFrame if unchanged,
+            and the new high-water mark.
+    """
+    file_paths = [os.path.join(FLAT_FILE_PATH, name) for name in FLAT_FILE_WORKBOOKS]
+    mtime = max(os.path.getmtime(file_path) for file_path in file_paths)
+    if watermark is not None and mtime <= watermark:
+        return pd.DataFrame(), watermark
+    return flat_file_ingestion.ingest_workbooks(file_paths, FLAT_FILE_SHEETS), mtime
+
+@instrument
+def extract_incremental(watermarks=None):
+    """
+    Extracts only data that is new or changed since the last run.
+
+    The new watermarks are returned rather than saved, so the caller can persist them with
+    save_watermarks only once the deltas have been materialized downstream.
+
+    Args:
+        watermarks (dict, optional): Previous high-water marks. Defaults to the persisted state.
+
+    Returns:
+        tuple: (dict, dict) mapping of source name to delta DataFrame, and the new watermarks.
+    """
+    watermarks = load_watermarks() if watermarks is None else watermarks
+    deltas = {}
+    new_watermarks = dict(watermarks)
+
+    deltas["sql_server"], new_watermarks["sql_server"] = extract_changed_groups(
+        SQL_SERVER_CONNECTION_STRING, "Inventory", SQL_SERVER_WATERMARK_COLUMN, watermarks.get("sql_server")
+    )
+    deltas["oracle"], new_watermarks["oracle"] = extract_changed_groups(
+        ORACLE_CONNECTION_STRING, "Orders", ORACLE_WATERMARK_COLUMN, watermarks.get("oracle"), dialect="oracle"
+    )
+    deltas["iot"], new_watermarks["iot"] = extract_new_iot_files(watermarks.get("iot"))
+    deltas["flat_files"], new_watermarks["flat_files"] = extract_changed_flat_files(watermarks.get("flat_files"))
+
+    print("Incremental extraction completed. Delta sizes:",
+          {name: len(delta) for name, delta in deltas.items()})
+    return deltas, new_watermarks
+
+# Extraction functions by source name, in the order their results are combined
+EXTRACTION_SOURCES = {
+    "sql_server": extract_from_sql_server,
+    "oracle": extract_from_oracle,
+    "iot": extract_from_iot,
+    "flat_files": extract_from_flat_files
+}
+
+def _timed_extraction(function):
+    """
+    Runs an extraction function and measures how long it took.
+
+    Args:
+        function (callable): Extraction function taking no arguments.
+
+    Returns:
+        tuple: (pd.DataFrame, float) extracted data and elapsed seconds.
+    """
+    start_time = time.perf_counter()
+    df = function()
+    return df, time.perf_counter() - start_time
+
+@instrument
+def extract_all(sources=None, timeouts=None, max_workers=None, request=None):
+    """
+    Extracts data from all sources concurrently on a thread pool.
+
+    Each source runs in its own worker, so total extraction time is bounded by the slowest
+    source rather than the sum of all of them. A source that exceeds its timeout is reported
+    as timed out and contributes an empty DataFrame; its worker thread cannot be interrupted
+    and is left to finish in the background without blocking the other sources. A source whose
+    function raises, or returns a failed_extraction result, is reported as an error.
+
+    Args:
+        sources (dict, optional): Mapping of source name to extraction function.
+            Defaults to EXTRACTION_SOURCES.
+        timeouts (dict, optional): Per-source timeouts in seconds. Defaults to SOURCE_TIMEOUTS;
+            sources without an entry wait indefinitely.
+        max_workers (int, optional): Size of the thread pool. Defaults to one thread per source.
+        request (ExtractionRequest, optional): Columns and filters pushed down into every
+            source; each extraction function must then accept a `request` keyword.
+
+    Returns:
+        tuple: (dict, dict) mapping of source name to extracted DataFrame, and mapping of
+            source name to {"seconds": float, "status": "ok" | "timeout" | "error"}.
+    """
+    sources = EXTRACTION_SOURCES if sources is None else sources
+    timeouts = SOURCE_TIMEOUTS if timeouts is None else timeouts
+    if request is not None:
+        sources = {name: functools.partial(function, request=request) for name, function in sources.items()}
+
+    data = {}
+    timings = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers or max(len(sources), 1))
+    try:
+        started = time.perf_counter()
+        futures = {submit_with_context(executor, _timed_extraction, function): name for name, function in sources.items()}
+        deadlines = {
+            future: started + timeouts[name]
+            for future, name in futures.items() if timeouts.get(name) is not None
+        }
+
+        pending = set(futures)
+        while pending:
+            next_deadline = min((deadlines[f] for f in pending if f in deadlines), default=None)
+            wait_time = None if next_deadline is None else max(next_deadline - time.perf_counter(), 0)
+            done, pending = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                try:
+                    data[name], seconds = future.result()
+                    # Extraction functions report failures as a marked empty DataFrame
+                    timings[name] = {"seconds": seconds, "status": "error" if extraction_error(data[name]) else "ok"}
+                except Exception as e:
+                    print(f"Error while extracting data from {name}: {e}")
+                    data[name] = pd.DataFrame()
+                    timings[name] = {"seconds": time.perf_counter() - started, "status": "error"}
+
+            now = time.perf_counter()
+            for future in [f for f in pending if f in deadlines and deadlines[f] <= now]:
+                name = futures[future]
+                print(f"Extraction from {name} timed out after {timeouts[name]} seconds.")
+                data[name] = pd.DataFrame()
+                timings[name] = {"seconds": now - started, "status": "timeout"}
+                pending.discard(future)
+    finally:
+        # Do not wait for timed-out sources
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Keep results in source order so the combined dataset is deterministic
+    data = {name: data[name] for name in sources}
+    timings = {name: timings[name] for name in sources}
+    print("Concurrent extraction completed.")
+    return data, timings
 
 if __name__ == "__main__":
     # Example usage
-    sql_data = extract_from_sql_server()
-    oracle_data = extract_from_oracle()
-    iot_data = extract_from_iot()
-    flat_file_data = extract_from_flat_files()
-
-    # Combine all data into a single DataFrame for further processing
-    combined_data = pd.concat([sql_data, oracle_data, iot_data, flat_file_data], ignore_index=True)
-    print("Data extraction completed. Combined dataset size:", combined_data.shape)
+    source_data, source_timings = extract_all()
+    for source_name, timing in source_timings.items():
+        print(f"{source_name}: {timing['status']} in {timing['seconds']:.2f} seconds")
+
+    # Map each source to its canonical schema and join them into a dense (warehouse_id, date) fact table
+    import data_unification
+    fact_table = data_unification.unify_sources(source_data)
+    print("Data extraction completed. Fact table size:", fact_table.shape)
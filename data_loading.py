@@ -6,9 +6,12 @@ It includes connection setup, schema definition, and batch loading for optimized
 Author: Satej
 """
 
-import snowflake.connector  # Snowflake connection library
-from snowflake.connector.pandas_tools import write_pandas  # For Pandas DataFrame loading
 import pandas as pd  # For handling data
+import os  # For handling file paths
+import tempfile  # For staging Parquet files locally
+from concurrent.futures import ThreadPoolExecutor  # For parallel file uploads
+from connection_pool import pooled_connection  # For reusing warm Snowflake sessions
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
 
 # Snowflake connection credentials (replace with secure access in production)
 SNOWFLAKE_CONFIG = {
@@ -20,6 +23,31 @@ SNOWFLAKE_CONFIG = {
     "schema": "PUBLIC"
 }
 
+# Bulk loading: target size of each staged Parquet file, upload parallelism and natural key
+BULK_TARGET_FILE_MB = 128
+BULK_UPLOAD_WORKERS = 8
+NATURAL_KEY_COLUMNS = ["warehouse_id", "date"]
+
+# Snowflake target table of the pipeline's loading stage and the columns loaded into it
+WAREHOUSE_TABLE_NAME = "WAREHOUSE_ANALYTICS"
+WAREHOUSE_TABLE_COLUMNS = ["warehouse_id", "date", "total_quantity", "average_order_value"]
+WAREHOUSE_TABLE_SCHEMA = """
+    warehouse_id VARCHAR,
+    date DATE,
+    total_quantity INT,
+    average_order_value FLOAT
+"""
+
+def _snowflake_connector():
+    """
+    Imports the Snowflake connector on first use, so importing this module does not load it.
+
+    Returns:
+        module: snowflake.connector.
+    """
+    import snowflake.connector  # Snowflake connection library
+    return snowflake.connector
+
 def connect_to_snowflake():
     """
     Establishes a connection to the Snowflake data warehouse.
@@ -28,13 +56,60 @@ def connect_to_snowflake():
         snowflake.connector.connection.SnowflakeConnection: Active Snowflake connection.
     """
     try:
-        conn = snowflake.connector.connect(**SNOWFLAKE_CONFIG)
+        conn = _snowflake_connector().connect(**SNOWFLAKE_CONFIG)
         print("Connected to Snowflake successfully.")
         return conn
     except Exception as e:
         print(f"Error connecting to Snowflake: {e}")
         return None
 
+def _snowflake_dsn(config):
+    """
+    Builds the key identifying a Snowflake pool, without credentials.
+
+    Args:
+        config (dict): Snowflake connection settings.
+
+    Returns:
+        str: Pool key.
+    """
+    return f"snowflake://{config['user']}@{config['account']}/{config['database']}/{config['schema']}?warehouse={config['warehouse']}"
+
+class _SnowflakeConnect:
+    """
+    Connection factory for a Snowflake configuration. Factories of equal configurations compare
+    equal, so every call with the same settings shares one pool.
+
+    Args:
+        config (dict): Snowflake connection settings.
+    """
+
+    def __init__(self, config):
+        self.config = dict(config)
+
+    def __call__(self, dsn):
+        return _snowflake_connector().connect(**self.config)
+
+    def __eq__(self, other):
+        return isinstance(other, _SnowflakeConnect) and self.config == other.config
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.config.items())))
+
+def snowflake_connection(config=None):
+    """
+    Checks out a pooled Snowflake connection, reusing a warm session when one is idle.
+
+    Args:
+        config (dict, optional): Snowflake connection settings. Defaults to SNOWFLAKE_CONFIG.
+
+    Returns:
+        Context manager yielding a SnowflakeConnection from the shared pool.
+    """
+    config = SNOWFLAKE_CONFIG if config is None else config
+    return pooled_connection(_snowflake_dsn(config), _SnowflakeConnect(config))
+
+@instrument
 def create_table_if_not_exists(conn, table_name, schema):
     """
     Creates a table in Snowflake if it does not already exist.
@@ -56,6 +131,7 @@ def create_table_if_not_exists(conn, table_name, schema):
     except Exception as e:
         print(f"Error creating table '{table_name}': {e}")
 
+@instrument
 def load_data_to_snowflake(conn, df, table_name):
     """
     Loads a Pandas DataFrame into a Snowflake table.
@@ -66,6 +142,7 @@ def load_data_to_snowflake(conn, df, table_name):
         table_name (str): Name of the table in Snowflake.
     """
     try:
+        from snowflake.connector.pandas_tools import write_pandas  # For Pandas DataFrame loading
         success, num_rows, _ = write_pandas(conn, df, table_name.upper())
         if success:
             print(f"Data successfully loaded to Snowflake table '{table_name}'. Rows inserted: {num_rows}")
@@ -74,15 +151,151 @@ def load_data_to_snowflake(conn, df, table_name):
     except Exception as e:
         print(f"Error loading data to Snowflake: {e}")
 
+@instrument
+def split_to_parquet_files(df, directory, target_file_mb=BULK_TARGET_FILE_MB, compression="snappy"):
+    """
+    Splits a DataFrame into compressed Parquet files of roughly the target size.
+
+    The first file is sized from the in-memory row size, which overestimates the compressed
+    size; the remaining files are sized from the first file's actual bytes per row.
+
+    Args:
+        df (pd.DataFrame): DataFrame to split.
+        directory (str): Directory to write the files to.
+        target_file_mb (int): Target file size in megabytes.
+        compression (str): Parquet compression codec.
+
+    Returns:
+        list: Paths of the written Parquet files.
+    """
+    # Write datetimes as Parquet DATE values so they map onto DATE columns
+    df = df.assign(**{
+        column: df[column].dt.date
+        for column in df.columns if pd.api.types.is_datetime64_any_dtype(df[column])
+    })
+
+    target_bytes = target_file_mb * 1024 * 1024
+    bytes_per_row = max(df.memory_usage(deep=True).sum() / max(len(df), 1), 1)
+    rows_per_file = max(int(target_bytes / bytes_per_row), 1)
+
+    file_paths = []
+    start = 0
+    while start < len(df):
+        file_path = os.path.join(directory, f"part_{len(file_paths):05d}.parquet")
+        rows = df.iloc[start:start + rows_per_file]
+        rows.to_parquet(file_path, index=False, compression=compression)
+        file_paths.append(file_path)
+        start += len(rows)
+
+        # Re-estimate from the first file's actual compressed size
+        if len(file_paths) == 1:
+            compressed_bytes_per_row = max(os.path.getsize(file_path) / len(rows), 1e-3)
+            rows_per_file = max(int(target_bytes / compressed_bytes_per_row), 1)
+    return file_paths
+
+def _upload_file(conn, file_path, stage_name):
+    """
+    Uploads one file to a Snowflake stage on its own cursor.
+
+    Args:
+        conn (SnowflakeConnection): Active Snowflake connection.
+        file_path (str): Local file to upload.
+        stage_name (str): Name of the target stage.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"PUT 'file://{file_path}' @{stage_name} AUTO_COMPRESS = FALSE OVERWRITE = TRUE")
+    finally:
+        cursor.close()
+
+def build_merge_statement(target_table, source_table, columns, key_columns=NATURAL_KEY_COLUMNS):
+    """
+    Builds a MERGE statement that upserts rows from a staging table on the natural key.
+
+    Args:
+        target_table (str): Table to merge into.
+        source_table (str): Staging table holding the new rows.
+        columns (list): All columns to load.
+        key_columns (list): Columns forming the natural key.
+
+    Returns:
+        str: MERGE statement.
+    """
+    on_clause = " AND ".join(f"t.{column} = s.{column}" for column in key_columns)
+    # SET targets are unqualified, as standard SQL requires
+    update_clause = ", ".join(f"{column} = s.{column}" for column in columns if column not in key_columns)
+    insert_columns = ", ".join(columns)
+    insert_values = ", ".join(f"s.{column}" for column in columns)
+
+    statement = f"MERGE INTO {target_table} t USING {source_table} s ON {on_clause}"
+    if update_clause:
+        statement += f" WHEN MATCHED THEN UPDATE SET {update_clause}"
+    statement += f" WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values})"
+    return statement
+
+@instrument
+def bulk_load_to_snowflake(conn, df, table_name, key_columns=NATURAL_KEY_COLUMNS,
+                           target_file_mb=BULK_TARGET_FILE_MB, max_workers=BULK_UPLOAD_WORKERS):
+    """
+    Loads a DataFrame into Snowflake through a stage and upserts it on the natural key.
+
+    The frame is split into compressed Parquet files that are uploaded to a temporary stage in
+    parallel, copied into a temporary table with a single COPY INTO, and merged into the target.
+    Re-running a load updates existing (warehouse_id, date) rows instead of appending duplicates.
+
+    Args:
+        conn (SnowflakeConnection): Active Snowflake connection.
+        df (pd.DataFrame): DataFrame to load.
+        table_name (str): Name of the table in Snowflake.
+        key_columns (list): Columns forming the natural key.
+        target_file_mb (int): Target size of each staged Parquet file in megabytes.
+        max_workers (int): Number of parallel file uploads.
+
+    Returns:
+        bool: True if the load succeeded.
+    """
+    stage_name = f"{table_name}_STAGE"
+    staging_table = f"{table_name}_STAGING"
+    try:
+        # MERGE requires at most one source row per key
+        df = df.drop_duplicates(subset=key_columns, keep="last")
+        columns = list(df.columns)
+
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE TEMPORARY STAGE IF NOT EXISTS {stage_name} FILE_FORMAT = (TYPE = PARQUET)")
+        cursor.execute(f"REMOVE @{stage_name}")
+
+        with tempfile.TemporaryDirectory() as directory:
+            file_paths = split_to_parquet_files(df, directory, target_file_mb)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(lambda file_path: _upload_file(conn, file_path, stage_name), file_paths))
+
+        cursor.execute(f"CREATE OR REPLACE TEMPORARY TABLE {staging_table} LIKE {table_name}")
+        cursor.execute(
+            f"COPY INTO {staging_table} FROM @{stage_name} "
+            "FILE_FORMAT = (TYPE = PARQUET) MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE PURGE = TRUE"
+        )
+        cursor.execute(build_merge_statement(table_name, staging_table, columns, key_columns))
+        # MERGE reports rows inserted, then rows updated when an update clause is present
+        merge_counts = cursor.fetchone()
+        inserted = merge_counts[0]
+        updated = merge_counts[1] if len(merge_counts) > 1 else 0
+        cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+        print(f"Data successfully merged into Snowflake table '{table_name}' from {len(file_paths)} file(s). "
+              f"Rows inserted: {inserted}, rows updated: {updated}")
+        return True
+    except Exception as e:
+        print(f"Error bulk loading data to Snowflake: {e}")
+        return False
+
 if __name__ == "__main__":
     # Example usage
     transformed_data_path = "/home/satej/data/transformed_data.csv"
     transformed_data = pd.read_csv(transformed_data_path)
 
-    # Connect to Snowflake
-    connection = connect_to_snowflake()
-
-    if connection:
+    # Borrow a pooled Snowflake connection; it is returned to the pool afterwards
+    with snowflake_connection() as connection:
         # Define table schema (adjust as per your data)
         table_name = "WAREHOUSE_ANALYTICS"
         schema = """
@@ -95,8 +308,5 @@ if __name__ == "__main__":
         # Ensure table exists
         create_table_if_not_exists(connection, table_name, schema)
 
-        # Load data
-        load_data_to_snowflake(connection, transformed_data, table_name)
-
-        # Close connection
-        connection.close()
+        # Load data; re-runs upsert on (warehouse_id, date) instead of appending duplicates
+        bulk_load_to_snowflake(connection, transformed_data, table_name)
@@ -3,54 +3,309 @@ data_transformation.py
 
 This module handles data cleaning and transformation, including handling inconsistencies,
 normalizing formats, and aggregating metrics for warehouse analytics.
+Both functions accept either a DataFrame or an iterable of DataFrame chunks (for example from
+data_extraction.stream_from_oracle), so large tables can be processed at constant memory.
 Author: Satej
 """
 
 import pandas as pd  # For data manipulation
 import numpy as np  # For numerical computations
+import os  # For handling the aggregate state file
+import glob  # For expanding Parquet file patterns
+from concurrent.futures import ProcessPoolExecutor  # For partitioned aggregation
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
 
-def clean_data(df):
+# Grouping keys for the daily aggregation
+GROUP_KEYS = ['warehouse_id', 'date']
+
+# Dtype plan for the cleaning stage: rows missing any essential column are dropped, IDs become
+# categoricals, other integer columns are downcast, and dates are parsed with explicit formats
+ESSENTIAL_COLUMNS = ['product_id', 'warehouse_id', 'quantity']
+ID_COLUMNS = ['warehouse_id', 'product_id']
+MEASURE_COLUMNS = ['quantity', 'order_value']
+
+# Date formats of the sources, tried in order on the values the previous formats could not parse.
+# Values with a UTC offset are converted to UTC; parsed dates are timezone-naive DATE_DTYPE.
+DATE_FORMATS = ["ISO8601", "%m/%d/%Y"]
+DATE_DTYPE = "datetime64[us]"
+
+# Raw columns the cleaning and aggregation use; extraction can push this projection down to the sources
+INPUT_COLUMNS = ['warehouse_id', 'product_id', 'date', 'quantity', 'order_value']
+
+# Incremental mode: materialized per-source partial aggregates, and how each source's delta is merged.
+# "replace" deltas contain every row of the groups they touch, "append" deltas only new rows,
+# and "full" deltas are a complete reload of the source.
+AGGREGATE_STATE_PATH = "/home/satej/data/state/aggregate_partials.pkl"
+INCREMENTAL_MERGE_MODES = {
+    "sql_server": "replace",
+    "oracle": "replace",
+    "iot": "append",
+    "flat_files": "full"
+}
+
+# Execution engines of clean_and_transform. "duckdb" runs the same rules as a multi-threaded
+# query that spills to DUCKDB_SPILL_PATH when the data does not fit in DUCKDB_MEMORY_LIMIT.
+TRANSFORM_ENGINES = ["pandas", "duckdb"]
+DUCKDB_SPILL_PATH = "/home/satej/data/duckdb_spill/"
+DUCKDB_MEMORY_LIMIT = "4GB"
+DUCKDB_THREADS = None  # Defaults to one thread per core
+DEFAULT_BATCH_ROWS = 1000000
+
+def parse_dates(values, formats=DATE_FORMATS):
     """
-    Cleans the input DataFrame by handling missing values, standardizing formats, and normalizing units.
+    Parses a column of dates with explicit formats, normalizing UTC offsets.
+
+    Each format is applied only to the values the formats before it could not parse. Values with
+    an offset are converted to UTC and all dates are returned timezone-naive, so naive and
+    offset-bearing values can be mixed. Values no format matches become NaT and are counted.
+    Columns that already hold dates are kept, with timezone-aware ones converted to naive UTC.
+
+    Args:
+        values (pd.Series): Raw date values.
+        formats (list): Formats accepted by pd.to_datetime, e.g. "ISO8601" or "%m/%d/%Y".
+
+    Returns:
+        pd.Series: Parsed dates, DATE_DTYPE for parsed values.
+    """
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        return values.dt.tz_convert("UTC").dt.tz_localize(None)
+    if pd.api.types.is_datetime64_dtype(values):
+        return values
+
+    parsed = np.full(len(values), np.datetime64("NaT"), dtype=DATE_DTYPE)
+    pending = values.notna().to_numpy(copy=True)
+    for date_format in formats:
+        positions = np.flatnonzero(pending)
+        if len(positions) == 0:
+            break
+        attempt = pd.to_datetime(values.iloc[positions], format=date_format, errors='coerce', utc=True)
+        attempt = attempt.dt.tz_localize(None).to_numpy(dtype=DATE_DTYPE)
+        matched = ~np.isnat(attempt)
+        parsed[positions[matched]] = attempt[matched]
+        pending[positions[matched]] = False
+
+    unparsed = int(pending.sum())
+    if unparsed:
+        print(f"{unparsed} date value(s) in '{values.name}' match none of the formats {formats}; set to NaT.")
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+def _clean_frame(df, date_formats=DATE_FORMATS):
+    """
+    Applies the cleaning rules and the dtype plan to a single DataFrame in one column-wise pass.
+
+    Rows missing essential values are dropped with a single boolean mask while each column is
+    converted, so the only copy made is the cleaned output itself.
 
     Args:
         df (pd.DataFrame): Raw data to be cleaned.
+        date_formats (list): Formats used to parse the date column, see parse_dates.
 
     Returns:
         pd.DataFrame: Cleaned data.
     """
+    # Drop rows with missing essential values
+    keep = df[ESSENTIAL_COLUMNS].notna().all(axis=1).to_numpy()
+    drop_rows = not keep.all()
+
+    cleaned = {}
+    for column in df.columns:
+        values = df[column]
+        if drop_rows:
+            values = values[keep]
+
+        if column in ID_COLUMNS:
+            # Encode IDs as categoricals instead of Python-object strings
+            values = values.astype('category')
+        elif column == 'date':
+            # Standardize date formats
+            values = parse_dates(values, date_formats)
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            # Fill missing numeric columns with 0
+            if values.hasnans:
+                values = values.fillna(0)
+            # Measures keep 64-bit precision so sums cannot overflow and means are unchanged
+            if column not in MEASURE_COLUMNS and pd.api.types.is_integer_dtype(values):
+                values = pd.to_numeric(values, downcast='integer')
+        cleaned[column] = values
+
+    return pd.DataFrame(cleaned, index=df.index[keep] if drop_rows else df.index)
+
+def _clean_chunks(chunks):
+    """
+    Lazily cleans an iterable of DataFrame chunks.
+
+    Errors are not caught here: they propagate to the consumer, so a bad chunk fails the whole
+    stream instead of ending it early with only the chunks before it.
+
+    Args:
+        chunks (iterable): DataFrame chunks of raw data.
+
+    Yields:
+        pd.DataFrame: Cleaned chunks.
+    """
+    for chunk in chunks:
+        yield _clean_frame(chunk)
+    print("Data cleaning completed.")
+
+@instrument
+def clean_data(df):
+    """
+    Cleans the input DataFrame by handling missing values, standardizing formats, and normalizing units.
+
+    Args:
+        df (pd.DataFrame or iterable): Raw data to be cleaned, or an iterable of raw chunks.
+
+    Returns:
+        pd.DataFrame or generator: Cleaned data, or a generator of cleaned chunks when given chunks.
+    """
+    if not isinstance(df, pd.DataFrame):
+        return _clean_chunks(df)
+
     try:
-        # Drop rows with missing essential values
-        df = df.dropna(subset=['product_id', 'warehouse_id', 'quantity'])
-        
-        # Fill missing numeric columns with 0
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        df[numeric_cols] = df[numeric_cols].fillna(0)
-        
-        # Standardize date formats
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        
+        df = _clean_frame(df)
         print("Data cleaning completed.")
         return df
     except Exception as e:
         print(f"Error during data cleaning: {e}")
         return pd.DataFrame()
 
-def transform_data(df):
+def aggregate_partials(df):
+    """
+    Computes mergeable partial aggregates per (warehouse_id, date).
+
+    Sums and counts can be added across chunks, partitions or runs, and the mean is only
+    derived at the end by finalize_partials.
+
+    Args:
+        df (pd.DataFrame): Cleaned data.
+
+    Returns:
+        pd.DataFrame: Partials indexed by (warehouse_id, date) with quantity_sum,
+            order_value_sum and order_value_count columns.
+    """
+    df = df.assign(date=pd.to_datetime(df['date']))
+    return df.groupby(GROUP_KEYS, observed=True).agg(
+        quantity_sum=('quantity', 'sum'),
+        order_value_sum=('order_value', 'sum'),
+        order_value_count=('order_value', 'count')
+    )
+
+def combine_partials(partials_list):
+    """
+    Merges partial aggregates computed over different slices of the data.
+
+    Args:
+        partials_list (list): Partials DataFrames from aggregate_partials.
+
+    Returns:
+        pd.DataFrame: Combined partials indexed by (warehouse_id, date).
+    """
+    combined = pd.concat(partials_list)
+    return combined.groupby(level=GROUP_KEYS, observed=True).sum()
+
+def finalize_partials(partials):
+    """
+    Turns partial aggregates into the transformed output format.
+
+    Args:
+        partials (pd.DataFrame): Partials indexed by (warehouse_id, date).
+
+    Returns:
+        pd.DataFrame: Data with total_quantity and average_order_value per (warehouse_id, date).
+    """
+    aggregated_df = pd.DataFrame({
+        'total_quantity': partials['quantity_sum'],
+        'average_order_value': partials['order_value_sum'] / partials['order_value_count']
+    })
+    return aggregated_df.reset_index()
+
+def _transform_chunks(chunks):
+    """
+    Aggregates an iterable of cleaned chunks while holding only one chunk and the running
+    partial aggregates in memory.
+
+    Args:
+        chunks (iterable): Cleaned DataFrame chunks.
+
+    Returns:
+        pd.DataFrame: Transformed data with aggregated metrics.
+    """
+    running = None
+    for chunk in chunks:
+        partials = aggregate_partials(chunk)
+        running = partials if running is None else combine_partials([running, partials])
+
+    if running is None:
+        return pd.DataFrame(columns=GROUP_KEYS + ['total_quantity', 'average_order_value'])
+    return finalize_partials(running)
+
+def partition_by_warehouse(df, partitions):
+    """
+    Hash-partitions rows by warehouse_id, so every (warehouse_id, date) group lands in exactly
+    one partition.
+
+    Args:
+        df (pd.DataFrame): Cleaned data.
+        partitions (int): Number of partitions.
+
+    Returns:
+        list: Non-empty DataFrame partitions.
+    """
+    buckets = pd.util.hash_pandas_object(df['warehouse_id'], index=False).to_numpy() % partitions
+    return [part for part in (df[buckets == bucket] for bucket in range(partitions)) if not part.empty]
+
+def _transform_partitioned(df, partitions, max_workers=None):
+    """
+    Aggregates hash partitions of the data on a process pool and combines their partials.
+
+    Because partitions never share a group, combining is a concatenation and each group's sum
+    and count are computed exactly as a single-process groupby would compute them.
+
+    Args:
+        df (pd.DataFrame): Cleaned data.
+        partitions (int): Number of hash partitions.
+        max_workers (int, optional): Number of worker processes. Defaults to the partition count.
+
+    Returns:
+        pd.DataFrame: Transformed data with aggregated metrics.
+    """
+    parts = partition_by_warehouse(df, partitions)
+    if not parts:
+        return pd.DataFrame(columns=GROUP_KEYS + ['total_quantity', 'average_order_value'])
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(parts)) as executor:
+        partials = list(executor.map(aggregate_partials, parts))
+    return finalize_partials(pd.concat(partials).sort_index())
+
+@instrument
+def transform_data(df, partitions=None, max_workers=None):
     """
     Transforms the cleaned DataFrame by aggregating data and deriving key metrics.
 
     Args:
-        df (pd.DataFrame): Cleaned data to be transformed.
+        df (pd.DataFrame or iterable): Cleaned data to be transformed, or an iterable of cleaned chunks.
+        partitions (int, optional): When greater than 1, hash-partition by warehouse_id and
+            aggregate the partitions in parallel worker processes. The result is identical to
+            the single-process aggregation.
+        max_workers (int, optional): Number of worker processes for partitioned aggregation.
 
     Returns:
         pd.DataFrame: Transformed data with aggregated metrics.
     """
     try:
+        if not isinstance(df, pd.DataFrame):
+            aggregated_df = _transform_chunks(df)
+            print("Data transformation completed.")
+            return aggregated_df
+
+        if partitions and partitions > 1:
+            aggregated_df = _transform_partitioned(df, partitions, max_workers)
+            print("Data transformation completed.")
+            return aggregated_df
+
         # Aggregate data to daily summaries
         df['date'] = pd.to_datetime(df['date'])
-        aggregated_df = df.groupby(['warehouse_id', 'date']).agg({
+        aggregated_df = df.groupby(['warehouse_id', 'date'], observed=True).agg({
             'quantity': 'sum',
             'order_value': 'mean'
         }).reset_index()
@@ -67,6 +322,299 @@ def transform_data(df):
         print(f"Error during data transformation: {e}")
         return pd.DataFrame()
 
+def _duckdb_connection(memory_limit=DUCKDB_MEMORY_LIMIT, spill_path=DUCKDB_SPILL_PATH, threads=DUCKDB_THREADS):
+    """
+    Opens an in-process DuckDB connection configured for out-of-core execution.
+
+    Args:
+        memory_limit (str): Memory DuckDB may use before spilling, e.g. "4GB".
+        spill_path (str): Directory for spilled intermediate data.
+        threads (int, optional): Worker threads; one per core when omitted.
+
+    Returns:
+        duckdb.DuckDBPyConnection: Open connection.
+    """
+    import duckdb  # Imported here so the pandas engine does not require DuckDB
+
+    os.makedirs(spill_path, exist_ok=True)
+    conn = duckdb.connect()
+    conn.execute(f"SET memory_limit = '{memory_limit}'")
+    conn.execute(f"SET temp_directory = '{spill_path}'")
+    conn.execute("SET preserve_insertion_order = false")
+    if threads:
+        conn.execute(f"SET threads = {int(threads)}")
+    return conn
+
+def _parquet_paths(source):
+    """
+    Expands Parquet file paths and glob patterns into a sorted list of files.
+
+    Args:
+        source (str or list): Parquet file paths or glob patterns.
+
+    Returns:
+        list: File paths.
+    """
+    patterns = [source] if isinstance(source, str) else list(source)
+    return sorted({path for pattern in patterns for path in (glob.glob(pattern) or [pattern])})
+
+def _duckdb_source(conn, source):
+    """
+    Exposes the raw data to DuckDB as the view raw_data without loading it into memory.
+
+    The view adds _source_file and _source_row, which reproduce the row order the pandas
+    engine sees: files in sorted path order, rows in file order.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): Open connection.
+        source (pd.DataFrame, str or list): Raw data, or Parquet file paths or glob patterns.
+
+    Returns:
+        dict: Mapping of column name to DuckDB type.
+    """
+    if isinstance(source, pd.DataFrame):
+        conn.register("raw_frame", source)
+        conn.register("raw_positions", pd.DataFrame({"_source_row": np.arange(len(source))}))
+        conn.execute("""
+            CREATE VIEW raw_data AS
+            SELECT raw_frame.*, '' AS _source_file, raw_positions._source_row
+            FROM raw_frame POSITIONAL JOIN raw_positions
+        """)
+    else:
+        paths = ", ".join("'" + path.replace("'", "''") + "'" for path in _parquet_paths(source))
+        conn.execute(f"""
+            CREATE VIEW raw_data AS
+            SELECT * EXCLUDE (filename, file_row_number), filename AS _source_file, file_row_number AS _source_row
+            FROM read_parquet([{paths}], union_by_name = true, filename = true, file_row_number = true)
+        """)
+    return dict(conn.execute("SELECT column_name, column_type FROM (DESCRIBE raw_data)").fetchall())
+
+def _aggregate_sorted(chunk):
+    """
+    Aggregates complete (warehouse_id, date) groups with the same reductions as transform_data.
+
+    Args:
+        chunk (pd.DataFrame): Cleaned rows, each group complete and in source row order.
+
+    Returns:
+        pd.DataFrame: total quantity and mean order value indexed by (warehouse_id, date).
+    """
+    return chunk.groupby(['warehouse_id', 'date'], sort=False).agg({
+        'quantity': 'sum',
+        'order_value': 'mean'
+    })
+
+def _duckdb_transform(source, memory_limit=DUCKDB_MEMORY_LIMIT, spill_path=DUCKDB_SPILL_PATH, threads=DUCKDB_THREADS,
+                      batch_size=DEFAULT_BATCH_ROWS):
+    """
+    Applies the cleaning rules in DuckDB and streams the cleaned rows to the aggregation.
+
+    DuckDB scans, cleans and sorts the raw data by (warehouse_id, date, source row) on all
+    cores, spilling to disk beyond its memory limit: rows missing an essential column are
+    dropped, unparseable dates discarded and missing order values count as 0. Dates that are
+    not already naive timestamps are parsed by parse_dates, once per distinct raw value, and
+    joined back, so they parse exactly as in the pandas engine and get the same dtype. The
+    sorted rows arrive in batches that are cut at group boundaries, and each group is reduced
+    with the pandas reductions over its rows in source order, so the floating-point results are
+    bit-identical to the pandas engine. Only one batch is held in memory at a time.
+
+    Args:
+        source (pd.DataFrame, str or list): Raw data, or Parquet file paths or glob patterns.
+        memory_limit (str): Memory DuckDB may use before spilling.
+        spill_path (str): Directory for spilled intermediate data.
+        threads (int, optional): Worker threads.
+        batch_size (int): Rows per batch streamed from DuckDB.
+
+    Returns:
+        pd.DataFrame: Transformed data with warehouse_id, date, total_quantity and average_order_value.
+    """
+    conn = _duckdb_connection(memory_limit, spill_path, threads)
+    try:
+        types = _duckdb_source(conn, source)
+
+        if types['date'].upper() in ('TIMESTAMP', 'TIMESTAMP_NS', 'TIMESTAMP_MS', 'TIMESTAMP_S'):
+            # Naive timestamps are kept as they are, with the dtype the pandas engine reads them as
+            sample = source.head(1) if isinstance(source, pd.DataFrame) else conn.execute(
+                "SELECT date FROM raw_data LIMIT 1").df()
+            date_dtype = sample['date'].dtype
+            parsed_date, date_join = "date::TIMESTAMP", ""
+        else:
+            # Strings, dates and timestamps with time zone go through the pandas engine's parser
+            raw_dates = conn.execute(
+                "SELECT DISTINCT date FROM raw_data WHERE date IS NOT NULL").df()['date']
+            date_map = pd.DataFrame({"raw_date": raw_dates, "parsed_date": parse_dates(raw_dates)})
+            conn.register("date_map", date_map)
+            date_dtype = date_map['parsed_date'].dtype
+            parsed_date, date_join = "date_map.parsed_date", "LEFT JOIN date_map ON raw_data.date = date_map.raw_date"
+        essential = " AND ".join(f"{column} IS NOT NULL" for column in ESSENTIAL_COLUMNS)
+
+        # Categories of the cleaned warehouse_id column, including warehouses left without a valid date
+        categories = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT warehouse_id FROM raw_data WHERE {essential} ORDER BY warehouse_id").fetchall()]
+
+        result = conn.execute(f"""
+            SELECT warehouse_id, date, quantity, order_value
+            FROM (
+                SELECT warehouse_id, {parsed_date} AS date, quantity,
+                       COALESCE(order_value, 0) AS order_value, _source_file, _source_row
+                FROM raw_data {date_join}
+                WHERE {essential}
+            )
+            WHERE date IS NOT NULL
+            ORDER BY warehouse_id, date, _source_file, _source_row
+        """)
+        reader = result.to_arrow_reader(batch_size) if hasattr(result, "to_arrow_reader") else result.fetch_record_batch(batch_size)
+
+        partials = []
+        carry = None
+        for batch in reader:
+            chunk = batch.to_pandas()
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+            if chunk.empty:
+                continue
+            # The last group may continue in the next batch, so hold it back
+            last_group = (chunk['warehouse_id'] == chunk['warehouse_id'].iat[-1]) & (chunk['date'] == chunk['date'].iat[-1])
+            carry = chunk[last_group]
+            if not last_group.all():
+                partials.append(_aggregate_sorted(chunk[~last_group]))
+        if carry is not None and not carry.empty:
+            partials.append(_aggregate_sorted(carry))
+    finally:
+        conn.close()
+
+    if not partials:
+        return pd.DataFrame(columns=['warehouse_id', 'date', 'total_quantity', 'average_order_value'])
+
+    aggregated_df = pd.concat(partials).reset_index()
+    aggregated_df.rename(columns={'quantity': 'total_quantity', 'order_value': 'average_order_value'}, inplace=True)
+    aggregated_df['warehouse_id'] = pd.Categorical(aggregated_df['warehouse_id'], categories=categories)
+    aggregated_df['date'] = aggregated_df['date'].astype(date_dtype)
+    return aggregated_df
+
+@instrument
+def clean_and_transform(source, engine="pandas", partitions=None, max_workers=None, **engine_options):
+    """
+    Cleans and aggregates raw data with the selected execution engine.
+
+    Both engines produce identical output. The pandas engine holds the raw data in memory;
+    the duckdb engine cleans and sorts it out of core, spilling to disk beyond its memory limit,
+    and reads Parquet files directly so the raw data never has to fit in memory.
+
+    Args:
+        source (pd.DataFrame, str or list): Raw data, or Parquet file paths or glob patterns.
+        engine (str): "pandas" or "duckdb".
+        partitions (int, optional): Warehouse partitions aggregated in parallel by the pandas engine.
+        max_workers (int, optional): Worker processes of the pandas engine.
+        **engine_options: memory_limit, spill_path, threads and batch_size of the duckdb engine.
+
+    Returns:
+        pd.DataFrame: Transformed data with aggregated metrics.
+    """
+    if engine not in TRANSFORM_ENGINES:
+        raise ValueError(f"Unknown transformation engine '{engine}'; expected one of {TRANSFORM_ENGINES}.")
+
+    if engine == "pandas":
+        raw_data = source if isinstance(source, pd.DataFrame) else \
+            pd.concat([pd.read_parquet(path) for path in _parquet_paths(source)], ignore_index=True)
+        return transform_data(clean_data(raw_data), partitions=partitions, max_workers=max_workers)
+
+    try:
+        aggregated_df = _duckdb_transform(source, **engine_options)
+        print("Data cleaning and transformation completed with the duckdb engine.")
+        return aggregated_df
+    except Exception as e:
+        print(f"Error during duckdb transformation: {e}")
+        return pd.DataFrame()
+
+def load_aggregate_state(path=AGGREGATE_STATE_PATH):
+    """
+    Loads the materialized per-source partial aggregates.
+
+    Args:
+        path (str): Path of the aggregate state file.
+
+    Returns:
+        dict: Mapping of source name to partials DataFrame; empty on the first run.
+    """
+    if not os.path.exists(path):
+        return {}
+    return pd.read_pickle(path)
+
+def save_aggregate_state(state, path=AGGREGATE_STATE_PATH):
+    """
+    Persists the per-source partial aggregates atomically.
+
+    Args:
+        state (dict): Mapping of source name to partials DataFrame.
+        path (str): Path of the aggregate state file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    pd.to_pickle(state, temp_path)
+    os.replace(temp_path, path)
+
+def merge_partials(previous, delta, mode):
+    """
+    Merges the partials of a delta into previously materialized partials.
+
+    Args:
+        previous (pd.DataFrame or None): Materialized partials of the source.
+        delta (pd.DataFrame): Partials computed from the delta rows.
+        mode (str): "replace" to overwrite the affected groups, "append" to add to them,
+            or "full" to replace the whole source.
+
+    Returns:
+        pd.DataFrame: Merged partials indexed by (warehouse_id, date).
+    """
+    if previous is None or mode == "full":
+        return delta
+    if mode == "replace":
+        unaffected = previous[~previous.index.isin(delta.index)]
+        return pd.concat([unaffected, delta]).sort_index()
+    if mode == "append":
+        return combine_partials([previous, delta])
+    raise ValueError(f"Unknown merge mode: {mode}")
+
+@instrument
+def transform_incremental(deltas, state=None, merge_modes=None):
+    """
+    Re-aggregates only the (warehouse_id, date) groups touched by the deltas and merges them
+    into the materialized aggregates, so work is proportional to the delta, not the history.
+
+    Args:
+        deltas (dict): Mapping of source name to delta DataFrame from
+            data_extraction.extract_incremental.
+        state (dict, optional): Materialized partials per source. Defaults to the persisted state.
+        merge_modes (dict, optional): Merge mode per source. Defaults to INCREMENTAL_MERGE_MODES.
+
+    Returns:
+        tuple: (pd.DataFrame, dict) transformed data for all groups, and the updated state to be
+            saved with save_aggregate_state (None if the transformation failed).
+    """
+    state = dict(load_aggregate_state() if state is None else state)
+    merge_modes = INCREMENTAL_MERGE_MODES if merge_modes is None else merge_modes
+
+    try:
+        for source, delta in deltas.items():
+            if delta is None or delta.empty:
+                continue
+            # Sources without order values contribute zeros, as they do after the full-run concat and clean
+            if 'order_value' not in delta.columns:
+                delta = delta.assign(order_value=np.nan)
+            partials = aggregate_partials(_clean_frame(delta))
+            state[source] = merge_partials(state.get(source), partials, merge_modes.get(source, "append"))
+
+        if not state:
+            return pd.DataFrame(columns=GROUP_KEYS + ['total_quantity', 'average_order_value']), state
+
+        aggregated_df = finalize_partials(combine_partials(list(state.values())))
+        print("Incremental data transformation completed.")
+        return aggregated_df, state
+    except Exception as e:
+        print(f"Error during incremental data transformation: {e}")
+        return pd.DataFrame(), None
+
 if __name__ == "__main__":
     # Example usage
     # Load a sample dataset for testing
@@ -81,3 +629,14 @@ if __name__ == "__main__":
 
     print("Transformed data preview:")
     print(transformed_data.head())
+
+    # The same functions consume chunks, keeping memory bounded by the chunk size
+    raw_chunks = pd.read_csv(sample_data_path, chunksize=100000)
+    streamed_data = transform_data(clean_data(raw_chunks))
+    print("Streamed transformation preview:")
+    print(streamed_data.head())
+
+    # Out-of-core: DuckDB reads Parquet files directly and spills to disk beyond its memory limit
+    out_of_core_data = clean_and_transform("/home/satej/data/raw_parquet/*.parquet", engine="duckdb")
+    print("Out-of-core transformation preview:")
+    print(out_of_core_data.head())
@@ -0,0 +1,363 @@
+"""
+flat_file_ingestion.py
+
+This module ingests Excel flat files through a columnar cache. Each workbook sheet is streamed
+row by row with openpyxl in read-only mode and converted once into an uncompressed Arrow IPC file;
+several workbooks and sheets are converted in parallel on a process pool. Cache files are keyed by
+a hash of the workbook's content, so a workbook that was touched but not changed is not converted
+again, and unchanged workbooks load by memory-mapping the cached files instead of re-parsing them.
+Author: Satej
+"""
+
+import os  # For handling file paths
+import json  # For reading and writing the manifest
+import copy  # For detecting manifest changes
+import tempfile  # For per-writer temporary manifest files
+import hashlib  # For workbook content hashes
+from concurrent.futures import ProcessPoolExecutor  # For parallel sheet conversion
+import pandas as pd  # For handling dataframes
+import pyarrow as pa  # For columnar tables
+import pyarrow.feather as feather  # For Arrow IPC files
+from pandas.io.parsers import TextParser  # For the same type inference as pd.read_excel
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
+
+# Columnar cache location and manifest of converted workbooks
+FLAT_FILE_CACHE_PATH = "/home/satej/data/flat_file_cache/"
+FLAT_FILE_MANIFEST_FILE = "manifest.json"
+
+# Block size used when hashing workbook contents
+HASH_BLOCK_BYTES = 1024 * 1024
+
+def file_content_hash(file_path):
+    """
+    Hashes a file's content in blocks.
+
+    Args:
+        file_path (str): Path of the file.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _convert_cell(value):
+    """
+    Converts a cell value the way pd.read_excel does: empty cells become "" (read as missing)
+    and whole-number floats become integers.
+
+    Args:
+        value: Cell value from openpyxl.
+
+    Returns:
+        Converted value.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def stream_sheet_rows(file_path, sheet_name):
+    """
+    Streams the rows of one sheet in openpyxl read-only mode, without loading the workbook into memory.
+
+    Trailing empty cells and trailing empty rows are dropped, as pd.read_excel does.
+
+    Args:
+        file_path (str): Path of the workbook.
+        sheet_name (str): Sheet to read.
+
+    Yields:
+        list: Converted cell values of each row.
+    """
+    import openpyxl  # Excel reader, loaded only when a workbook is actually converted
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        empty_rows = 0
+        for row in workbook[sheet_name].iter_rows(values_only=True):
+            values = [_convert_cell(value) for value in row]
+            while values and values[-1] == "":
+                values.pop()
+            if not values:
+                empty_rows += 1
+                continue
+            # Interior empty rows are kept; only trailing ones are dropped
+            for _ in range(empty_rows):
+                yield []
+            empty_rows = 0
+            yield values
+    finally:
+        workbook.close()
+
+def read_sheet(file_path, sheet_name):
+    """
+    Reads one sheet into a DataFrame with the first row as header.
+
+    Args:
+        file_path (str): Path of the workbook.
+        sheet_name (str): Sheet to read.
+
+    Returns:
+        pd.DataFrame: Sheet data, typed as pd.read_excel would type it.
+    """
+    rows = list(stream_sheet_rows(file_path, sheet_name))
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    return TextParser(rows, header=0).read()
+
+def _arrow_compatible(df):
+    """
+    Casts non-string column names and object columns that mix value types to strings, so the
+    sheet can be stored in Arrow.
+
+    Args:
+        df (pd.DataFrame): Sheet data.
+
+    Returns:
+        pd.DataFrame: Data Arrow can store.
+    """
+    df.columns = [str(column) for column in df.columns]
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+    return df
+
+def _cache_file_name(content_hash, sheet_name):
+    """
+    Builds the name of a sheet's cache file from the workbook content hash.
+
+    Args:
+        content_hash (str): Hash of the workbook content.
+        sheet_name (str): Sheet name.
+
+    Returns:
+        str: Name of the Arrow IPC cache file.
+    """
+    sheet_digest = hashlib.sha1(sheet_name.encode()).hexdigest()[:12]
+    return f"{content_hash[:40]}-{sheet_digest}.arrow"
+
+def _convert_sheet(task):
+    """
+    Converts one sheet into an Arrow IPC cache file. Runs in a worker process.
+
+    Args:
+        task (tuple): (file_path, sheet_name, content_hash, cache_path).
+
+    Returns:
+        tuple: (file_path, sheet_name, sheet manifest entry dict).
+    """
+    file_path, sheet_name, content_hash, cache_path = task
+    cache_file = _cache_file_name(content_hash, sheet_name)
+    df = _arrow_compatible(read_sheet(file_path, sheet_name))
+    # Uncompressed IPC files can be memory-mapped without copying
+    feather.write_feather(df, os.path.join(cache_path, cache_file), compression="uncompressed")
+    return file_path, sheet_name, {"cache_file": cache_file, "rows": len(df)}
+
+def load_manifest(cache_path=FLAT_FILE_CACHE_PATH):
+    """
+    Loads the manifest of converted workbooks.
+
+    Args:
+        cache_path (str): Directory of the columnar cache.
+
+    Returns:
+        dict: Mapping of workbook path to {"size", "mtime", "content_hash", "sheet_names", "sheets"}.
+    """
+    manifest_path = os.path.join(cache_path, FLAT_FILE_MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, cache_path=FLAT_FILE_CACHE_PATH):
+    """
+    Saves the manifest atomically.
+
+    Each save writes its own temporary file, so workers refreshing the same cache concurrently,
+    e.g. shard workers on shared storage, never write to or rename each other's files.
+
+    Args:
+        manifest (dict): Mapping of workbook path to manifest entry.
+        cache_path (str): Directory of the columnar cache.
+    """
+    manifest_path = os.path.join(cache_path, FLAT_FILE_MANIFEST_FILE)
+    fd, temp_path = tempfile.mkstemp(dir=cache_path, prefix=f"{FLAT_FILE_MANIFEST_FILE}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, manifest_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _workbook_entry(file_path, previous):
+    """
+    Builds the manifest entry of a workbook, hashing it only if its size or modification time changed.
+
+    Args:
+        file_path (str): Path of the workbook.
+        previous (dict, optional): Previous manifest entry.
+
+    Returns:
+        dict: Manifest entry; its sheets are kept only if the content hash is unchanged.
+    """
+    stat = os.stat(file_path)
+    if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+        return previous
+
+    content_hash = file_content_hash(file_path)
+    if previous and previous["content_hash"] == content_hash:
+        return dict(previous, size=stat.st_size, mtime=stat.st_mtime)
+
+    import openpyxl  # For listing sheet names, loaded only when a workbook changed
+    workbook = openpyxl.load_workbook(file_path, read_only=True, keep_links=False)
+    try:
+        sheet_names = list(workbook.sheetnames)
+    finally:
+        workbook.close()
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "content_hash": content_hash,
+            "sheet_names": sheet_names, "sheets": {}}
+
+def _select_sheets(sheet_names, sheets):
+    """
+    Resolves requested sheets, given by name or position, into sheet names.
+
+    Args:
+        sheet_names (list): Sheets of the workbook, in order.
+        sheets (list, optional): Sheet names or positions; every sheet when None.
+
+    Returns:
+        list: Sheet names.
+    """
+    if sheets is None:
+        return list(sheet_names)
+    selected = [sheet_names[sheet] if isinstance(sheet, int) else sheet for sheet in sheets]
+    missing = [sheet for sheet in selected if sheet not in sheet_names]
+    if missing:
+        raise ValueError(f"Sheets not found: {missing}")
+    return selected
+
+@instrument
+def refresh_cache(file_paths, sheets=None, cache_path=FLAT_FILE_CACHE_PATH, max_workers=None):
+    """
+    Converts the requested sheets of new or changed workbooks into the columnar cache in
+    parallel, and drops cache entries of workbooks that changed or were removed.
+
+    Args:
+        file_paths (list): Workbook paths.
+        sheets (list, optional): Sheet names or positions to convert; every sheet when None.
+        cache_path (str): Directory of the columnar cache.
+        max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        dict: Updated manifest.
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    manifest = load_manifest(cache_path)
+    loaded = copy.deepcopy(manifest)
+
+    tasks = []
+    for file_path in sorted(file_paths):
+        previous = manifest.get(file_path)
+        entry = _workbook_entry(file_path, previous)
+        if previous and previous["content_hash"] != entry["content_hash"]:
+            for sheet in previous["sheets"].values():
+                _remove_cache_file(cache_path, sheet["cache_file"])
+        manifest[file_path] = entry
+        tasks.extend(
+            (file_path, sheet_name, entry["content_hash"], cache_path)
+            for sheet_name in _select_sheets(entry["sheet_names"], sheets) if sheet_name not in entry["sheets"]
+        )
+
+    # A single sheet is converted in-process; more are spread over a process pool
+    if len(tasks) == 1:
+        results = [_convert_sheet(tasks[0])]
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_convert_sheet, tasks))
+    else:
+        results = []
+    for file_path, sheet_name, sheet_entry in results:
+        manifest[file_path]["sheets"][sheet_name] = sheet_entry
+
+    for file_path in [path for path in manifest if not os.path.exists(path)]:
+        for sheet in manifest.pop(file_path)["sheets"].values():
+            _remove_cache_file(cache_path, sheet["cache_file"])
+
+    # Unchanged caches are not rewritten, so concurrent workers that find the cache warm only read it
+    if manifest != loaded:
+        save_manifest(manifest, cache_path)
+    print(f"Flat-file cache refreshed: {len(tasks)} sheet(s) converted, {len(manifest)} workbook(s) cached.")
+    return manifest
+
+def _remove_cache_file(cache_path, cache_file):
+    """
+    Deletes a cache file if it exists.
+
+    Args:
+        cache_path (str): Directory of the columnar cache.
+        cache_file (str): Name of the cache file.
+    """
+    path = os.path.join(cache_path, cache_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+def read_cache(manifest, file_paths, sheets=None, cache_path=FLAT_FILE_CACHE_PATH, columns=None):
+    """
+    Reads cached sheets by memory-mapping their Arrow IPC files.
+
+    Args:
+        manifest (dict): Manifest of the cached workbooks.
+        file_paths (list): Workbooks to read, in order.
+        sheets (list, optional): Sheet names or positions; every sheet when None.
+        cache_path (str): Directory of the columnar cache.
+        columns (list, optional): Columns to read; sheets lacking a column return it as missing.
+
+    Returns:
+        pd.DataFrame: Rows of every selected sheet, workbook by workbook in sheet order.
+    """
+    frames = []
+    for file_path in file_paths:
+        entry = manifest[file_path]
+        for sheet_name in _select_sheets(entry["sheet_names"], sheets):
+            table = feather.read_table(os.path.join(cache_path, entry["sheets"][sheet_name]["cache_file"]),
+                                       memory_map=True)
+            if columns is not None:
+                table = table.select([column for column in columns if column in table.column_names])
+            frames.append(table.to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+@instrument
+def ingest_workbooks(file_paths, sheets=None, cache_path=FLAT_FILE_CACHE_PATH, max_workers=None, columns=None):
+    """
+    Ingests Excel workbooks, converting only sheets of new or changed workbooks.
+
+    Args:
+        file_paths (list): Workbook paths.
+        sheets (list, optional): Sheet names or positions; every sheet when None.
+        cache_path (str): Directory of the columnar cache.
+        max_workers (int, optional): Number of worker processes for sheet conversion.
+        columns (list, optional): Columns to return.
+
+    Returns:
+        pd.DataFrame: Combined sheet data.
+    """
+    manifest = refresh_cache(file_paths, sheets, cache_path, max_workers)
+    return read_cache(manifest, file_paths, sheets, cache_path, columns)
+
+if __name__ == "__main__":
+    # Example usage
+    flat_file_data = ingest_workbooks(["/home/satej/data/flat_files/warehouse_data.xlsx"], sheets=[0])
+    print("Flat-file ingestion completed. Dataset size:", flat_file_data.shape)
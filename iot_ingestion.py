@@ -0,0 +1,251 @@
+"""
+iot_ingestion.py
+
+This module ingests IoT sensor CSV files in parallel using an explicit sensor schema.
+Each file is converted once into an uncompressed Arrow IPC file in a columnar cache, and a manifest
+keyed by path, size, modification time and a hash of the sensor schema records what has already
+been ingested. Later runs memory-map the cached files instead of re-parsing the CSVs, and a schema
+change re-converts every file.
+Author: Satej
+"""
+
+import os  # For handling file paths
+import json  # For reading and writing the manifest
+import copy  # For detecting manifest changes
+import tempfile  # For per-writer temporary manifest files
+import hashlib  # For naming cache files
+from concurrent.futures import ProcessPoolExecutor  # For parallel CSV parsing
+import pandas as pd  # For handling dataframes
+import pyarrow as pa  # For columnar tables
+import pyarrow.feather as feather  # For Arrow IPC files
+import data_transformation  # For the shared date parser
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
+
+# Columnar cache location and manifest of ingested files
+IOT_CACHE_PATH = "/home/satej/data/iot_cache/"
+IOT_MANIFEST_FILE = "manifest.json"
+
+# Explicit schema of the sensor files; columns outside it are ignored and missing ones are null
+IOT_SENSOR_SCHEMA = {
+    "sensor_id": "string",
+    "warehouse_id": "string",
+    "product_id": "string",
+    "date": "string",
+    "quantity": "float64",
+    "temperature": "float32",
+    "humidity": "float32"
+}
+
+# Number of files handed to each worker process at a time
+IOT_FILES_PER_TASK = 16
+
+def read_sensor_file(file_path, schema=IOT_SENSOR_SCHEMA):
+    """
+    Reads one sensor CSV with the pinned schema, without per-file dtype inference.
+
+    Args:
+        file_path (str): Path of the CSV file.
+        schema (dict): Mapping of column name to dtype.
+
+    Returns:
+        pd.DataFrame: Sensor readings with exactly the schema's columns.
+    """
+    df = pd.read_csv(file_path, usecols=lambda column: column in schema, dtype=schema)
+    df = df.reindex(columns=list(schema)).astype(schema)
+    df['date'] = data_transformation.parse_dates(df['date'])
+    return df
+
+def schema_hash(schema):
+    """
+    Hashes a sensor schema, including its column order.
+
+    Args:
+        schema (dict): Mapping of column name to dtype.
+
+    Returns:
+        str: Hex digest.
+    """
+    return hashlib.sha1(json.dumps(list(schema.items())).encode()).hexdigest()
+
+def _cache_file_name(file_path, size, mtime, schema=IOT_SENSOR_SCHEMA):
+    """
+    Builds a cache file name that changes whenever the source file, the schema or the date formats change.
+
+    Args:
+        file_path (str): Path of the source CSV.
+        size (int): File size in bytes.
+        mtime (float): File modification time.
+        schema (dict): Sensor schema the file is converted with.
+
+    Returns:
+        str: Name of the Arrow IPC cache file.
+    """
+    formats = ",".join(data_transformation.DATE_FORMATS)
+    digest = hashlib.sha1(f"{file_path}:{size}:{mtime}:{schema_hash(schema)}:{formats}".encode()).hexdigest()
+    return f"{digest}.arrow"
+
+def _convert_file(task):
+    """
+    Converts one CSV into an Arrow IPC cache file. Runs in a worker process.
+
+    Args:
+        task (tuple): (file_path, size, mtime, cache_path, schema).
+
+    Returns:
+        tuple: (file_path, manifest entry dict).
+    """
+    file_path, size, mtime, cache_path, schema = task
+    cache_file = _cache_file_name(file_path, size, mtime, schema)
+    df = read_sensor_file(file_path, schema)
+    # Uncompressed IPC files can be memory-mapped without copying
+    feather.write_feather(df, os.path.join(cache_path, cache_file), compression="uncompressed")
+    return file_path, {"size": size, "mtime": mtime, "cache_file": cache_file, "rows": len(df)}
+
+def load_manifest(cache_path=IOT_CACHE_PATH):
+    """
+    Loads the manifest of already-ingested files.
+
+    Args:
+        cache_path (str): Directory of the columnar cache.
+
+    Returns:
+        dict: Mapping of source path to {"size", "mtime", "cache_file", "rows"}.
+    """
+    manifest_path = os.path.join(cache_path, IOT_MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, cache_path=IOT_CACHE_PATH):
+    """
+    Saves the manifest atomically.
+
+    Each save writes its own temporary file, so workers refreshing the same cache concurrently,
+    e.g. shard workers on shared storage, never write to or rename each other's files.
+
+    Args:
+        manifest (dict): Mapping of source path to manifest entry.
+        cache_path (str): Directory of the columnar cache.
+    """
+    manifest_path = os.path.join(cache_path, IOT_MANIFEST_FILE)
+    fd, temp_path = tempfile.mkstemp(dir=cache_path, prefix=f"{IOT_MANIFEST_FILE}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, manifest_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+@instrument
+def refresh_cache(data_path, cache_path=IOT_CACHE_PATH, schema=IOT_SENSOR_SCHEMA, max_workers=None):
+    """
+    Converts new or modified sensor files into the columnar cache in parallel and drops cache
+    entries whose source files were removed. Files cached with a different schema are converted again.
+
+    Args:
+        data_path (str): Directory containing the IoT CSV files.
+        cache_path (str): Directory of the columnar cache.
+        schema (dict): Sensor schema.
+        max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        dict: Updated manifest.
+    """
+    os.makedirs(cache_path, exist_ok=True)
+    manifest = load_manifest(cache_path)
+    loaded = copy.deepcopy(manifest)
+
+    current = {}
+    for name in os.listdir(data_path):
+        if name.endswith('.csv'):
+            file_path = os.path.join(data_path, name)
+            stat = os.stat(file_path)
+            current[file_path] = (stat.st_size, stat.st_mtime)
+
+    # The cache file name covers size, modification time and schema, so any of them changing re-converts the file
+    tasks = [
+        (file_path, size, mtime, cache_path, schema)
+        for file_path, (size, mtime) in sorted(current.items())
+        if manifest.get(file_path, {}).get("cache_file") != _cache_file_name(file_path, size, mtime, schema)
+    ]
+
+    if tasks:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for file_path, entry in executor.map(_convert_file, tasks, chunksize=IOT_FILES_PER_TASK):
+                previous = manifest.get(file_path)
+                if previous and previous["cache_file"] != entry["cache_file"]:
+                    _remove_cache_file(cache_path, previous["cache_file"])
+                manifest[file_path] = entry
+
+    for file_path in [path for path in manifest if path not in current]:
+        _remove_cache_file(cache_path, manifest.pop(file_path)["cache_file"])
+
+    # Unchanged caches are not rewritten, so concurrent workers that find the cache warm only read it
+    if manifest != loaded:
+        save_manifest(manifest, cache_path)
+    print(f"IoT cache refreshed: {len(tasks)} file(s) converted, {len(manifest)} file(s) cached.")
+    return manifest
+
+def _remove_cache_file(cache_path, cache_file):
+    """
+    Deletes a cache file if it exists.
+
+    Args:
+        cache_path (str): Directory of the columnar cache.
+        cache_file (str): Name of the cache file.
+    """
+    path = os.path.join(cache_path, cache_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+def read_cache(manifest, cache_path=IOT_CACHE_PATH, columns=None, row_filter=None):
+    """
+    Reads the cached sensor data by memory-mapping the Arrow IPC files.
+
+    Args:
+        manifest (dict): Manifest of the files to read.
+        cache_path (str): Directory of the columnar cache.
+        columns (list, optional): Columns to read; all schema columns when omitted.
+        row_filter (pyarrow.compute.Expression, optional): Rows to keep, evaluated on each
+            memory-mapped file before anything is converted to pandas.
+
+    Returns:
+        pd.DataFrame: Combined sensor readings.
+    """
+    tables = [
+        feather.read_table(os.path.join(cache_path, manifest[file_path]["cache_file"]), columns=columns, memory_map=True)
+        for file_path in sorted(manifest)
+    ]
+    if row_filter is not None:
+        tables = [table.filter(row_filter) for table in tables]
+    if not tables:
+        return pd.DataFrame(columns=columns or list(IOT_SENSOR_SCHEMA))
+    return pa.concat_tables(tables).to_pandas()
+
+@instrument
+def ingest_iot_data(data_path, cache_path=IOT_CACHE_PATH, schema=IOT_SENSOR_SCHEMA, max_workers=None, columns=None,
+                    row_filter=None):
+    """
+    Ingests all IoT sensor files, parsing only files not yet in the columnar cache.
+
+    Args:
+        data_path (str): Directory containing the IoT CSV files.
+        cache_path (str): Directory of the columnar cache.
+        schema (dict): Sensor schema.
+        max_workers (int, optional): Number of worker processes for CSV parsing.
+        columns (list, optional): Columns to return.
+        row_filter (pyarrow.compute.Expression, optional): Rows to return.
+
+    Returns:
+        pd.DataFrame: Combined sensor readings.
+    """
+    manifest = refresh_cache(data_path, cache_path, schema, max_workers)
+    return read_cache(manifest, cache_path, columns, row_filter)
+
+if __name__ == "__main__":
+    # Example usage
+    iot_data = ingest_iot_data("/home/satej/data/iot_data/")
+    print("IoT ingestion completed. Dataset size:", iot_data.shape)
@@ -3,11 +3,129 @@ kpi_analysis.py
 
 This module calculates key performance indicators (KPIs) for warehouse operations.
 The metrics include inventory turnover rates, order accuracy, and storage utilization.
+KPIs are declared in a registry with their input columns and formula, and evaluate_kpis computes
+any set of them together in one vectorized pass over the input columns.
+Each function returns a new DataFrame and leaves the caller's DataFrame unchanged.
 Author: Satej
 """
 
+import numpy as np  # For vectorized KPI formulas
 import pandas as pd  # For data manipulation
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
 
+# KPI name -> {"inputs": input column names, "formula": function of the input arrays, in order}
+KPI_REGISTRY = {}
+
+def safe_divide(numerator, denominator):
+    """
+    Divides element-wise, returning NaN where the denominator is zero instead of +/-inf.
+
+    Args:
+        numerator (np.ndarray): Numerator values.
+        denominator (np.ndarray): Denominator values.
+
+    Returns:
+        np.ndarray: Quotients.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator == 0, np.nan, numerator / denominator)
+
+def register_kpi(name, inputs, formula):
+    """
+    Registers a KPI so evaluate_kpis can compute it.
+
+    Args:
+        name (str): Name of the KPI column.
+        inputs (list): Input column names.
+        formula (callable): Function taking one float array per input column, in order,
+            and returning the KPI values.
+    """
+    KPI_REGISTRY[name] = {"inputs": list(inputs), "formula": formula}
+
+# Inventory Turnover = Cost of Goods Sold / Average Inventory
+register_kpi(
+    "inventory_turnover",
+    ["cost_of_goods_sold", "average_inventory"],
+    lambda cost_of_goods_sold, average_inventory: safe_divide(cost_of_goods_sold, average_inventory)
+)
+
+# Order Accuracy (%) = (Correct Orders / Total Orders) * 100
+register_kpi(
+    "order_accuracy",
+    ["correct_orders", "total_orders"],
+    lambda correct_orders, total_orders: safe_divide(correct_orders, total_orders) * 100
+)
+
+# Storage Utilization (%) = (Used Space / Total Space) * 100
+register_kpi(
+    "storage_utilization",
+    ["used_space", "total_space"],
+    lambda used_space, total_space: safe_divide(used_space, total_space) * 100
+)
+
+def available_kpis(df):
+    """
+    Lists the registered KPIs whose input columns are all present.
+
+    Args:
+        df (pd.DataFrame): Input data.
+
+    Returns:
+        list: KPI names.
+    """
+    return [name for name, kpi in KPI_REGISTRY.items() if set(kpi["inputs"]) <= set(df.columns)]
+
+@instrument
+def evaluate_kpis(df, names=None):
+    """
+    Computes registered KPIs together in one vectorized pass.
+
+    Every input column is converted to a float array once, however many KPIs share it, and
+    the formulas run directly on those arrays without allocating intermediate DataFrames.
+    A zero denominator yields NaN.
+
+    Args:
+        df (pd.DataFrame): Input data.
+        names (list, optional): KPIs to compute. Defaults to every KPI whose inputs are present.
+
+    Returns:
+        pd.DataFrame: Only the KPI columns, aligned to df's index.
+
+    Raises:
+        KeyError: If a requested KPI or one of its input columns is missing.
+    """
+    names = available_kpis(df) if names is None else names
+    kpis = [KPI_REGISTRY[name] for name in names]
+
+    arrays = {}
+    for kpi in kpis:
+        for column in kpi["inputs"]:
+            if column not in arrays:
+                arrays[column] = df[column].to_numpy(dtype='float64', na_value=np.nan)
+
+    results = {name: kpi["formula"](*(arrays[column] for column in kpi["inputs"])) for name, kpi in zip(names, kpis)}
+    return pd.DataFrame(results, index=df.index)
+
+@instrument
+def calculate_all_kpis(df):
+    """
+    Calculates every registered KPI whose inputs are present.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing KPI input data.
+
+    Returns:
+        pd.DataFrame: New DataFrame with the KPI columns added.
+    """
+    try:
+        df = df.assign(**evaluate_kpis(df))
+        print("KPI calculation completed.")
+        return df
+    except Exception as e:
+        print(f"Error calculating KPIs: {e}")
+        return df
+
+@instrument
 def calculate_inventory_turnover(df):
     """
     Calculates inventory turnover rates.
@@ -19,10 +137,10 @@ def calculate_inventory_turnover(df):
         df (pd.DataFrame): DataFrame containing inventory and cost data.
 
     Returns:
-        pd.DataFrame: DataFrame with inventory turnover calculated.
+        pd.DataFrame: New DataFrame with inventory turnover calculated.
     """
     try:
-        df['inventory_turnover'] = df['cost_of_goods_sold'] / df['average_inventory']
+        df = df.assign(**evaluate_kpis(df, ["inventory_turnover"]))
         print("Inventory turnover calculation completed.")
         return df
     except KeyError as e:
@@ -32,6 +150,7 @@ def calculate_inventory_turnover(df):
         print(f"Error calculating inventory turnover: {e}")
         return df
 
+@instrument
 def calculate_order_accuracy(df):
     """
     Calculates order accuracy as a percentage.
@@ -43,10 +162,10 @@ def calculate_order_accuracy(df):
         df (pd.DataFrame): DataFrame containing order data.
 
     Returns:
-        pd.DataFrame: DataFrame with order accuracy calculated.
+        pd.DataFrame: New DataFrame with order accuracy calculated.
     """
     try:
-        df['order_accuracy'] = (df['correct_orders'] / df['total_orders']) * 100
+        df = df.assign(**evaluate_kpis(df, ["order_accuracy"]))
         print("Order accuracy calculation completed.")
         return df
     except KeyError as e:
@@ -56,6 +175,7 @@ def calculate_order_accuracy(df):
         print(f"Error calculating order accuracy: {e}")
         return df
 
+@instrument
 def calculate_storage_utilization(df):
     """
     Calculates storage utilization as a percentage.
@@ -67,10 +187,10 @@ def calculate_storage_utilization(df):
         df (pd.DataFrame): DataFrame containing storage data.
 
     Returns:
-        pd.DataFrame: DataFrame with storage utilization calculated.
+        pd.DataFrame: New DataFrame with storage utilization calculated.
     """
     try:
-        df['storage_utilization'] = (df['used_space'] / df['total_space']) * 100
+        df = df.assign(**evaluate_kpis(df, ["storage_utilization"]))
         print("Storage utilization calculation completed.")
         return df
     except KeyError as e:
@@ -85,10 +205,8 @@ if __name__ == "__main__":
     kpi_data_path = "/home/satej/data/kpi_data.csv"
     kpi_data = pd.read_csv(kpi_data_path)
 
-    # Calculate KPIs
-    kpi_data = calculate_inventory_turnover(kpi_data)
-    kpi_data = calculate_order_accuracy(kpi_data)
-    kpi_data = calculate_storage_utilization(kpi_data)
+    # Calculate all registered KPIs in one pass
+    kpi_data = calculate_all_kpis(kpi_data)
 
     print("KPI Analysis Results:")
     print(kpi_data.head())
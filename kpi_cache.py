@@ -0,0 +1,179 @@
+"""
+kpi_cache.py
+
+This module materializes computed KPI columns in an on-disk columnar cache.
+Rows are partitioned by (warehouse, month), each partition is keyed by a content hash of its KPI
+input columns, and only partitions whose inputs changed are recomputed. The cache is bounded in
+size and evicts the least recently used partitions first.
+Author: Satej
+"""
+
+import os  # For handling cache files
+import json  # For the cache index
+import time  # For LRU timestamps
+import hashlib  # For partition content hashes
+import threading  # For serializing index updates
+import numpy as np  # For assembling KPI columns
+import pandas as pd  # For handling data
+import kpi_analysis  # KPI calculations
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
+
+# Cache location and size bound
+KPI_CACHE_PATH = "/home/satej/data/kpi_cache/"
+KPI_CACHE_INDEX_FILE = "index.json"
+KPI_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Bump when a KPI formula changes so every cached partition is recomputed
+KPI_CACHE_VERSION = 2
+
+_index_lock = threading.Lock()
+
+def _load_index(cache_path):
+    """
+    Loads the cache index.
+
+    Args:
+        cache_path (str): Cache directory.
+
+    Returns:
+        dict: Mapping of partition key to {"hash", "file", "size", "last_access"}.
+    """
+    index_path = os.path.join(cache_path, KPI_CACHE_INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path) as f:
+        return json.load(f)
+
+def _save_index(index, cache_path):
+    """
+    Saves the cache index atomically.
+
+    Args:
+        index (dict): Cache index.
+        cache_path (str): Cache directory.
+    """
+    index_path = os.path.join(cache_path, KPI_CACHE_INDEX_FILE)
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(temp_path, index_path)
+
+def _partition_hash(row_hashes, kpi_names):
+    """
+    Combines the row hashes of a partition into one content hash.
+
+    Args:
+        row_hashes (np.ndarray): uint64 hash of each row's input columns, in row order.
+        kpi_names (list): KPIs computed for the partition.
+
+    Returns:
+        str: Hex digest identifying the partition's inputs and KPI definitions.
+    """
+    digest = hashlib.sha1(row_hashes.tobytes())
+    digest.update(f"{KPI_CACHE_VERSION}:{','.join(kpi_names)}".encode())
+    return digest.hexdigest()
+
+def _evict(index, cache_path, max_bytes):
+    """
+    Removes least recently used partitions until the cache fits in max_bytes.
+
+    Args:
+        index (dict): Cache index, updated in place.
+        cache_path (str): Cache directory.
+        max_bytes (int): Size bound of the cache.
+    """
+    total = sum(entry["size"] for entry in index.values())
+    for key, entry in sorted(index.items(), key=lambda item: item[1]["last_access"]):
+        if total <= max_bytes:
+            break
+        file_path = os.path.join(cache_path, entry["file"])
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        total -= entry["size"]
+        del index[key]
+
+@instrument
+def compute_kpis_cached(df, warehouse_column="warehouse_id", date_column="date", kpi_names=None,
+                        cache_path=KPI_CACHE_PATH, max_bytes=KPI_CACHE_MAX_BYTES):
+    """
+    Adds KPI columns to a DataFrame, reusing cached results for unchanged partitions.
+
+    Args:
+        df (pd.DataFrame): KPI input data with warehouse and date columns.
+        warehouse_column (str): Column identifying the warehouse.
+        date_column (str): Column holding the date; partitions are calendar months.
+        kpi_names (list, optional): Registered KPIs to compute; all KPIs whose inputs are present by default.
+        cache_path (str): Cache directory.
+        max_bytes (int): Size bound of the cache.
+
+    Returns:
+        pd.DataFrame: New DataFrame with the KPI columns added.
+    """
+    try:
+        kpi_names = kpi_analysis.available_kpis(df) if kpi_names is None else kpi_names
+        input_columns = sorted({column for name in kpi_names for column in kpi_analysis.KPI_REGISTRY[name]["inputs"]})
+        if not kpi_names or df.empty:
+            return df.copy()
+
+        os.makedirs(cache_path, exist_ok=True)
+        periods = pd.to_datetime(df[date_column]).dt.to_period("M").astype(str)
+        row_hashes = pd.util.hash_pandas_object(df[input_columns], index=False).to_numpy()
+        partitions = pd.DataFrame({"warehouse": df[warehouse_column].astype(str), "period": periods}).groupby(
+            ["warehouse", "period"], sort=False).indices
+
+        kpi_values = {name: np.full(len(df), np.nan) for name in kpi_names}
+        stale = {}
+        hits = 0
+
+        with _index_lock:
+            index = _load_index(cache_path)
+            now = time.time()
+            for (warehouse, period), positions in partitions.items():
+                key = f"{warehouse}|{period}"
+                content_hash = _partition_hash(row_hashes[positions], kpi_names)
+                entry = index.get(key)
+                file_path = os.path.join(cache_path, entry["file"]) if entry else None
+                if entry and entry["hash"] == content_hash and os.path.exists(file_path):
+                    cached = pd.read_parquet(file_path)
+                    for name in kpi_names:
+                        kpi_values[name][positions] = cached[name].to_numpy()
+                    entry["last_access"] = now
+                    hits += 1
+                else:
+                    stale[key] = (positions, content_hash)
+
+            if stale:
+                # Compute every stale partition in one pass over their rows
+                stale_positions = np.concatenate([positions for positions, _ in stale.values()])
+                computed = kpi_analysis.evaluate_kpis(df.iloc[stale_positions], kpi_names)
+
+                offset = 0
+                for key, (positions, content_hash) in stale.items():
+                    partition_kpis = computed.iloc[offset:offset + len(positions)][kpi_names].reset_index(drop=True)
+                    offset += len(positions)
+                    for name in kpi_names:
+                        kpi_values[name][positions] = partition_kpis[name].to_numpy()
+
+                    file_name = f"{hashlib.sha1(key.encode()).hexdigest()}.parquet"
+                    file_path = os.path.join(cache_path, file_name)
+                    partition_kpis.to_parquet(file_path, index=False)
+                    index[key] = {"hash": content_hash, "file": file_name,
+                                  "size": os.path.getsize(file_path), "last_access": now}
+
+            _evict(index, cache_path, max_bytes)
+            _save_index(index, cache_path)
+
+        print(f"KPI materialization completed. Partitions reused: {hits}, recomputed: {len(stale)}")
+        return df.assign(**kpi_values)
+    except Exception as e:
+        print(f"Error during cached KPI calculation: {e}")
+        return df.copy()
+
+if __name__ == "__main__":
+    # Example usage
+    kpi_data_path = "/home/satej/data/kpi_data.csv"
+    kpi_data = pd.read_csv(kpi_data_path)
+
+    # The first call computes and caches every partition; repeat calls reuse unchanged ones
+    kpi_results = compute_kpis_cached(kpi_data)
+    print(kpi_results.head())
@@ -0,0 +1,243 @@
+"""
+kpi_rollups.py
+
+This module answers time-windowed KPI rollups (trailing 7/30/90-day windows and calendar months)
+per warehouse. Daily values are laid out on a dense calendar per warehouse and turned into
+cumulative sums once, so the sum over any window is the difference of two cumulative rows, an
+O(1) lookup. New days extend the cumulative sums incrementally.
+Author: Satej
+"""
+
+import numpy as np  # For cumulative sums
+import pandas as pd  # For handling data
+from kpi_analysis import safe_divide  # For explicit divide-by-zero handling
+from performance_monitoring import instrument  # For stage timing, row counts and memory spans
+
+# Daily measures accumulated per warehouse
+ROLLUP_MEASURES = ["cost_of_goods_sold", "average_inventory", "used_space", "total_space"]
+
+# Default trailing windows in days
+ROLLUP_WINDOWS = [7, 30, 90]
+
+class WindowedRollup:
+    """
+    Per-warehouse cumulative sums over a dense daily calendar.
+
+    For each warehouse, row i of the cumulative array holds the sums of every measure (and the
+    number of observed days) over the first i calendar days, starting at the warehouse's first date.
+
+    Args:
+        measures (list): Daily measure columns to accumulate.
+    """
+
+    def __init__(self, measures=ROLLUP_MEASURES):
+        self.measures = list(measures)
+        self._start = {}  # Warehouse ID -> first calendar day
+        self._cumulative = {}  # Warehouse ID -> array of shape (days + 1, measures + 1)
+
+    @classmethod
+    def from_daily(cls, df, measures=ROLLUP_MEASURES, warehouse_column="warehouse_id", date_column="date"):
+        """
+        Builds the rollup from daily per-warehouse data.
+
+        Args:
+            df (pd.DataFrame): Daily data with warehouse, date and measure columns.
+            measures (list): Daily measure columns to accumulate.
+            warehouse_column (str): Column identifying the warehouse.
+            date_column (str): Column holding the date.
+
+        Returns:
+            WindowedRollup: Rollup covering the data.
+        """
+        rollup = cls(measures)
+        rollup.update(df, warehouse_column, date_column)
+        return rollup
+
+    def _daily_values(self, daily):
+        """
+        Converts one warehouse's daily rows into calendar positions and value rows.
+
+        Args:
+            daily (pd.DataFrame): Rows for one warehouse, one per date.
+
+        Returns:
+            tuple: (np.ndarray of dates as datetime64[D], np.ndarray of values with an observed-day column).
+        """
+        dates = daily.index.to_numpy().astype("datetime64[D]")
+        values = np.ones((len(daily), len(self.measures) + 1))
+        values[:, :-1] = daily[self.measures].to_numpy(dtype="float64", na_value=0.0)
+        return dates, values
+
+    @instrument
+    def update(self, df, warehouse_column="warehouse_id", date_column="date"):
+        """
+        Adds or restates days. Rows for a (warehouse, date) already present replace its values.
+
+        Days after a warehouse's last date extend its cumulative sums without touching existing
+        rows; restated past days only recompute the cumulative rows from that day onward.
+
+        Args:
+            df (pd.DataFrame): Daily data with warehouse, date and measure columns.
+            warehouse_column (str): Column identifying the warehouse.
+            date_column (str): Column holding the date.
+        """
+        df = df.assign(**{date_column: pd.to_datetime(df[date_column]).dt.normalize()})
+        grouped = df.groupby([warehouse_column, date_column], observed=True)[self.measures].sum(min_count=1)
+
+        for warehouse, daily in grouped.groupby(level=0, observed=True):
+            warehouse = str(warehouse)
+            dates, values = self._daily_values(daily.droplevel(0))
+            new_start = dates.min()
+            start = self._start.get(warehouse, new_start)
+            cumulative = self._cumulative.get(warehouse)
+
+            if cumulative is not None and new_start > start + (len(cumulative) - 2):
+                # Fast path: only days after the last known day, so extend the cumulative sums
+                last_day = start + (len(cumulative) - 2)
+                extension = np.zeros(((dates.max() - last_day).astype(int), values.shape[1]))
+                extension[(dates - last_day).astype(int) - 1] = values
+                self._cumulative[warehouse] = np.vstack([cumulative, cumulative[-1] + np.cumsum(extension, axis=0)])
+                continue
+
+            # General path: recover daily values, apply the restated days, recompute from the first change
+            start = min(start, new_start)
+            end = dates.max()
+            if cumulative is not None:
+                end = max(end, self._start[warehouse] + (len(cumulative) - 2))
+            daily_values = np.zeros(((end - start).astype(int) + 1, values.shape[1]))
+            if cumulative is not None:
+                offset = (self._start[warehouse] - start).astype(int)
+                daily_values[offset:offset + len(cumulative) - 1] = np.diff(cumulative, axis=0)
+            positions = (dates - start).astype(int)
+            daily_values[positions] = values
+
+            first_change = positions.min() if cumulative is not None and start == self._start[warehouse] else 0
+            rebuilt = np.zeros((len(daily_values) + 1, values.shape[1]))
+            if first_change:
+                rebuilt[:first_change + 1] = cumulative[:first_change + 1]
+            rebuilt[first_change + 1:] = rebuilt[first_change] + np.cumsum(daily_values[first_change:], axis=0)
+
+            self._start[warehouse] = start
+            self._cumulative[warehouse] = rebuilt
+
+    def warehouses(self):
+        """
+        Lists the warehouses in the rollup.
+
+        Returns:
+            list: Warehouse IDs.
+        """
+        return sorted(self._cumulative)
+
+    def range_sums(self, warehouse, start_date, end_date):
+        """
+        Sums every measure over an inclusive date range in O(1).
+
+        Args:
+            warehouse (str): Warehouse ID.
+            start_date: First day of the range.
+            end_date: Last day of the range.
+
+        Returns:
+            dict: Sum per measure plus 'observed_days'.
+        """
+        cumulative = self._cumulative[str(warehouse)]
+        start = self._start[str(warehouse)]
+        days = len(cumulative) - 1
+        first = int(np.clip((np.datetime64(pd.Timestamp(start_date), "D") - start).astype(int), 0, days))
+        last = int(np.clip((np.datetime64(pd.Timestamp(end_date), "D") - start).astype(int) + 1, 0, days))
+        sums = cumulative[max(last, first)] - cumulative[first]
+        return dict(zip(self.measures + ["observed_days"], sums))
+
+    def window_sums(self, warehouse, end_date, days):
+        """
+        Sums every measure over the trailing window of `days` days ending at end_date.
+
+        Args:
+            warehouse (str): Warehouse ID.
+            end_date: Last day of the window.
+            days (int): Window length in days.
+
+        Returns:
+            dict: Sum per measure plus 'observed_days'.
+        """
+        end = pd.Timestamp(end_date)
+        return self.range_sums(warehouse, end - pd.Timedelta(days=days - 1), end)
+
+    @staticmethod
+    def _kpis(sums):
+        """
+        Derives windowed KPIs from window sums.
+
+        Inventory turnover is the window's cost of goods sold over its mean daily average
+        inventory; storage utilization is total used space over total space.
+
+        Args:
+            sums (pd.DataFrame): Window sums with measure and observed_days columns.
+
+        Returns:
+            pd.DataFrame: inventory_turnover and storage_utilization columns.
+        """
+        mean_inventory = safe_divide(sums["average_inventory"].to_numpy(), sums["observed_days"].to_numpy())
+        return pd.DataFrame({
+            "inventory_turnover": safe_divide(sums["cost_of_goods_sold"].to_numpy(), mean_inventory),
+            "storage_utilization": safe_divide(sums["used_space"].to_numpy(), sums["total_space"].to_numpy()) * 100
+        }, index=sums.index)
+
+    @instrument
+    def trailing_kpis(self, end_date, windows=ROLLUP_WINDOWS):
+        """
+        Computes KPIs over trailing windows for every warehouse.
+
+        Args:
+            end_date: Last day of every window.
+            windows (list): Window lengths in days.
+
+        Returns:
+            pd.DataFrame: One row per (warehouse_id, window_days) with sums and KPIs.
+        """
+        rows = [
+            dict(warehouse_id=warehouse, window_days=days, **self.window_sums(warehouse, end_date, days))
+            for warehouse in self.warehouses() for days in windows
+        ]
+        sums = pd.DataFrame(rows, columns=["warehouse_id", "window_days"] + self.measures + ["observed_days"])
+        return sums.join(self._kpis(sums))
+
+    @instrument
+    def monthly_kpis(self):
+        """
+        Computes KPIs per calendar month for every warehouse.
+
+        Returns:
+            pd.DataFrame: One row per (warehouse_id, month) with sums and KPIs.
+        """
+        frames = []
+        for warehouse in self.warehouses():
+            cumulative = self._cumulative[warehouse]
+            start = self._start[warehouse]
+            end = start + (len(cumulative) - 2)
+            months = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq="M")
+
+            # Month boundaries as positions into the cumulative array
+            bounds = np.array([(np.datetime64(month.start_time, "D") - start).astype(int) for month in months] + [len(cumulative) - 1])
+            bounds = np.clip(bounds, 0, len(cumulative) - 1)
+            sums = cumulative[bounds[1:]] - cumulative[bounds[:-1]]
+
+            frame = pd.DataFrame(sums, columns=self.measures + ["observed_days"])
+            frame.insert(0, "month", months.astype(str))
+            frame.insert(0, "warehouse_id", warehouse)
+            frames.append(frame)
+
+        if not frames:
+            return pd.DataFrame(columns=["warehouse_id", "month"] + self.measures + ["observed_days"])
+        sums = pd.concat(frames, ignore_index=True)
+        return sums.join(self._kpis(sums))
+
+if __name__ == "__main__":
+    # Example usage
+    kpi_data_path = "/home/satej/data/kpi_data.csv"
+    kpi_data = pd.read_csv(kpi_data_path)
+
+    rollup = WindowedRollup.from_daily(kpi_data)
+    print(rollup.trailing_kpis(pd.to_datetime(kpi_data["date"]).max()).head())
+    print(rollup.monthly_kpis().head())
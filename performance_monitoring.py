@@ -3,19 +3,86 @@ performance_monitoring.py
 
 This module monitors the performance of the ETL pipeline by logging execution times,
 tracking errors, and generating summary reports for debugging and optimization.
+Stages are instrumented with spans (the `instrument` decorator or the `span` context manager)
+that record perf_counter timings, row counts in and out, and the process's peak memory while
+they ran. Memory is only measured per process, so each span also records how many other spans
+overlapped it; their allocations are included in its memory figures. Spans nest through
+contextvars, so stages running concurrently on worker threads keep their own parents. Finished
+spans are appended to a JSON-lines file and aggregated for a Prometheus text endpoint.
 Author: Satej
 """
 
+import sys  # For platform-specific RSS units
 import time  # For tracking execution time
+import json  # For JSON-lines span export
+import uuid  # For span and trace IDs
 import logging  # For logging performance metrics
+import threading  # For guarding shared metric state
+import functools  # For preserving wrapped function metadata
+import contextvars  # For nested spans across threads
+import tracemalloc  # For Python allocation peaks
+from collections import deque  # For the bounded buffer of recent spans
+from contextlib import contextmanager  # For the span context manager
 
-# Configure logging
+try:
+    import resource  # For peak RSS; unavailable on Windows
+except ImportError:
+    resource = None
+
+# Log file, configured on first use rather than at import time
 LOG_FILE = "/home/satej/logs/pipeline_performance.log"
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
+
+# Span export and the Prometheus endpoint
+METRICS_JSONL_PATH = "/home/satej/logs/pipeline_metrics.jsonl"
+PROMETHEUS_PORT = 9108
+PROMETHEUS_PREFIX = "warehouse_pipeline"
+RECENT_SPANS_LIMIT = 1000
+
+logger = logging.getLogger("pipeline_performance")
+
+_config_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_current_span = contextvars.ContextVar("current_span", default=None)
+_jsonl_path = None
+_stage_metrics = {}  # Span name -> aggregated counters
+_recent_spans = deque(maxlen=RECENT_SPANS_LIMIT)
+_open_spans = []  # Spans started and not yet finished, on any thread
+
+def configure_logging(log_file=LOG_FILE, level=logging.INFO):
+    """
+    Attaches the performance log file to the module logger. Safe to call repeatedly; only the
+    first call has an effect.
+
+    Args:
+        log_file (str): Path of the performance log file.
+        level (int): Logging level.
+    """
+    with _config_lock:
+        if logger.handlers:
+            return
+        try:
+            handler = logging.FileHandler(log_file)
+        except OSError as e:
+            print(f"Error opening performance log file '{log_file}': {e}")
+            handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(level)
+
+def configure_metrics(jsonl_path=METRICS_JSONL_PATH, trace_allocations=False):
+    """
+    Enables the JSON-lines export of finished spans.
+
+    Args:
+        jsonl_path (str): File each finished span is appended to.
+        trace_allocations (bool): Whether to start tracemalloc so spans record the process's
+            Python allocation peak. Tracing slows allocation-heavy code noticeably.
+    """
+    global _jsonl_path
+    with _config_lock:
+        _jsonl_path = jsonl_path
+    if trace_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
 
 def log_performance(task_name, execution_time):
     """
@@ -26,7 +93,8 @@ def log_performance(task_name, execution_time):
         execution_time (float): Time taken to complete the task in seconds.
     """
     try:
-        logging.info(f"Task: {task_name} | Execution Time: {execution_time:.2f} seconds")
+        configure_logging()
+        logger.info(f"Task: {task_name} | Execution Time: {execution_time:.2f} seconds")
         print(f"Logged performance for task: {task_name}")
     except Exception as e:
         print(f"Error logging performance for task '{task_name}': {e}")
@@ -40,11 +108,325 @@ def log_error(task_name, error_message):
         error_message (str): Detailed error message.
     """
     try:
-        logging.error(f"Task: {task_name} | Error: {error_message}")
+        configure_logging()
+        logger.error(f"Task: {task_name} | Error: {error_message}")
         print(f"Logged error for task: {task_name}")
     except Exception as e:
         print(f"Error logging error for task '{task_name}': {e}")
 
+def _peak_rss_bytes():
+    """
+    Returns the process's peak resident set size.
+
+    Returns:
+        int: Peak RSS in bytes, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def count_rows(value):
+    """
+    Counts the rows of a DataFrame, or of the DataFrames inside a tuple, list or dict.
+
+    Args:
+        value: Any value passed to or returned by an instrumented function.
+
+    Returns:
+        int: Total rows, or None when the value holds no DataFrames.
+    """
+    if hasattr(value, "shape") and hasattr(value, "columns"):
+        return int(value.shape[0])
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [count_rows(item) for item in value if hasattr(item, "shape") and hasattr(item, "columns")]
+        return sum(counts) if counts else None
+    return None
+
+class Span:
+    """
+    Timing, row counts and memory of one instrumented unit of work.
+
+    RSS and tracemalloc only measure the whole process, so the memory fields are process peaks
+    while the span was open (hence the process_ prefix). overlapping_spans counts the other spans,
+    apart from the span's own ancestors and descendants, that were open at the same time, e.g.
+    concurrent DAG branches; when it is non-zero, their allocations are included too.
+
+    Args:
+        name (str): Span name, e.g. "data_extraction.extract_from_oracle".
+        parent (Span, optional): Enclosing span.
+        attributes (dict, optional): Extra fields exported with the span.
+    """
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.ancestor_ids = (parent.ancestor_ids | {parent.span_id}) if parent else frozenset()
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.attributes = dict(attributes or {})
+        self.rows_in = None
+        self.rows_out = None
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self.duration_seconds = None
+        self.process_peak_rss_bytes = None
+        self.process_rss_growth_bytes = None
+        self.process_traced_peak_bytes = None
+        self.overlapping_spans = 0
+        self.thread = threading.current_thread().name
+        self._start = time.perf_counter()
+        self._start_rss = _peak_rss_bytes()
+
+    def finish(self):
+        """
+        Records the duration and memory of the span.
+        """
+        self.duration_seconds = time.perf_counter() - self._start
+        self.process_peak_rss_bytes = _peak_rss_bytes()
+        if self.process_peak_rss_bytes is not None and self._start_rss is not None:
+            self.process_rss_growth_bytes = self.process_peak_rss_bytes - self._start_rss
+        if tracemalloc.is_tracing():
+            # Process-wide peak since the outermost active span started
+            self.process_traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+
+    def is_related(self, other):
+        """Returns whether another span is this span's ancestor or descendant."""
+        return other.span_id in self.ancestor_ids or self.span_id in other.ancestor_ids
+
+    def to_dict(self):
+        """
+        Converts the span to a JSON-serializable record.
+
+        Returns:
+            dict: Span fields.
+        """
+        record = {
+            "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id,
+            "parent_id": self.parent_id, "start_time": self.start_time,
+            "duration_seconds": self.duration_seconds, "rows_in": self.rows_in,
+            "rows_out": self.rows_out, "status": self.status, "error": self.error,
+            "process_peak_rss_bytes": self.process_peak_rss_bytes,
+            "process_rss_growth_bytes": self.process_rss_growth_bytes,
+            "process_traced_peak_bytes": self.process_traced_peak_bytes,
+            "overlapping_spans": self.overlapping_spans, "thread": self.thread
+        }
+        if self.duration_seconds and self.rows_out is not None:
+            record["rows_per_second"] = self.rows_out / self.duration_seconds
+        record.update(self.attributes)
+        return record
+
+def _record_span(finished):
+    """
+    Aggregates a finished span for Prometheus and appends it to the JSON-lines export.
+
+    Args:
+        finished (Span): Finished span.
+    """
+    record = finished.to_dict()
+    with _metrics_lock:
+        metrics = _stage_metrics.setdefault(finished.name, {
+            "count": 0, "errors": 0, "duration_sum": 0.0, "last_duration": 0.0,
+            "rows_in": 0, "rows_out": 0, "process_traced_peak_bytes": None
+        })
+        metrics["count"] += 1
+        metrics["errors"] += finished.status != "ok"
+        metrics["duration_sum"] += finished.duration_seconds
+        metrics["last_duration"] = finished.duration_seconds
+        metrics["rows_in"] += finished.rows_in or 0
+        metrics["rows_out"] += finished.rows_out or 0
+        if finished.process_traced_peak_bytes is not None:
+            metrics["process_traced_peak_bytes"] = finished.process_traced_peak_bytes
+        _recent_spans.append(record)
+
+        if _jsonl_path:
+            try:
+                with open(_jsonl_path, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+            except OSError as e:
+                print(f"Error writing span metrics to '{_jsonl_path}': {e}")
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Context manager that records a span around a block of code.
+
+    Set rows_in and rows_out on the yielded span to report row counts. The span becomes the
+    parent of spans opened inside the block, including on threads started through
+    submit_with_context.
+
+    Args:
+        name (str): Span name.
+        **attributes: Extra fields exported with the span.
+
+    Yields:
+        Span: The open span.
+    """
+    current = Span(name, _current_span.get(), attributes)
+    with _metrics_lock:
+        if not _open_spans and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        for other in _open_spans:
+            if not current.is_related(other):
+                other.overlapping_spans += 1
+                current.overlapping_spans += 1
+        _open_spans.append(current)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = str(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+        with _metrics_lock:
+            _open_spans.remove(current)
+        _record_span(current)
+
+def instrument(name=None):
+    """
+    Decorator that records a span around every call of a function.
+
+    Rows in are the rows of the DataFrame arguments and rows out the rows of the returned
+    DataFrame(s). The wrapped function's return value and exceptions pass through unchanged.
+    Usable as @instrument or @instrument("span.name").
+
+    Args:
+        name (str, optional): Span name. Defaults to "<module>.<function>".
+
+    Returns:
+        callable: The decorator, or the decorated function when used without arguments.
+    """
+    def decorator(function):
+        span_name = name if isinstance(name, str) else f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name) as current:
+                current.rows_in = count_rows(list(args) + list(kwargs.values()))
+                result = function(*args, **kwargs)
+                current.rows_out = count_rows(result)
+                return result
+        return wrapper
+
+    return decorator(name) if callable(name) else decorator
+
+def submit_with_context(executor, function, *args, **kwargs):
+    """
+    Submits a function to an executor so it runs inside the caller's current span.
+
+    Args:
+        executor (concurrent.futures.Executor): Thread pool to submit to.
+        function (callable): Function to run.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+
+    Returns:
+        concurrent.futures.Future: Future of the call.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, function, *args, **kwargs)
+
+def recent_spans(limit=None):
+    """
+    Returns the most recently finished spans.
+
+    Args:
+        limit (int, optional): Maximum number of spans, newest last.
+
+    Returns:
+        list: Span records.
+    """
+    with _metrics_lock:
+        spans = list(_recent_spans)
+    return spans[-limit:] if limit else spans
+
+def render_prometheus():
+    """
+    Renders the aggregated span metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: Metrics text.
+    """
+    with _metrics_lock:
+        metrics = {name: dict(values) for name, values in _stage_metrics.items()}
+
+    lines = [
+        f"# HELP {PROMETHEUS_PREFIX}_span_duration_seconds Duration of instrumented pipeline spans.",
+        f"# TYPE {PROMETHEUS_PREFIX}_span_duration_seconds summary"
+    ]
+    for name, values in sorted(metrics.items()):
+        lines.append(f'{PROMETHEUS_PREFIX}_span_duration_seconds_sum{{span="{name}"}} {values["duration_sum"]}')
+        lines.append(f'{PROMETHEUS_PREFIX}_span_duration_seconds_count{{span="{name}"}} {values["count"]}')
+
+    series = [
+        ("span_last_duration_seconds", "gauge", "Duration of the latest run of each span.", "last_duration"),
+        ("span_errors_total", "counter", "Spans that ended with an exception.", "errors"),
+        ("span_rows_in_total", "counter", "Rows passed into instrumented spans.", "rows_in"),
+        ("span_rows_out_total", "counter", "Rows returned by instrumented spans.", "rows_out"),
+        ("span_process_traced_peak_bytes", "gauge",
+         "Python allocation peak of the whole process during the latest run of each span, including overlapping spans.",
+         "process_traced_peak_bytes")
+    ]
+    for metric, metric_type, help_text, key in series:
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_{metric} {help_text}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} {metric_type}")
+        for name, values in sorted(metrics.items()):
+            if values[key] is not None:
+                lines.append(f'{PROMETHEUS_PREFIX}_{metric}{{span="{name}"}} {values[key]}')
+
+    peak_rss = _peak_rss_bytes()
+    if peak_rss is not None:
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_peak_rss_bytes Peak resident set size of the process.")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_peak_rss_bytes gauge")
+        lines.append(f"{PROMETHEUS_PREFIX}_peak_rss_bytes {peak_rss}")
+    return "\n".join(lines) + "\n"
+
+def start_metrics_server(port=PROMETHEUS_PORT, host="0.0.0.0"):
+    """
+    Serves the Prometheus metrics endpoint on a background thread.
+
+    http.server is imported here, so processes that never serve metrics do not pay for it at startup.
+
+    Args:
+        port (int): Port to listen on.
+        host (str): Interface to bind.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # For the Prometheus endpoint
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """
+        Serves render_prometheus() at /metrics.
+        """
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Prometheus metrics served on port {server.server_address[1]} at /metrics")
+    return server
+
 def monitor_task(task_name, function, *args, **kwargs):
     """
     Wraps a task execution with performance monitoring and error logging.
@@ -54,15 +436,20 @@ def monitor_task(task_name, function, *args, **kwargs):
         function (callable): The function to execute.
         *args: Positional arguments for the function.
         **kwargs: Keyword arguments for the function.
+
+    Returns:
+        The function's return value, or None if it raised.
     """
-    start_time = time.time()
     try:
-        # Execute the task
-        function(*args, **kwargs)
-        execution_time = time.time() - start_time
-        log_performance(task_name, execution_time)
+        with span(task_name) as current:
+            current.rows_in = count_rows(list(args) + list(kwargs.values()))
+            result = function(*args, **kwargs)
+            current.rows_out = count_rows(result)
+        log_performance(task_name, current.duration_seconds)
+        return result
     except Exception as e:
         log_error(task_name, str(e))
+        return None
 
 if __name__ == "__main__":
     # Example usage of performance monitoring
@@ -71,4 +458,6 @@ if __name__ == "__main__":
         time.sleep(2)  # Simulate task delay
 
     # Monitor the execution of a sample task
+    configure_metrics()
     monitor_task("Sample Task", sample_task)
+    print(render_prometheus())
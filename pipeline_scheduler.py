@@ -2,69 +2,434 @@
 pipeline_scheduler.py
 
 This module orchestrates the ETL pipeline by scheduling and executing tasks for data extraction,
-transformation, loading, and monitoring. It ensures that the pipeline runs at defined intervals.
+transformation, loading, and monitoring. Stages run in-process as a dependency graph: each stage
+starts as soon as the stages it depends on have finished, DataFrames are handed between stages
+in memory, and independent branches run concurrently on a worker pool.
 Author: Satej
 """
 
-import schedule  # For scheduling tasks
 import time  # For managing sleep intervals
-import os  # For triggering scripts as subprocesses
+import datetime  # For run identifiers
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED  # For running stages concurrently
 
-# Paths to the other pipeline scripts
-DATA_EXTRACTION_SCRIPT = "/home/satej/pipeline/data_extraction.py"
-DATA_TRANSFORMATION_SCRIPT = "/home/satej/pipeline/data_transformation.py"
-DATA_LOADING_SCRIPT = "/home/satej/pipeline/data_loading.py"
-KPI_ANALYSIS_SCRIPT = "/home/satej/pipeline/kpi_analysis.py"
+import pandas as pd  # For combining extracted data
+import data_extraction  # Pipeline stage modules, imported once per process
+import data_transformation
+import data_unification
+import data_loading
+import kpi_cache
+import dashboard_setup
+import alerts_automation
+import performance_monitoring  # For stage spans and the metrics endpoint
+import checkpoint_store  # For resumable runs
+
+# Snowflake target for the loading stage
+WAREHOUSE_TABLE_NAME = data_loading.WAREHOUSE_TABLE_NAME
+WAREHOUSE_TABLE_SCHEMA = data_loading.WAREHOUSE_TABLE_SCHEMA
+
+# Number of worker threads used to run independent stages concurrently
+MAX_PIPELINE_WORKERS = 4
+
+# Number of warehouse hash partitions aggregated in parallel by the transformation stage
+TRANSFORM_PARTITIONS = 4
+
+# Transformation engine: "pandas" in memory, or "duckdb" out of core for data larger than RAM
+TRANSFORM_ENGINE = "pandas"
+
+# Columns and non-null constraints of the transformation stage, pushed down into the source
+# queries and file reads so rows and columns it would discard are never extracted
+EXTRACTION_REQUEST = data_extraction.ExtractionRequest(
+    columns=data_transformation.INPUT_COLUMNS, not_null=data_transformation.ESSENTIAL_COLUMNS)
+
+# DataFrame.attrs key marking stage outputs that are missing data, e.g. an extraction that lost a
+# source; such outputs are passed downstream but never checkpointed, so a retry runs the stage again
+INCOMPLETE_OUTPUT_ATTR = "incomplete"
+
+# Retries of a failed run; each retry resumes from the first stage without a checkpoint
+PIPELINE_MAX_RETRIES = 2
+PIPELINE_RETRY_DELAY_SECONDS = 300
+
+def _report_extraction(source_timings):
+    """
+    Prints the outcome of every source and returns the sources that did not succeed.
+
+    Args:
+        source_timings (dict): Timings and statuses returned by data_extraction.extract_all.
+
+    Returns:
+        list: Names of the sources that failed or timed out.
+    """
+    for source_name, timing in source_timings.items():
+        print(f"Extraction from {source_name}: {timing['status']} in {timing['seconds']:.2f} seconds")
+    return [source_name for source_name, timing in source_timings.items() if timing["status"] != "ok"]
 
 def run_data_extraction():
     """
-    Executes the data extraction script.
+    Extracts data from every source and combines it into a single DataFrame.
+
+    Returns:
+        pd.DataFrame: Combined raw data from all sources.
+    """
+    source_data, source_timings = data_extraction.extract_all(request=EXTRACTION_REQUEST)
+    failed_sources = _report_extraction(source_timings)
+
+    combined_data = pd.concat(list(source_data.values()), ignore_index=True)
+    if failed_sources:
+        combined_data.attrs[INCOMPLETE_OUTPUT_ATTR] = failed_sources
+    print("Data extraction task completed.")
+    return combined_data
+
+def run_data_transformation(raw_data):
+    """
+    Cleans and aggregates the extracted data.
+
+    Args:
+        raw_data (pd.DataFrame): Output of the extraction stage.
+
+    Returns:
+        pd.DataFrame: Transformed data with aggregated metrics.
+    """
+    transformed_data = data_transformation.clean_and_transform(
+        raw_data, engine=TRANSFORM_ENGINE, partitions=TRANSFORM_PARTITIONS)
+    print("Data transformation task completed.")
+    return transformed_data
+
+def run_source_extraction():
+    """
+    Extracts data from every source, keeping each source's data separate for unification.
+
+    Returns:
+        dict: Mapping of source name to extracted DataFrame.
+    """
+    source_data, source_timings = data_extraction.extract_all()
+    for source_name in _report_extraction(source_timings):
+        source_data[source_name].attrs[INCOMPLETE_OUTPUT_ATTR] = [source_name]
+    print("Source extraction task completed.")
+    return source_data
+
+def run_data_unification(source_data):
+    """
+    Joins the extracted sources into the dense (warehouse_id, date) fact table.
+
+    Args:
+        source_data (dict): Output of the source extraction stage.
+
+    Returns:
+        pd.DataFrame: Fact table, also carrying the transformed output columns.
+    """
+    fact_table = data_unification.unify_sources(source_data)
+    if fact_table.empty and any(not df.empty for df in source_data.values()):
+        raise RuntimeError("Source unification failed.")
+    print("Data unification task completed.")
+    return fact_table
+
+def run_incremental_extraction():
+    """
+    Extracts only the data that changed since the last persisted watermarks.
+
+    Returns:
+        tuple: (dict, dict) delta DataFrames per source and the new watermarks.
+    """
+    deltas, new_watermarks = data_extraction.extract_incremental()
+    print("Incremental extraction task completed.")
+    return deltas, new_watermarks
+
+def run_incremental_transformation(extraction_output):
+    """
+    Merges the extracted deltas into the materialized aggregates, then advances the watermarks.
+
+    Watermarks are saved only after the aggregate state, so a failed run re-extracts the same delta.
+
+    Args:
+        extraction_output (tuple): Output of the incremental extraction stage.
+
+    Returns:
+        pd.DataFrame: Transformed data for all groups.
+    """
+    deltas, new_watermarks = extraction_output
+    transformed_data, state = data_transformation.transform_incremental(deltas)
+    if state is None:
+        raise RuntimeError("Incremental transformation failed; watermarks were not advanced.")
+    data_transformation.save_aggregate_state(state)
+    data_extraction.save_watermarks(new_watermarks)
+    print("Incremental data transformation task completed.")
+    return transformed_data
+
+def run_data_loading(transformed_data):
+    """
+    Loads the transformed data into Snowflake.
+
+    Args:
+        transformed_data (pd.DataFrame): Output of the transformation stage.
+
+    Returns:
+        int: Number of rows handed to the loader.
+    """
+    # The unified fact table carries more columns than the target table holds
+    table_data = transformed_data[data_loading.WAREHOUSE_TABLE_COLUMNS]
+    with data_loading.snowflake_connection() as connection:
+        data_loading.create_table_if_not_exists(connection, WAREHOUSE_TABLE_NAME, WAREHOUSE_TABLE_SCHEMA)
+        if not data_loading.bulk_load_to_snowflake(connection, table_data, WAREHOUSE_TABLE_NAME):
+            raise RuntimeError("Bulk load to Snowflake failed.")
+    print("Data loading task completed.")
+    return len(transformed_data)
+
+def run_kpi_analysis(transformed_data):
+    """
+    Calculates KPIs on the transformed data.
+
+    Args:
+        transformed_data (pd.DataFrame): Output of the transformation stage.
+
+    Returns:
+        pd.DataFrame: Data with KPI columns added.
+    """
+    # Partitions whose inputs are unchanged since the last run are served from the KPI cache
+    kpi_data = kpi_cache.compute_kpis_cached(transformed_data)
+    print("KPI analysis task completed.")
+    return kpi_data
+
+def run_dashboard_preparation(transformed_data):
+    """
+    Prepares and exports dashboard-ready data.
+
+    Args:
+        transformed_data (pd.DataFrame): Output of the transformation stage.
+
+    Returns:
+        pd.DataFrame: Dashboard-ready data.
+    """
+    # prepare_dashboard_data renames columns in place, so work on a private copy
+    dashboard_data = dashboard_setup.prepare_dashboard_data(transformed_data.copy())
+    dashboard_setup.export_dashboard_data(dashboard_data)
+    # Pre-aggregated grains for BI extracts; only the touched keys and periods are recomputed
+    dashboard_setup.refresh_dashboard_cube(transformed_data)
+    print("Dashboard preparation task completed.")
+    return dashboard_data
+
+def run_alerts(dashboard_data):
+    """
+    Checks alert thresholds on the dashboard-ready data.
+
+    Args:
+        dashboard_data (pd.DataFrame): Output of the dashboard preparation stage.
+    """
+    alerts_automation.check_thresholds_and_alerts(dashboard_data)
+    print("Alerts task completed.")
+
+# Pipeline graph: stage name -> (callable, names of the stages whose outputs it receives)
+PIPELINE_STAGES = {
+    "extraction": (run_data_extraction, []),
+    "transformation": (run_data_transformation, ["extraction"]),
+    "loading": (run_data_loading, ["transformation"]),
+    "kpi_analysis": (run_kpi_analysis, ["transformation"]),
+    "dashboard": (run_dashboard_preparation, ["transformation"]),
+    "alerts": (run_alerts, ["dashboard"]),
+}
+
+# Same graph, but extraction and transformation only process what changed since the last run
+INCREMENTAL_PIPELINE_STAGES = dict(
+    PIPELINE_STAGES,
+    extraction=(run_incremental_extraction, []),
+    transformation=(run_incremental_transformation, ["extraction"]),
+)
+
+# Same graph, but the sources are kept apart and joined into a dense fact table instead of concatenated and cleaned
+UNIFIED_PIPELINE_STAGES = dict(
+    PIPELINE_STAGES,
+    extraction=(run_source_extraction, []),
+    transformation=(run_data_unification, ["extraction"]),
+)
+
+# Stages whose output depends on more than their inputs, so checkpoints are only reused within one run
+RUN_SCOPED_STAGE_FUNCTIONS = {run_data_extraction, run_source_extraction, run_incremental_extraction,
+                              run_incremental_transformation}
+
+def _is_incomplete(output):
+    """
+    Checks whether a stage output, or any DataFrame inside it, is marked as incomplete.
+
+    Args:
+        output: Stage output.
+
+    Returns:
+        bool: True if the output must not be checkpointed.
     """
-    try:
-        os.system(f"python {DATA_EXTRACTION_SCRIPT}")
-        print("Data extraction task completed.")
-    except Exception as e:
-        print(f"Error during data extraction task: {e}")
+    if isinstance(output, pd.DataFrame):
+        return bool(output.attrs.get(INCOMPLETE_OUTPUT_ATTR))
+    if isinstance(output, dict):
+        return any(_is_incomplete(value) for value in output.values())
+    if isinstance(output, (tuple, list)):
+        return any(_is_incomplete(value) for value in output)
+    return False
 
-def run_data_transformation():
+def _run_and_checkpoint(function, inputs, checkpoints, key, name):
     """
-    Executes the data transformation script.
+    Runs a stage and stores its output in the checkpoint store, unless the output is incomplete.
+
+    Args:
+        function (callable): Stage function.
+        inputs (list): Stage inputs.
+        checkpoints (CheckpointStore): Checkpoint store.
+        key (str): Artifact key of the stage.
+        name (str): Stage name.
+
+    Returns:
+        tuple: (object, str) stage output and its content hash.
     """
-    try:
-        os.system(f"python {DATA_TRANSFORMATION_SCRIPT}")
-        print("Data transformation task completed.")
-    except Exception as e:
-        print(f"Error during data transformation task: {e}")
+    output = function(*inputs)
+    if _is_incomplete(output):
+        print(f"Not checkpointing stage '{name}' because its output is incomplete.")
+        return output, checkpoint_store.content_hash(output)
+    return output, checkpoints.put(key, name, output)
 
-def run_data_loading():
+@performance_monitoring.instrument("pipeline.run")
+def run_pipeline(stages=PIPELINE_STAGES, max_workers=MAX_PIPELINE_WORKERS, checkpoints=None, run_id=None):
     """
-    Executes the data loading script.
+    Runs the pipeline graph in-process.
+
+    A stage is submitted to the worker pool as soon as all of its dependencies have finished,
+    and receives their outputs as positional arguments in the order they are listed. If a
+    stage fails, every stage downstream of it is skipped while unrelated branches carry on.
+    Each stage runs in its own "pipeline.<stage>" span nested under the "pipeline.run" span.
+
+    With a checkpoint store, a stage whose code and input contents match a stored artifact is
+    not run; its stored output is used instead. Stages without inputs and stages in
+    RUN_SCOPED_STAGE_FUNCTIONS are only reused within the same run_id. Outputs marked with
+    INCOMPLETE_OUTPUT_ATTR, such as an extraction that lost a source, are not stored.
+
+    Args:
+        stages (dict): Mapping of stage name to (callable, list of dependency names).
+        max_workers (int): Number of worker threads for concurrent stages.
+        checkpoints (CheckpointStore, optional): Store of stage outputs; no checkpointing when omitted.
+        run_id (str, optional): Identifier of the run, e.g. the scheduled date.
+
+    Returns:
+        dict: Mapping of stage name to its output for every stage that completed.
     """
-    try:
-        os.system(f"python {DATA_LOADING_SCRIPT}")
-        print("Data loading task completed.")
-    except Exception as e:
-        print(f"Error during data loading task: {e}")
+    for name, (_, dependencies) in stages.items():
+        for dependency in dependencies:
+            if dependency not in stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'.")
+
+    results = {}
+    output_hashes = {}
+    failed = set()
+    pending = dict(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            # Skip stages that can never run because an upstream stage failed
+            for name, (_, dependencies) in list(pending.items()):
+                if any(dependency in failed for dependency in dependencies):
+                    print(f"Skipping stage '{name}' because an upstream stage failed.")
+                    failed.add(name)
+                    del pending[name]
+
+            # Submit every stage whose inputs are ready, or reuse its checkpoint
+            reused = False
+            for name, (function, dependencies) in list(pending.items()):
+                if all(dependency in results for dependency in dependencies):
+                    inputs = [results[dependency] for dependency in dependencies]
+                    stage = performance_monitoring.instrument(f"pipeline.{name}")(function)
+                    del pending[name]
+
+                    if checkpoints is None:
+                        running[performance_monitoring.submit_with_context(executor, stage, *inputs)] = name
+                        continue
+
+                    key = checkpoint_store.stage_key(
+                        name, function, [output_hashes[dependency] for dependency in dependencies],
+                        run_id, run_scoped=function in RUN_SCOPED_STAGE_FUNCTIONS
+                    )
+                    found, output, output_hash = checkpoints.get(key)
+                    if found:
+                        print(f"Reusing checkpoint for stage '{name}'.")
+                        results[name], output_hashes[name] = output, output_hash
+                        reused = True
+                    else:
+                        running[performance_monitoring.submit_with_context(
+                            executor, _run_and_checkpoint, stage, inputs, checkpoints, key, name)] = name
 
-def run_kpi_analysis():
+            if not running:
+                if pending and not reused:
+                    raise ValueError(f"Pipeline graph has a cycle among stages: {sorted(pending)}")
+                if not pending:
+                    break
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    if checkpoints is None:
+                        results[name] = future.result()
+                    else:
+                        results[name], output_hashes[name] = future.result()
+                except Exception as e:
+                    print(f"Error during {name} stage: {e}")
+                    failed.add(name)
+
+    print("Pipeline run completed.")
+    return results
+
+def run_resumable_pipeline(stages=PIPELINE_STAGES, run_id=None, checkpoints=None,
+                           max_retries=PIPELINE_MAX_RETRIES, retry_delay=PIPELINE_RETRY_DELAY_SECONDS):
     """
-    Executes the KPI analysis script.
+    Runs the pipeline with checkpoints, retrying failed runs from the first stage that did not complete.
+
+    Calling this again with the same run_id (e.g. re-triggering a failed nightly run) also
+    resumes instead of starting over.
+
+    Args:
+        stages (dict): Mapping of stage name to (callable, list of dependency names).
+        run_id (str, optional): Identifier of the run. Defaults to today's date.
+        checkpoints (CheckpointStore, optional): Store of stage outputs. Defaults to the local store.
+        max_retries (int): Retries after a run with failed stages.
+        retry_delay (float): Seconds to wait before each retry.
+
+    Returns:
+        dict: Mapping of stage name to its output for every stage that completed.
     """
-    try:
-        os.system(f"python {KPI_ANALYSIS_SCRIPT}")
-        print("KPI analysis task completed.")
-    except Exception as e:
-        print(f"Error during KPI analysis task: {e}")
+    run_id = datetime.date.today().isoformat() if run_id is None else run_id
+    checkpoints = checkpoint_store.CheckpointStore() if checkpoints is None else checkpoints
+    checkpoints.prune()
 
-def schedule_pipeline():
+    for attempt in range(max_retries + 1):
+        results = run_pipeline(stages, checkpoints=checkpoints, run_id=run_id)
+        incomplete = sorted(set(stages) - set(results))
+        if not incomplete:
+            return results
+        if attempt < max_retries:
+            print(f"Run {run_id} has incomplete stages {incomplete}; retrying in {retry_delay} seconds.")
+            time.sleep(retry_delay)
+
+    print(f"Run {run_id} failed after {max_retries} retries; incomplete stages: {incomplete}")
+    return results
+
+def schedule_pipeline(incremental=False, unified=False):
     """
     Schedules the ETL pipeline to run at defined intervals.
+
+    Args:
+        incremental (bool): Process only data changed since the last run instead of full reloads.
+        unified (bool): Join the sources into a dense fact table instead of concatenating them.
+            Unification works on full extracts, so it cannot be combined with incremental.
     """
-    # Define the schedule (e.g., every day at 2:00 AM)
-    schedule.every().day.at("02:00").do(run_data_extraction)
-    schedule.every().day.at("02:30").do(run_data_transformation)
-    schedule.every().day.at("03:00").do(run_data_loading)
-    schedule.every().day.at("03:30").do(run_kpi_analysis)
+    import schedule  # For scheduling tasks; only the long-running scheduler needs it
+    if incremental and unified:
+        raise ValueError("The unified pipeline runs on full extracts and cannot be incremental.")
+    stages = UNIFIED_PIPELINE_STAGES if unified else INCREMENTAL_PIPELINE_STAGES if incremental else PIPELINE_STAGES
+
+    # Stage spans go to the JSON-lines export and the Prometheus endpoint
+    performance_monitoring.configure_logging()
+    performance_monitoring.configure_metrics()
+    performance_monitoring.start_metrics_server()
+
+    # Define the schedule (e.g., every day at 2:00 AM); stages chain on completion, not on the clock,
+    # and a failed run is retried from its last good stage
+    schedule.every().day.at("02:00").do(run_resumable_pipeline, stages)
 
     print("Pipeline scheduler initialized. Waiting for tasks to execute...")
     while True:
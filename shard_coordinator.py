@@ -0,0 +1,591 @@
+"""
+shard_coordinator.py
+
+This module scales pipeline runs out horizontally by sharding them by warehouse. A coordinator
+splits the sorted warehouse IDs into contiguous ranges and enqueues one shard per range in a
+SQLite work queue; workers, as local processes or on other nodes sharing the queue file and the
+results directory, claim shards under a renewable lease and run extraction, transformation,
+KPI analysis and loading for their warehouses only. The warehouse list of a shard is pushed down
+into every source through the extraction request. A shard that fails is retried, by whichever
+worker claims it next, up to SHARD_MAX_ATTEMPTS times; a shard whose worker died is reassigned
+once its lease expires. When every shard has finished, the coordinator merges the shard outputs
+and runs the dashboard and alerts stages, which need all warehouses, once on the merged data.
+Author: Satej
+"""
+
+import os  # For handling shard result files
+import json  # For storing warehouse lists and shard results in the queue
+import time  # For leases and polling
+import socket  # For worker identifiers
+import sqlite3  # For the shared work queue
+import datetime  # For run identifiers
+import threading  # For renewing the lease while a shard runs
+import dataclasses  # For deriving the shard extraction request
+import multiprocessing  # For local worker processes
+import pandas as pd  # For handling data
+import data_extraction  # Pipeline stage modules
+import data_transformation
+import data_unification
+import kpi_analysis
+import pipeline_scheduler  # For the extraction request, stage settings and the loading, dashboard and alerts stages
+from performance_monitoring import instrument  # For shard spans
+
+# Work queue and shard outputs; both must be on storage shared by every node running workers
+SHARD_QUEUE_PATH = "/home/satej/data/state/shard_queue.sqlite"
+SHARD_RESULTS_PATH = "/home/satej/data/shards/"
+
+# Shards per run and local worker processes; more shards than workers keeps workers busy until
+# the end of the run and makes a retry cheaper
+SHARD_COUNT = 16
+SHARD_WORKERS = 4
+
+# Lease of a claimed shard, renewed while the worker is alive, and attempts before a shard fails
+SHARD_LEASE_SECONDS = 600
+SHARD_MAX_ATTEMPTS = 3
+SHARD_POLL_SECONDS = 1
+
+# Start method of local worker processes; spawn, as extraction runs thread pools that forking would copy mid-flight
+SHARD_START_METHOD = "spawn"
+
+# Replacement processes the coordinator starts for local workers that died
+SHARD_MAX_WORKER_RESTARTS = 4
+
+# Tables read for warehouse discovery, by connection string
+WAREHOUSE_DISCOVERY_TABLES = [
+    (data_extraction.SQL_SERVER_CONNECTION_STRING, "Inventory"),
+    (data_extraction.ORACLE_CONNECTION_STRING, "Orders")
+]
+
+def discover_warehouse_ids():
+    """
+    Collects the distinct warehouse IDs of all sources.
+
+    The database sources answer with SELECT DISTINCT; the IoT files and flat files are read
+    through their columnar caches for the warehouse column only, which also brings those caches
+    up to date before the workers read them concurrently.
+
+    Returns:
+        list: Sorted warehouse IDs as strings.
+    """
+    column = pipeline_scheduler.EXTRACTION_REQUEST.warehouse_column
+    warehouse_ids = set()
+    for connection_string, table in WAREHOUSE_DISCOVERY_TABLES:
+        try:
+            with data_extraction.database_connection(connection_string) as conn:
+                df = pd.read_sql(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL", conn)
+            warehouse_ids.update(df[column].astype(str))
+        except Exception as e:
+            print(f"Error while discovering warehouses in {table}: {e}")
+
+    for df in _read_file_warehouses():
+        if column in df.columns:
+            warehouse_ids.update(df[column].dropna().astype(str).unique())
+    return sorted(warehouse_ids)
+
+def _read_file_warehouses():
+    """
+    Reads the warehouse column of the IoT files and flat files through their columnar caches,
+    which brings the caches up to date before the workers read them concurrently.
+
+    Returns:
+        list: One DataFrame per file source.
+    """
+    column = pipeline_scheduler.EXTRACTION_REQUEST.warehouse_column
+    request = data_extraction.ExtractionRequest(columns=[column], not_null=[column])
+    return [extract(request=request) for extract in [data_extraction.extract_from_iot,
+                                                      data_extraction.extract_from_flat_files]]
+
+def plan_shards(warehouse_ids, shard_count=SHARD_COUNT):
+    """
+    Splits warehouse IDs into contiguous ranges of nearly equal size.
+
+    Args:
+        warehouse_ids (list): Warehouse IDs.
+        shard_count (int): Number of shards; at most one shard per warehouse.
+
+    Returns:
+        list: Warehouse ID lists, one per shard, in ID order.
+    """
+    warehouse_ids = sorted({str(warehouse_id) for warehouse_id in warehouse_ids})
+    shard_count = max(min(shard_count, len(warehouse_ids)), 1)
+    size, remainder = divmod(len(warehouse_ids), shard_count)
+    shards = []
+    start = 0
+    for index in range(shard_count):
+        end = start + size + (1 if index < remainder else 0)
+        shards.append(warehouse_ids[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+class ShardQueue:
+    """
+    Work queue of shards in a SQLite file shared by the coordinator and the workers.
+
+    Every state change runs in its own IMMEDIATE transaction, so concurrent claims from any
+    number of processes hand each shard to exactly one worker at a time.
+
+    Args:
+        path (str): Queue database file.
+        max_attempts (int): Attempts of a shard before it is marked failed.
+    """
+
+    def __init__(self, path=SHARD_QUEUE_PATH, max_attempts=SHARD_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shards ("
+                "run_id TEXT NOT NULL, shard_id INTEGER NOT NULL, first_warehouse TEXT, last_warehouse TEXT, "
+                "warehouse_ids TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "worker TEXT, lease_expires REAL, result TEXT, error TEXT, updated REAL, "
+                "PRIMARY KEY (run_id, shard_id))"
+            )
+
+    def _transaction(self):
+        """
+        Opens a connection whose context manager wraps one IMMEDIATE transaction.
+
+        Returns:
+            _ShardTransaction: Context manager yielding the connection.
+        """
+        return _ShardTransaction(self.path)
+
+    def enqueue(self, run_id, shards):
+        """
+        Adds the shards of a run. Shards already queued for the run keep their state, so
+        enqueuing a run again resumes it.
+
+        Args:
+            run_id (str): Run identifier.
+            shards (list): Warehouse ID lists, as returned by plan_shards.
+
+        Returns:
+            int: Number of shards added.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO shards (run_id, shard_id, first_warehouse, last_warehouse, warehouse_ids, "
+                "status, updated) VALUES (?, ?, ?, ?, ?, 'pending', ?)",
+                [(run_id, shard_id, shard[0], shard[-1], json.dumps(shard), now) for shard_id, shard in enumerate(shards)]
+            )
+            return conn.total_changes - before
+
+    def claim(self, run_id, worker, lease_seconds=SHARD_LEASE_SECONDS):
+        """
+        Leases the next pending shard of a run to a worker.
+
+        Shards whose lease expired count as a failed attempt and are reassigned, or marked failed
+        once they have used up their attempts.
+
+        Args:
+            run_id (str): Run identifier.
+            worker (str): Worker identifier.
+            lease_seconds (float): Lease duration.
+
+        Returns:
+            dict: Claimed shard with its warehouse_ids, or None when no shard is available.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE shards SET status = 'failed', error = 'lease expired', updated = ? "
+                "WHERE run_id = ? AND status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, run_id, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT shard_id FROM shards WHERE run_id = ? AND "
+                "(status = 'pending' OR (status = 'running' AND lease_expires < ?)) ORDER BY shard_id LIMIT 1",
+                (run_id, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE shards SET status = 'running', worker = ?, attempts = attempts + 1, lease_expires = ?, "
+                "updated = ? WHERE run_id = ? AND shard_id = ?",
+                (worker, now + lease_seconds, now, run_id, row[0])
+            )
+            return self._shard(conn, run_id, row[0])
+
+    def renew(self, run_id, shard_id, worker, lease_seconds=SHARD_LEASE_SECONDS):
+        """
+        Extends the lease of a running shard.
+
+        Returns:
+            bool: Whether the worker still holds the lease.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET lease_expires = ? WHERE run_id = ? AND shard_id = ? AND worker = ? "
+                "AND status = 'running'",
+                (time.time() + lease_seconds, run_id, shard_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, run_id, shard_id, worker, result):
+        """
+        Marks a shard done, unless its lease was lost to another worker in the meantime.
+
+        Args:
+            run_id (str): Run identifier.
+            shard_id (int): Shard number.
+            worker (str): Worker identifier.
+            result (dict): Shard outputs, stored as JSON.
+
+        Returns:
+            bool: Whether the result was recorded.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'done', result = ?, error = NULL, updated = ? "
+                "WHERE run_id = ? AND shard_id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(result), time.time(), run_id, shard_id, worker)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, run_id, shard_id, worker, error):
+        """
+        Records a failed attempt; the shard goes back to pending until it has used up its attempts.
+
+        Args:
+            run_id (str): Run identifier.
+            shard_id (int): Shard number.
+            worker (str): Worker identifier.
+            error (str): Error message.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, updated = ? WHERE run_id = ? AND shard_id = ? AND worker = ? AND status = 'running'",
+                (self.max_attempts, error, time.time(), run_id, shard_id, worker)
+            )
+
+    def reset_failed(self, run_id):
+        """
+        Puts the failed shards of a run back to pending with a fresh set of attempts.
+
+        Args:
+            run_id (str): Run identifier.
+
+        Returns:
+            int: Number of shards reset.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'pending', attempts = 0, worker = NULL, lease_expires = NULL, "
+                "updated = ? WHERE run_id = ? AND status = 'failed'",
+                (time.time(), run_id)
+            )
+            return cursor.rowcount
+
+    def counts(self, run_id):
+        """
+        Counts the shards of a run by status.
+
+        Returns:
+            dict: Mapping of status to number of shards.
+        """
+        with self._transaction() as conn:
+            return dict(conn.execute(
+                "SELECT status, COUNT(*) FROM shards WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall())
+
+    def unfinished(self, run_id):
+        """
+        Returns the number of shards of a run that are pending or running.
+        """
+        counts = self.counts(run_id)
+        return counts.get("pending", 0) + counts.get("running", 0)
+
+    def shards(self, run_id):
+        """
+        Lists the shards of a run.
+
+        Returns:
+            list: Shards as dicts, in shard order.
+        """
+        with self._transaction() as conn:
+            shard_ids = [row[0] for row in conn.execute(
+                "SELECT shard_id FROM shards WHERE run_id = ? ORDER BY shard_id", (run_id,))]
+            return [self._shard(conn, run_id, shard_id) for shard_id in shard_ids]
+
+    @staticmethod
+    def _shard(conn, run_id, shard_id):
+        """Reads one shard row as a dict with decoded warehouse_ids and result."""
+        cursor = conn.execute("SELECT * FROM shards WHERE run_id = ? AND shard_id = ?", (run_id, shard_id))
+        shard = dict(zip([column[0] for column in cursor.description], cursor.fetchone()))
+        shard["warehouse_ids"] = json.loads(shard["warehouse_ids"])
+        shard["result"] = json.loads(shard["result"]) if shard["result"] else None
+        return shard
+
+class _ShardTransaction:
+    """
+    Context manager running one IMMEDIATE transaction on the queue database.
+
+    Args:
+        path (str): Queue database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+
+    def __enter__(self):
+        # Autocommit mode, so the transaction boundaries are exactly the BEGIN and COMMIT below
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+        return False
+
+def _write_result(df, path):
+    """
+    Writes a shard output atomically, so a reader never sees a partial file.
+
+    Args:
+        df (pd.DataFrame): Shard output.
+        path (str): Parquet file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+
+@instrument("shard.run")
+def run_shard(shard, run_id, results_path=SHARD_RESULTS_PATH, load=True, unified=False):
+    """
+    Runs extraction, transformation, KPI analysis and loading for the warehouses of one shard.
+
+    Transformation aggregates by (warehouse_id, date) and the KPIs are computed row by row, so
+    the merged shard outputs equal a single run over all warehouses. KPIs are calculated directly
+    rather than through the KPI cache, whose index is not shared safely between processes.
+
+    Args:
+        shard (dict): Claimed shard.
+        run_id (str): Run identifier.
+        results_path (str): Directory of the shard outputs.
+        load (bool): Load the shard into Snowflake.
+        unified (bool): Join the sources into the dense fact table instead of concatenating and cleaning them.
+
+    Returns:
+        dict: Paths and row counts of the shard's transformed and KPI outputs.
+    """
+    if unified:
+        # Unification needs every source column (order IDs, sensor IDs and readings), as in the single run
+        request = data_extraction.ExtractionRequest(warehouse_ids=shard["warehouse_ids"])
+    else:
+        request = dataclasses.replace(pipeline_scheduler.EXTRACTION_REQUEST, warehouse_ids=shard["warehouse_ids"])
+    source_data, source_timings = data_extraction.extract_all(request=request)
+    # A source that failed returns an empty frame, which would silently drop its rows from the shard
+    failed_sources = [name for name, timing in source_timings.items()
+                      if timing["status"] != "ok" or data_extraction.extraction_error(source_data.get(name))]
+    if failed_sources:
+        raise RuntimeError(f"Extraction failed for sources {failed_sources}.")
+
+    if unified:
+        transformed_data = data_unification.unify_sources(source_data)
+    else:
+        raw_data = pd.concat(list(source_data.values()), ignore_index=True)
+        transformed_data = data_transformation.clean_and_transform(
+            raw_data, engine=pipeline_scheduler.TRANSFORM_ENGINE, partitions=pipeline_scheduler.TRANSFORM_PARTITIONS)
+    if transformed_data.empty and any(not df.empty for df in source_data.values()):
+        raise RuntimeError("Transformation produced no rows from non-empty sources.")
+
+    kpi_data = kpi_analysis.calculate_all_kpis(transformed_data)
+    if load and not transformed_data.empty:
+        pipeline_scheduler.run_data_loading(transformed_data)
+
+    shard_path = os.path.join(results_path, run_id, f"shard-{shard['shard_id']:05d}")
+    result = {}
+    for name, df in [("transformed", transformed_data), ("kpis", kpi_data)]:
+        path = f"{shard_path}-{name}.parquet"
+        _write_result(df, path)
+        result[name] = {"path": path, "rows": len(df)}
+    return result
+
+def _renew_lease(queue, run_id, shard_id, worker, lease_seconds, stop):
+    """
+    Renews a shard lease every third of its duration until stop is set or the lease is lost.
+    """
+    while not stop.wait(lease_seconds / 3):
+        if not queue.renew(run_id, shard_id, worker, lease_seconds):
+            print(f"Worker {worker} lost the lease of shard {shard_id}.")
+            return
+
+def run_worker(run_id, queue_path=SHARD_QUEUE_PATH, results_path=SHARD_RESULTS_PATH, worker=None, load=True,
+               unified=False, lease_seconds=SHARD_LEASE_SECONDS, poll_seconds=SHARD_POLL_SECONDS):
+    """
+    Claims and runs shards of a run until none is pending or running.
+
+    While other workers still hold shards, the worker keeps polling, so it can take over a
+    shard whose worker died once that shard's lease expires.
+
+    Args:
+        run_id (str): Run identifier.
+        queue_path (str): Queue database file.
+        results_path (str): Directory of the shard outputs.
+        worker (str, optional): Worker identifier. Defaults to "<host>:<pid>".
+        load (bool): Load each shard into Snowflake.
+        unified (bool): Build the dense fact table instead of the cleaned aggregate.
+        lease_seconds (float): Lease duration.
+        poll_seconds (float): Wait between claims while no shard is available.
+
+    Returns:
+        int: Number of shards this worker completed.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}" if worker is None else worker
+    queue = ShardQueue(queue_path)
+    completed = 0
+    while True:
+        shard = queue.claim(run_id, worker, lease_seconds)
+        if shard is None:
+            if queue.unfinished(run_id) == 0:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        print(f"Worker {worker} running shard {shard['shard_id']} "
+              f"({shard['first_warehouse']}..{shard['last_warehouse']}, attempt {shard['attempts']}).")
+        stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=_renew_lease, args=(queue, run_id, shard["shard_id"], worker, lease_seconds, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = run_shard(shard, run_id, results_path=results_path, load=load, unified=unified)
+            if queue.complete(run_id, shard["shard_id"], worker, result):
+                completed += 1
+        except Exception as e:
+            print(f"Error in shard {shard['shard_id']} on worker {worker}: {e}")
+            queue.fail(run_id, shard["shard_id"], worker, str(e))
+        finally:
+            stop.set()
+            heartbeat.join()
+    print(f"Worker {worker} finished after completing {completed} shards.")
+    return completed
+
+def merge_shard_results(shards, name):
+    """
+    Concatenates one output of all shards in shard order, which is warehouse order.
+
+    Args:
+        shards (list): Finished shards, as returned by ShardQueue.shards.
+        name (str): "transformed" or "kpis".
+
+    Returns:
+        pd.DataFrame: Merged output.
+    """
+    frames = [pd.read_parquet(shard["result"][name]["path"]) for shard in shards if shard["result"][name]["rows"]]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def _start_workers(context, count, run_id, queue_path, results_path, load, unified, poll_seconds):
+    """
+    Starts local worker processes.
+
+    Returns:
+        list: Started processes.
+    """
+    processes = []
+    for _ in range(count):
+        process = context.Process(target=run_worker, args=(run_id, queue_path, results_path),
+                                  kwargs={"load": load, "unified": unified, "poll_seconds": poll_seconds})
+        process.start()
+        processes.append(process)
+    return processes
+
+@instrument("shard.coordinator")
+def run_sharded_pipeline(workers=SHARD_WORKERS, shard_count=SHARD_COUNT, run_id=None, warehouse_ids=None,
+                         queue_path=SHARD_QUEUE_PATH, results_path=SHARD_RESULTS_PATH, load=True, unified=False,
+                         poll_seconds=SHARD_POLL_SECONDS):
+    """
+    Runs the pipeline sharded by warehouse across local worker processes and any remote workers.
+
+    Remote nodes join a run with `warehouse-pipeline shard-worker --run-id <run_id>` against the
+    same queue file and results directory. Local workers that die are replaced while shards
+    are unfinished. The dashboard and alerts stages run on the merged outputs only when every
+    shard succeeded, since the dashboard export replaces partitions of warehouses it is not given.
+
+    Args:
+        workers (int): Local worker processes; 0 leaves the shards to remote workers.
+        shard_count (int): Number of warehouse ranges.
+        run_id (str, optional): Identifier of the run. Defaults to the current time; running an
+            existing run_id again resumes it, re-running only shards that are not done; failed
+            shards get a fresh set of attempts.
+        warehouse_ids (list, optional): Warehouses to process. Discovered from the sources by default.
+        queue_path (str): Queue database file.
+        results_path (str): Directory of the shard outputs.
+        load (bool): Load each shard into Snowflake.
+        unified (bool): Build the dense fact table instead of the cleaned aggregate.
+        poll_seconds (float): Interval of the progress checks, also used by the local workers.
+
+    Returns:
+        tuple: (pd.DataFrame, dict) merged KPI data, and a summary with the run_id, the shard
+            counts by status and the failed shards. The KPI data is empty when the run is incomplete.
+    """
+    run_id = datetime.datetime.now().strftime("%Y%m%dT%H%M%S") if run_id is None else run_id
+    queue = ShardQueue(queue_path)
+    if queue.shards(run_id):
+        reset = queue.reset_failed(run_id)
+        if reset:
+            print(f"Resuming run {run_id}: retrying {reset} failed shards.")
+        if queue.unfinished(run_id):
+            # Warm the file caches once here, as discovery does for a new run, rather than in every worker
+            _read_file_warehouses()
+    else:
+        warehouse_ids = discover_warehouse_ids() if warehouse_ids is None else warehouse_ids
+        if not warehouse_ids:
+            print("No warehouses to process.")
+            return pd.DataFrame(), {"run_id": run_id, "counts": {}, "failed": []}
+        queue.enqueue(run_id, plan_shards(warehouse_ids, shard_count))
+    print(f"Run {run_id}: {queue.counts(run_id)} shards, {workers} local workers.")
+
+    context = multiprocessing.get_context(SHARD_START_METHOD)
+    processes = _start_workers(context, workers, run_id, queue_path, results_path, load, unified, poll_seconds)
+    restarts = 0
+    try:
+        while queue.unfinished(run_id):
+            time.sleep(poll_seconds)
+            dead = [process for process in processes if not process.is_alive() and process.exitcode != 0]
+            processes = [process for process in processes if process not in dead]
+            replacements = min(len(dead), SHARD_MAX_WORKER_RESTARTS - restarts)
+            if dead and queue.unfinished(run_id) and replacements > 0:
+                print(f"Replacing {replacements} local workers that exited abnormally.")
+                processes += _start_workers(context, replacements, run_id, queue_path, results_path, load, unified,
+                                                poll_seconds)
+                restarts += replacements
+            elif workers and not any(process.is_alive() for process in processes):
+                print("No local workers are left; stopping before the run is complete.")
+                break
+    finally:
+        for process in processes:
+            process.join()
+
+    shards = queue.shards(run_id)
+    summary = {
+        "run_id": run_id,
+        "counts": queue.counts(run_id),
+        "failed": [{"shard_id": shard["shard_id"], "warehouses": f"{shard['first_warehouse']}..{shard['last_warehouse']}",
+                    "error": shard["error"]} for shard in shards if shard["status"] == "failed"]
+    }
+    if summary["failed"] or queue.unfinished(run_id):
+        print(f"Run {run_id} is incomplete ({summary['counts']}, failed shards {summary['failed']}); "
+              f"skipping the dashboard and alerts.")
+        return pd.DataFrame(), summary
+
+    transformed_data = merge_shard_results(shards, "transformed")
+    kpi_data = merge_shard_results(shards, "kpis")
+    dashboard_data = pipeline_scheduler.run_dashboard_preparation(transformed_data)
+    pipeline_scheduler.run_alerts(dashboard_data)
+    print(f"Sharded run {run_id} completed: {len(shards)} shards, {len(transformed_data)} rows.")
+    return kpi_data, summary
+
+if __name__ == "__main__":
+    # Example usage
+    kpi_results, run_summary = run_sharded_pipeline()
+    print(run_summary)
+    print(kpi_results.head())
@@ -0,0 +1,218 @@
+"""
+streaming_alerts.py
+
+This module evaluates alert thresholds on IoT data as it arrives instead of after the nightly batch.
+It tails the IoT directory for new sensor files (or consumes any incremental feed of DataFrames),
+keeps the latest stock level per warehouse and product in memory, and re-evaluates the
+'Total Inventory' and 'inventory_utilization' thresholds only for warehouses touched by each
+micro-batch.
+Author: Satej
+"""
+
+import os  # For listing sensor files
+import time  # For polling intervals
+import pandas as pd  # For handling data
+import alerts_automation  # For threshold evaluation and alert delivery
+import iot_ingestion  # For schema-pinned sensor file reads
+from data_extraction import IOT_DATA_PATH  # Directory of incoming sensor files
+
+# Polling behaviour of the IoT directory tailer
+STREAM_POLL_SECONDS = 5
+STREAM_FILE_SETTLE_SECONDS = 2  # Files modified more recently are assumed to still be written
+
+# Storage capacity per warehouse, used to derive inventory utilization when readings lack it
+WAREHOUSE_STORAGE_CAPACITY = {}
+
+class StreamingThresholdEngine:
+    """
+    Rolling per-warehouse inventory state with threshold evaluation per micro-batch.
+
+    Each reading is the current stock level of one product in one warehouse, so a warehouse's
+    total inventory is the sum of the latest reading of each of its products.
+
+    Args:
+        thresholds (dict, optional): Per-warehouse threshold overrides. Defaults to the configured thresholds.
+        storage_capacity (dict, optional): Storage capacity per warehouse. Defaults to WAREHOUSE_STORAGE_CAPACITY.
+        dispatcher (AlertDispatcher, optional): Dispatcher for alert delivery.
+        cooldown_store (AlertCooldownStore, optional): Deduplication store.
+    """
+
+    def __init__(self, thresholds=None, storage_capacity=None, dispatcher=None, cooldown_store=None):
+        self.thresholds = alerts_automation.load_thresholds() if thresholds is None else thresholds
+        self.dispatcher = dispatcher
+        self.cooldown_store = cooldown_store
+        self._capacity = pd.Series(WAREHOUSE_STORAGE_CAPACITY if storage_capacity is None else storage_capacity,
+                                   dtype=float)
+        self._levels = pd.DataFrame(
+            {'quantity': pd.Series(dtype=float), 'date': pd.Series(dtype='datetime64[ns]')},
+            index=pd.MultiIndex.from_arrays([[], []], names=['warehouse_id', 'product_id'])
+        )
+
+    def _update_levels(self, readings):
+        """
+        Merges a micro-batch into the latest-level state, ignoring readings older than the state.
+
+        Args:
+            readings (pd.DataFrame): Readings with warehouse_id, product_id, date and quantity.
+
+        Returns:
+            pd.Index: Warehouses whose state changed.
+        """
+        latest = (
+            readings.dropna(subset=['warehouse_id', 'product_id', 'quantity'])
+            .assign(warehouse_id=lambda df: df['warehouse_id'].astype(str),
+                    product_id=lambda df: df['product_id'].astype(str),
+                    date=lambda df: pd.to_datetime(df['date']))
+            .sort_values('date', kind='stable')
+            .drop_duplicates(subset=['warehouse_id', 'product_id'], keep='last')
+            .set_index(['warehouse_id', 'product_id'])[['quantity', 'date']]
+        )
+
+        previous_dates = self._levels['date'].reindex(latest.index)
+        newer = previous_dates.isna() | (latest['date'] >= previous_dates)
+        latest = latest[newer]
+
+        self._levels = pd.concat([self._levels[~self._levels.index.isin(latest.index)], latest])
+        return latest.index.get_level_values('warehouse_id').unique()
+
+    def warm_start(self, readings):
+        """
+        Loads existing readings into the state without raising alerts.
+
+        Args:
+            readings (pd.DataFrame): Historical readings.
+        """
+        if not readings.empty:
+            self._update_levels(readings)
+
+    def warehouse_state(self, warehouse_ids=None):
+        """
+        Builds the current dashboard-style metrics per warehouse.
+
+        Args:
+            warehouse_ids (list, optional): Warehouses to include; all when omitted.
+
+        Returns:
+            pd.DataFrame: 'Warehouse ID', 'Total Inventory' and 'inventory_utilization' per warehouse.
+        """
+        levels = self._levels
+        if warehouse_ids is not None:
+            levels = levels[levels.index.get_level_values('warehouse_id').isin(warehouse_ids)]
+        totals = levels['quantity'].groupby(level='warehouse_id').sum()
+        utilization = totals / self._capacity.reindex(totals.index) * 100
+        return pd.DataFrame({
+            'Warehouse ID': totals.index,
+            'Total Inventory': totals.to_numpy(),
+            'inventory_utilization': utilization.to_numpy()
+        })
+
+    def process_batch(self, readings):
+        """
+        Applies a micro-batch of readings and raises alerts for the warehouses it touched.
+
+        Args:
+            readings (pd.DataFrame): Readings with warehouse_id, product_id, date and quantity,
+                and optionally storage_capacity.
+
+        Returns:
+            pd.DataFrame: Alerts queued for delivery.
+        """
+        if readings.empty:
+            return pd.DataFrame()
+
+        if 'storage_capacity' in readings.columns:
+            capacity = readings.dropna(subset=['storage_capacity']).groupby(
+                readings['warehouse_id'].astype(str))['storage_capacity'].last()
+            self._capacity = capacity.combine_first(self._capacity)
+
+        affected = self._update_levels(readings)
+        if affected.empty:
+            return pd.DataFrame()
+        return alerts_automation.check_thresholds_and_alerts(
+            self.warehouse_state(affected), self.dispatcher, self.cooldown_store, self.thresholds
+        )
+
+    def process_feed(self, batches):
+        """
+        Consumes any iterable of DataFrame micro-batches, such as tail_iot_files or an
+        incremental extraction feed.
+
+        Args:
+            batches (iterable): DataFrames of readings.
+        """
+        for batch in batches:
+            self.process_batch(batch)
+
+def snapshot_iot_files(data_path=IOT_DATA_PATH):
+    """
+    Records the size and modification time of every sensor file currently in the directory.
+
+    Args:
+        data_path (str): Directory of sensor files.
+
+    Returns:
+        dict: Mapping of path to (size, mtime).
+    """
+    snapshot = {}
+    for name in os.listdir(data_path):
+        if name.endswith('.csv'):
+            stat = os.stat(os.path.join(data_path, name))
+            snapshot[os.path.join(data_path, name)] = (stat.st_size, stat.st_mtime)
+    return snapshot
+
+def tail_iot_files(data_path=IOT_DATA_PATH, poll_seconds=STREAM_POLL_SECONDS, seen=None):
+    """
+    Yields the readings of sensor files as they appear in the IoT directory.
+
+    Args:
+        data_path (str): Directory of incoming sensor files.
+        poll_seconds (float): Seconds between directory scans.
+        seen (dict, optional): Mapping of path to (size, mtime) of files already processed;
+            defaults to the files present at start-up.
+
+    Yields:
+        pd.DataFrame: Readings of the files that appeared since the previous scan.
+    """
+    seen = snapshot_iot_files(data_path) if seen is None else seen
+
+    while True:
+        now = time.time()
+        new_files = []
+        for name in sorted(os.listdir(data_path)):
+            if not name.endswith('.csv'):
+                continue
+            file_path = os.path.join(data_path, name)
+            stat = os.stat(file_path)
+            signature = (stat.st_size, stat.st_mtime)
+            if seen.get(file_path) != signature and now - stat.st_mtime >= STREAM_FILE_SETTLE_SECONDS:
+                seen[file_path] = signature
+                new_files.append(file_path)
+
+        if new_files:
+            yield pd.concat([iot_ingestion.read_sensor_file(file) for file in new_files], ignore_index=True)
+        else:
+            time.sleep(poll_seconds)
+
+def run_streaming_alerts(data_path=IOT_DATA_PATH, poll_seconds=STREAM_POLL_SECONDS, engine=None):
+    """
+    Runs the streaming alert loop over the IoT directory until interrupted.
+
+    Args:
+        data_path (str): Directory of incoming sensor files.
+        poll_seconds (float): Seconds between directory scans.
+        engine (StreamingThresholdEngine, optional): Engine to use; a new one by default.
+    """
+    engine = StreamingThresholdEngine() if engine is None else engine
+
+    # Warm the state from the columnar cache so existing stock levels are known before tailing
+    seen = snapshot_iot_files(data_path)
+    engine.warm_start(iot_ingestion.ingest_iot_data(data_path))
+
+    print(f"Streaming alerts started on: {data_path}")
+    try:
+        engine.process_feed(tail_iot_files(data_path, poll_seconds, seen))
+    except KeyboardInterrupt:
+        print("Streaming alerts stopped.")
+
+if __name__ == "__main__":
+    run_streaming_alerts()
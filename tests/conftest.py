@@ -0,0 +1,11 @@
+"""
+conftest.py
+
+Shared pytest setup: makes the pipeline modules, which live at the repository root, importable.
+Author: Satej
+"""
+
+import os  # For locating the repository root
+import sys  # For the import path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,128 @@
+"""
+test_alerts_automation.py
+
+Tests of the alert dispatcher against a local SMTP stand-in.
+Author: Satej
+"""
+
+import time  # For waiting out a batch window
+import threading  # For serving the SMTP stand-in
+import socketserver  # For the SMTP stand-in
+from email import message_from_bytes  # For reading delivered digests
+import pandas as pd  # For building test data
+import pytest  # For the SMTP stand-in fixture
+import alerts_automation  # Module under test
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP session: accepts every message, refuses the server's refused recipients."""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == "QUIT":
+                self.reply("221 bye")
+                return
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command == "RCPT":
+                recipient = line.split(":", 1)[1].strip("<> ")
+                if recipient in self.server.refused:
+                    self.reply("550 no such user")
+                else:
+                    recipients.append(recipient)
+                    self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 end with .")
+                data = b""
+                while (chunk := self.rfile.readline()) != b".\r\n":
+                    data += chunk
+                self.server.messages.append((recipients, message_from_bytes(data)))
+                recipients = []
+                self.reply("250 queued")
+                if self.server.drop_after_message:
+                    return
+            else:
+                self.reply("250 ok")
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+@pytest.fixture
+def smtp_server():
+    server = _SMTPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.connections, server.messages, server.refused, server.drop_after_message = 0, [], set(), False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _alerts(*warehouse_ids):
+    return pd.DataFrame({"warehouse_id": list(warehouse_ids), "alert_type": "Low Inventory",
+                         "message": [f"Inventory in Warehouse {w} is low." for w in warehouse_ids]})
+
+def _dispatcher(server, cooldown_store, batch_window_seconds=0.5):
+    return alerts_automation.AlertDispatcher(
+        "127.0.0.1", server.server_address[1], username=None, use_starttls=False, cooldown_store=cooldown_store,
+        batch_window_seconds=batch_window_seconds)
+
+def test_alerts_are_batched_per_recipient_and_survive_dropped_sessions(monkeypatch, smtp_server):
+    monkeypatch.setattr(alerts_automation, "WAREHOUSE_RECIPIENTS", {"W2": ["a@example.com", "b@example.com"]})
+    monkeypatch.setattr(alerts_automation, "ALERT_RECIPIENTS", ["a@example.com"])
+    smtp_server.drop_after_message = True
+    store = alerts_automation.AlertCooldownStore(path=None)
+    dispatcher = _dispatcher(smtp_server, store)
+
+    dispatcher.submit(store.reserve(_alerts("W1")))
+    dispatcher.submit(store.reserve(_alerts("W2", "W1")))
+    dispatcher.close()
+
+    # W1 was still in cooldown on the second submission; one digest per recipient, reconnecting after each drop
+    assert [(recipients, message["Subject"]) for recipients, message in smtp_server.messages] == [
+        (["a@example.com"], "Warehouse Alerts: 2 new alert(s)"), (["b@example.com"], "Warehouse Alerts: 1 new alert(s)")]
+    assert smtp_server.connections == 2
+
+def test_only_alerts_no_recipient_received_leave_cooldown(monkeypatch, smtp_server):
+    monkeypatch.setattr(alerts_automation, "WAREHOUSE_RECIPIENTS", {
+        "W1": ["a@example.com"], "W2": ["a@example.com", "b@example.com"], "W3": ["b@example.com"]})
+    smtp_server.refused = {"b@example.com"}
+    store = alerts_automation.AlertCooldownStore(path=None)
+    dispatcher = _dispatcher(smtp_server, store, batch_window_seconds=0)
+
+    dispatcher.submit(store.reserve(_alerts("W1", "W2", "W3")))
+    dispatcher.close()
+
+    assert list(store.reserve(_alerts("W1", "W2", "W3"))["warehouse_id"]) == ["W3"]
+
+class _UnavailableOnce(dict):
+    """Recipient mapping whose first lookup fails."""
+    calls = 0
+
+    def get(self, key, default=None):
+        _UnavailableOnce.calls += 1
+        if _UnavailableOnce.calls == 1:
+            raise RuntimeError("recipient directory unavailable")
+        return super().get(key, default)
+
+def test_a_failing_batch_does_not_stop_the_dispatcher(monkeypatch, smtp_server):
+    monkeypatch.setattr(alerts_automation, "WAREHOUSE_RECIPIENTS", _UnavailableOnce())
+    monkeypatch.setattr(alerts_automation, "ALERT_RECIPIENTS", ["a@example.com"])
+    store = alerts_automation.AlertCooldownStore(path=None)
+    dispatcher = _dispatcher(smtp_server, store, batch_window_seconds=0)
+
+    dispatcher.submit(store.reserve(_alerts("W1")))
+    time.sleep(0.5)
+    dispatcher.submit(store.reserve(_alerts("W2")))
+    dispatcher.close()
+
+    assert [message["Subject"] for _, message in smtp_server.messages] == ["Warehouse Alerts: 1 new alert(s)"]
+    assert "W2" in smtp_server.messages[0][1].get_payload()[0].get_payload()
+    # The batch that failed was released from the cooldown, so the next run retries it
+    assert list(store.reserve(_alerts("W1", "W2"))["warehouse_id"]) == ["W1"]
@@ -0,0 +1,60 @@
+"""
+test_connection_pool.py
+
+Tests of the shared connection pools.
+Author: Satej
+"""
+
+import time  # For letting connections go idle
+import sqlite3  # Local stand-in for the ODBC databases
+import pytest  # For expected errors
+import connection_pool  # Module under test
+
+@pytest.fixture(autouse=True)
+def isolated_pools(monkeypatch):
+    monkeypatch.setattr(connection_pool, "_pools", {})
+    monkeypatch.setattr(connection_pool, "_pool_options", {})
+
+def _readonly_connect(dsn):
+    return sqlite3.connect(f"file:{dsn}?mode=ro", uri=True)
+
+def test_pools_are_keyed_by_factory_and_reject_other_options(tmp_path):
+    dsn = str(tmp_path / "warehouse.db")
+    sqlite3.connect(dsn).close()
+
+    pool = connection_pool.get_pool(dsn, sqlite3.connect, health_check_query="SELECT 1")
+
+    assert connection_pool.get_pool(dsn, sqlite3.connect, health_check_query="SELECT 1") is pool
+    assert connection_pool.get_pool(dsn, _readonly_connect).connect is _readonly_connect
+    assert set(connection_pool.pool_metrics()) == {dsn, f"{dsn} #2"}
+    with pytest.raises(ValueError):
+        connection_pool.get_pool(dsn, sqlite3.connect, health_check_query="SELECT 2")
+
+def test_health_checks_and_idle_eviction_replace_connections(monkeypatch):
+    monkeypatch.setattr(connection_pool, "POOL_HEALTH_CHECK_AFTER_SECONDS", 0)
+    healthy = connection_pool.ConnectionPool(":memory:", sqlite3.connect)
+    failing = connection_pool.ConnectionPool(":memory:", sqlite3.connect, health_check_query="SELECT * FROM missing")
+    expiring = connection_pool.ConnectionPool(":memory:", sqlite3.connect, max_idle_seconds=0)
+
+    for pool in [healthy, failing, expiring]:
+        with pool.connection() as first:
+            assert pool.metrics()["in_use"] == 1
+        time.sleep(0.01)
+        with pool.connection() as second:
+            pass
+        assert (second is first) == (pool is healthy)
+
+    assert healthy.metrics() | {"wait_seconds": 0} == {
+        "created": 1, "reused": 1, "evicted_idle": 0, "failed_health_checks": 0, "discarded": 0, "in_use": 0,
+        "wait_seconds": 0, "idle": 1, "max_size": connection_pool.POOL_MAX_SIZE}
+    assert (failing.metrics()["created"], failing.metrics()["failed_health_checks"]) == (2, 1)
+    assert (expiring.metrics()["created"], expiring.metrics()["evicted_idle"]) == (2, 1)
+
+def test_a_connection_used_by_a_failing_block_is_discarded():
+    pool = connection_pool.ConnectionPool(":memory:", sqlite3.connect)
+
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            raise RuntimeError("query failed")
+
+    assert (pool.metrics()["discarded"], pool.metrics()["idle"], pool.metrics()["in_use"]) == (1, 0, 0)
@@ -0,0 +1,64 @@
+"""
+test_dashboard_setup.py
+
+Tests of incremental dashboard cube refreshes against a cube rebuilt from scratch.
+Author: Satej
+"""
+
+import numpy as np  # For generating test measures
+import pandas as pd  # For building test data
+import dashboard_setup  # Module under test
+
+def _transformed(warehouse_ids, dates, seed):
+    # One row per (warehouse_id, date), as transform_data aggregates
+    rng = np.random.default_rng(seed)
+    rows = [(warehouse, date) for warehouse in warehouse_ids for date in pd.to_datetime(dates)]
+    df = pd.DataFrame(rows, columns=["warehouse_id", "date"])
+    df["total_quantity"] = rng.integers(1, 100, len(df)).astype(float)
+    df["average_order_value"] = rng.integers(10, 500, len(df)).astype(float)
+    return df
+
+def _replace_days(*batches):
+    # Later rows of a (warehouse_id, date) replace earlier ones, as the refresh does
+    final = pd.concat(batches, ignore_index=True)
+    return final.drop_duplicates(subset=["warehouse_id", "date"], keep="last")
+
+def test_incremental_refreshes_match_a_full_rebuild(tmp_path):
+    initial = _transformed(["W1", "W2"], pd.date_range("2024-01-25", "2024-03-10"), seed=1)
+    appended = _transformed(["W1", "W2"], pd.date_range("2024-03-11", "2024-03-20"), seed=2)
+    # Restates days mid-week and mid-month
+    restated = _transformed(["W1"], ["2024-02-14", "2024-03-05"], seed=3)
+    backfilled = _transformed(["W2"], pd.date_range("2024-01-20", "2024-01-28"), seed=4)
+    new_warehouse = _transformed(["W3"], pd.date_range("2024-03-01", "2024-03-20"), seed=5)
+
+    incremental_path = str(tmp_path / "incremental")
+    dashboard_setup.refresh_dashboard_cube(initial, export_path=incremental_path)
+    for update in [appended, restated, backfilled, new_warehouse]:
+        incremental = dashboard_setup.refresh_dashboard_cube(update, export_path=incremental_path)
+
+    final = _replace_days(initial, appended, restated, backfilled, new_warehouse)
+    full = dashboard_setup.refresh_dashboard_cube(final, export_path=str(tmp_path / "full"), full=True)
+
+    assert list(incremental) == list(dashboard_setup.CUBE_GRAINS)
+    for grain in dashboard_setup.CUBE_GRAINS:
+        pd.testing.assert_frame_equal(incremental[grain], full[grain], check_dtype=False)
+        # The stored tables are the ones the next incremental refresh starts from
+        pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "incremental" / f"{grain}.parquet"),
+                                      full[grain], check_dtype=False)
+
+def test_refreshed_cube_matches_direct_aggregation(tmp_path):
+    initial = _transformed(["W1", "W2"], pd.date_range("2024-01-01", "2024-01-31"), seed=6)
+    restated = _transformed(["W2"], ["2024-01-10"], seed=7)
+    dashboard_setup.refresh_dashboard_cube(initial, export_path=str(tmp_path))
+    cube = dashboard_setup.refresh_dashboard_cube(restated, export_path=str(tmp_path))
+
+    final = _replace_days(initial, restated)
+    row = cube["warehouse_week"].set_index(["Warehouse ID", "Period Start"]).loc[("W2", pd.Timestamp("2024-01-08"))]
+    week = final[(final["warehouse_id"] == "W2") & final["date"].between("2024-01-08", "2024-01-14")]
+    assert row["Total Inventory"] == week["total_quantity"].sum()
+    assert row["Peak Daily Inventory"] == week["total_quantity"].max()
+    assert row["Average Order Value"] == week["average_order_value"].mean()
+    assert row["Days"] == len(week)
+
+    month = cube["region_month"].set_index("Region").loc[dashboard_setup.DEFAULT_REGION]
+    assert month["Total Inventory"] == final["total_quantity"].sum()
@@ -0,0 +1,164 @@
+"""
+test_data_extraction.py
+
+Tests of the extraction stage.
+Author: Satej
+"""
+
+import sqlite3  # Local stand-in for the ODBC databases
+import pytest  # For expected errors
+import pandas as pd  # For building test data
+import data_extraction  # Module under test
+import data_transformation  # For chunk-wise aggregation of streamed data
+
+def _unavailable(*args, **kwargs):
+    raise ConnectionError("ODBC driver not available")
+
+def test_extract_all_reports_failed_sources(monkeypatch):
+    monkeypatch.setattr(data_extraction, "database_connection", _unavailable)
+    sources = {
+        "sql_server": data_extraction.extract_from_sql_server,
+        "oracle": data_extraction.extract_from_oracle,
+        "flat": lambda: pd.DataFrame({"warehouse_id": ["W1"]})
+    }
+
+    data, timings = data_extraction.extract_all(sources=sources)
+
+    assert timings["sql_server"]["status"] == "error"
+    assert timings["oracle"]["status"] == "error"
+    assert timings["flat"]["status"] == "ok"
+    assert data["sql_server"].empty
+    assert "ODBC driver" in data_extraction.extraction_error(data["oracle"])
+    assert data_extraction.extraction_error(data["flat"]) is None
+
+def test_stream_query_streams_chunks_from_sqlite(tmp_path):
+    rows = [("W1", "P1", "2024-01-01", 5.0, 10.0), ("W1", "P2", "2024-01-01", 3.0, 20.0),
+            ("W2", "P1", "2024-01-01", 1.0, None), ("W1", "P1", "2024-01-02", 2.0, 30.0),
+            ("W2", "P3", "2024-01-02", 4.0, 40.0), ("W2", "P3", "2024-01-02", 6.0, 50.0),
+            ("W1", "P2", "2024-01-03", 7.0, 60.0)]
+    database = str(tmp_path / "warehouse.db")
+    with sqlite3.connect(database) as conn:
+        conn.execute("CREATE TABLE Orders (warehouse_id TEXT, product_id TEXT, date TEXT, quantity REAL, order_value REAL)")
+        conn.executemany("INSERT INTO Orders VALUES (?, ?, ?, ?, ?)", rows)
+
+    chunks = list(data_extraction.stream_query(database, "Orders", columns=data_extraction.ORDERS_COLUMNS,
+                                               chunk_size=3, connect=sqlite3.connect))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert str(chunks[0]["date"].dtype).startswith("datetime64")
+    assert isinstance(chunks[0]["warehouse_id"].dtype, pd.CategoricalDtype)
+
+    streamed = data_transformation.transform_data(data_transformation.clean_data(iter(chunks)))
+    full = data_transformation.transform_data(data_transformation.clean_data(pd.concat(chunks, ignore_index=True)))
+    sort_keys = ["warehouse_id", "date"]
+    pd.testing.assert_frame_equal(
+        streamed.astype({"warehouse_id": str}).sort_values(sort_keys).reset_index(drop=True),
+        full.astype({"warehouse_id": str}).sort_values(sort_keys).reset_index(drop=True),
+        check_dtype=False
+    )
+    assert len(streamed) == 5
+
+def test_stream_query_parses_every_date_format_in_a_chunk(tmp_path):
+    database = str(tmp_path / "warehouse.db")
+    with sqlite3.connect(database) as conn:
+        conn.execute('CREATE TABLE Inventory (warehouse_id TEXT, "date" TEXT, quantity REAL)')
+        conn.executemany("INSERT INTO Inventory VALUES (?, ?, ?)", [("W1", "2024-01-05", 1.0), ("W1", "01/06/2024", 2.0)])
+
+    chunk = next(data_extraction.stream_query(database, "Inventory", columns=["warehouse_id", "date", "quantity"],
+                                              connect=sqlite3.connect))
+
+    assert list(chunk["date"]) == [pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-06")]
+
+class _RecordingConnection(sqlite3.Connection):
+    """SQLite connection that keeps the cursors it opens."""
+    cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = super().cursor(*args, **kwargs)
+        self.cursors.append(cursor)
+        return cursor
+
+def test_stream_query_closes_the_cursor_when_abandoned(tmp_path):
+    database = str(tmp_path / "warehouse.db")
+    with sqlite3.connect(database) as conn:
+        conn.execute('CREATE TABLE Orders (warehouse_id TEXT, "date" TEXT, quantity REAL)')
+        conn.executemany("INSERT INTO Orders VALUES (?, ?, ?)", [("W1", "2024-01-05", 1.0), ("W2", "2024-01-05", 2.0)])
+    _RecordingConnection.cursors = []
+
+    chunks = data_extraction.stream_query(database, "Orders", columns=["warehouse_id", "date"], chunk_size=1,
+                                          connect=lambda dsn: sqlite3.connect(dsn, factory=_RecordingConnection),
+                                          dialect="oracle")
+    assert list(next(chunks).columns) == ["warehouse_id", "date"]
+    chunks.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        _RecordingConnection.cursors[-1].fetchone()
+    with pytest.raises(ValueError):
+        next(data_extraction.stream_query(database, "Orders; DROP TABLE Orders", connect=sqlite3.connect))
+
+def test_to_sql_quotes_columns_per_dialect(tmp_path):
+    request = data_extraction.ExtractionRequest(
+        columns=["warehouse_id", "date", "quantity"], start_date="2024-01-02", end_date="2024-01-02",
+        warehouse_ids=["W1", "W2"], not_null=["quantity"])
+
+    oracle_query, params = request.to_sql("Orders", "oracle", data_extraction.ORDERS_COLUMNS)
+    sqlserver_query, _ = request.to_sql("Inventory", "sqlserver", data_extraction.INVENTORY_COLUMNS)
+
+    assert oracle_query == (
+        'SELECT warehouse_id, "date", quantity FROM Orders WHERE "date" >= ? AND "date" < ? '
+        'AND warehouse_id IN (?, ?) AND quantity IS NOT NULL'
+    )
+    assert sqlserver_query == (
+        "SELECT [warehouse_id], [date], [quantity] FROM Inventory WHERE [date] >= ? AND [date] < ? "
+        "AND [warehouse_id] IN (?, ?) AND [quantity] IS NOT NULL"
+    )
+    assert params[2:] == ["W1", "W2"]
+
+    # SQLite accepts both quoting styles, so both queries can be run against a stand-in table
+    with sqlite3.connect(str(tmp_path / "warehouse.db")) as conn:
+        for table in ["Orders", "Inventory"]:
+            conn.execute(f'CREATE TABLE {table} (warehouse_id TEXT, "date" TIMESTAMP, quantity REAL)')
+            conn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?)", [
+                ("W1", "2024-01-02 08:00:00", 1.0), ("W2", "2024-01-02 00:00:00", None),
+                ("W3", "2024-01-02 00:00:00", 2.0), ("W1", "2024-01-03 00:00:00", 3.0)])
+        sqlite_params = [str(param) if not isinstance(param, str) else param for param in params]
+        assert conn.execute(oracle_query, sqlite_params).fetchall() == conn.execute(sqlserver_query, sqlite_params).fetchall()
+        assert len(conn.execute(oracle_query, sqlite_params).fetchall()) == 1
+
+def test_extract_changed_groups_returns_whole_changed_groups(tmp_path):
+    database = str(tmp_path / "orders.db")
+    with sqlite3.connect(database) as conn:
+        conn.execute('CREATE TABLE Orders (warehouse_id TEXT, "date" TEXT, quantity REAL, last_modified INTEGER)')
+        conn.executemany("INSERT INTO Orders VALUES (?, ?, ?, ?)", [
+            ("W1", "2024-01-01", 1.0, 1), ("W1", "2024-01-01", 2.0, 5),
+            ("W1", "2024-01-02", 3.0, 2), ("W2", "2024-01-01", 4.0, 3)])
+
+    for dialect in ["oracle", "sqlserver"]:
+        df, watermark = data_extraction.extract_changed_groups(
+            database, "Orders", "last_modified", watermark=2, connect=sqlite3.connect, dialect=dialect)
+
+        assert sorted(df["quantity"]) == [1.0, 2.0, 4.0]
+        assert watermark == 5
+
+def test_apply_filters_dates_with_the_shared_parser():
+    request = data_extraction.ExtractionRequest(start_date="2024-01-02", end_date="2024-01-02")
+    df = pd.DataFrame({
+        "warehouse_id": ["W1", "W2", "W3", "W4"],
+        "date": ["01/02/2024", "2024-01-02T01:00:00+02:00", "2024-01-02T08:00:00", "not a date"],
+    })
+
+    assert list(request.apply(df)["warehouse_id"]) == ["W1", "W3"]
+
+def test_extract_changed_groups_binds_timestamp_watermarks_as_datetimes(tmp_path):
+    database = str(tmp_path / "inventory.db")
+    with sqlite3.connect(database) as conn:
+        conn.execute('CREATE TABLE Inventory (warehouse_id TEXT, "date" TEXT, quantity REAL, last_modified TIMESTAMP)')
+        conn.executemany("INSERT INTO Inventory VALUES (?, ?, ?, ?)", [
+            ("W1", "2024-01-01", 1.0, "2024-01-01 08:00:00"), ("W2", "2024-01-01", 2.0, "2024-01-01 10:00:00")])
+
+    # Bound as the string "2024-01-01T09:00:00", the later change would sort before the watermark
+    df, watermark = data_extraction.extract_changed_groups(
+        database, "Inventory", "last_modified", watermark="2024-01-01T09:00:00", connect=sqlite3.connect)
+
+    assert list(df["warehouse_id"]) == ["W2"]
+    assert pd.Timestamp(watermark) == pd.Timestamp("2024-01-01 10:00:00")
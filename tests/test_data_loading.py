@@ -0,0 +1,132 @@
+"""
+test_data_loading.py
+
+Tests of the staged bulk load, against an in-process DuckDB stand-in for Snowflake.
+Author: Satej
+"""
+
+import os  # For staged file paths
+import re  # For parsing the Snowflake-specific statements
+import shutil  # For copying files into the stand-in stage
+import duckdb  # In-process stand-in for the Snowflake warehouse
+import numpy as np  # For building test data
+import pandas as pd  # For building test data
+import data_loading  # Module under test
+
+class DuckDBSnowflake:
+    """
+    Minimal stand-in for a Snowflake connection: stages are local directories, and the statements
+    bulk_load_to_snowflake issues are translated to DuckDB, which runs MERGE natively.
+
+    Args:
+        stage_root (str): Directory holding the stages.
+    """
+
+    def __init__(self, stage_root):
+        self.database = duckdb.connect()
+        self.stage_root = stage_root
+        self.statements = []
+
+    def cursor(self):
+        return DuckDBSnowflakeCursor(self)
+
+    def stage_path(self, stage_name):
+        return os.path.join(self.stage_root, stage_name)
+
+class DuckDBSnowflakeCursor:
+    """Cursor of DuckDBSnowflake."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = None
+
+    def execute(self, statement):
+        self.connection.statements.append(statement)
+        stage = re.match(r"CREATE TEMPORARY STAGE IF NOT EXISTS (\w+)", statement)
+        remove = re.match(r"REMOVE @(\w+)", statement)
+        put = re.match(r"PUT 'file://(.+)' @(\w+)", statement)
+        like = re.match(r"CREATE OR REPLACE TEMPORARY TABLE (\w+) LIKE (\w+)", statement)
+        copy = re.match(r"COPY INTO (\w+) FROM @(\w+)", statement)
+        if stage:
+            os.makedirs(self.connection.stage_path(stage.group(1)), exist_ok=True)
+        elif remove:
+            shutil.rmtree(self.connection.stage_path(remove.group(1)))
+            os.makedirs(self.connection.stage_path(remove.group(1)))
+        elif put:
+            shutil.copy(put.group(1), self.connection.stage_path(put.group(2)))
+        elif like:
+            self.connection.database.execute(
+                f"CREATE OR REPLACE TEMPORARY TABLE {like.group(1)} AS SELECT * FROM {like.group(2)} LIMIT 0")
+        elif copy:
+            stage_path = self.connection.stage_path(copy.group(2))
+            self.connection.database.execute(
+                f"INSERT INTO {copy.group(1)} BY NAME SELECT * FROM read_parquet('{stage_path}/*.parquet')")
+            # PURGE = TRUE
+            for name in os.listdir(stage_path):
+                os.remove(os.path.join(stage_path, name))
+        else:
+            self.result = self.connection.database.execute(statement)
+
+    def fetchone(self):
+        return self.result.fetchone()
+
+    def close(self):
+        pass
+
+def _transformed(days, quantity):
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    return pd.DataFrame({
+        "warehouse_id": np.repeat(["W1", "W2"], days),
+        "date": np.tile(dates, 2),
+        "total_quantity": np.full(2 * days, quantity),
+        "average_order_value": np.arange(2 * days, dtype="float64")
+    })
+
+def _connection(tmp_path):
+    conn = DuckDBSnowflake(str(tmp_path / "stages"))
+    conn.database.execute(
+        "CREATE TABLE WAREHOUSE_ANALYTICS (warehouse_id VARCHAR, date DATE, total_quantity DOUBLE, "
+        "average_order_value DOUBLE)")
+    return conn
+
+def test_split_to_parquet_files_round_trips_in_bounded_files(tmp_path):
+    df = _transformed(2000, 1.0)
+
+    file_paths = data_loading.split_to_parquet_files(df, str(tmp_path), target_file_mb=0.01)
+    restored = pd.concat([pd.read_parquet(path) for path in file_paths], ignore_index=True)
+
+    assert len(file_paths) > 1
+    assert [os.path.basename(path) for path in file_paths][:2] == ["part_00000.parquet", "part_00001.parquet"]
+    assert max(os.path.getsize(path) for path in file_paths[1:]) < 2 * 0.01 * 1024 * 1024
+    pd.testing.assert_frame_equal(restored.drop(columns="date"), df.drop(columns="date"))
+    assert restored["date"].tolist() == df["date"].dt.date.tolist()
+
+def test_build_merge_statement():
+    statement = data_loading.build_merge_statement(
+        "WAREHOUSE_ANALYTICS", "WAREHOUSE_ANALYTICS_STAGING",
+        ["warehouse_id", "date", "total_quantity", "average_order_value"])
+
+    assert statement == (
+        "MERGE INTO WAREHOUSE_ANALYTICS t USING WAREHOUSE_ANALYTICS_STAGING s "
+        "ON t.warehouse_id = s.warehouse_id AND t.date = s.date "
+        "WHEN MATCHED THEN UPDATE SET total_quantity = s.total_quantity, average_order_value = s.average_order_value "
+        "WHEN NOT MATCHED THEN INSERT (warehouse_id, date, total_quantity, average_order_value) "
+        "VALUES (s.warehouse_id, s.date, s.total_quantity, s.average_order_value)"
+    )
+
+def test_bulk_load_is_idempotent_and_upserts(tmp_path):
+    conn = _connection(tmp_path)
+    query = "SELECT warehouse_id, date, total_quantity FROM WAREHOUSE_ANALYTICS ORDER BY warehouse_id, date"
+
+    assert data_loading.bulk_load_to_snowflake(conn, _transformed(30, 1.0), "WAREHOUSE_ANALYTICS", target_file_mb=0.001)
+    first = conn.database.execute(query).fetchall()
+    assert data_loading.bulk_load_to_snowflake(conn, _transformed(30, 1.0), "WAREHOUSE_ANALYTICS", target_file_mb=0.001)
+    assert conn.database.execute(query).fetchall() == first
+    assert len(first) == 60
+    assert sum(statement.startswith("PUT") for statement in conn.statements) > 2
+
+    # A later load with more days updates the overlapping keys and inserts the new ones
+    assert data_loading.bulk_load_to_snowflake(conn, _transformed(40, 2.0), "WAREHOUSE_ANALYTICS")
+    rows = conn.database.execute(query).fetchall()
+    assert len(rows) == 80
+    assert {row[2] for row in rows} == {2.0}
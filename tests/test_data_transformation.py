@@ -0,0 +1,64 @@
+"""
+test_data_transformation.py
+
+Tests of the cleaning and transformation stage.
+Author: Satej
+"""
+
+import pandas as pd  # For building test data
+import data_transformation  # Module under test
+
+def test_failing_chunk_fails_the_whole_stream():
+    good = pd.DataFrame({"warehouse_id": ["W1"], "product_id": ["P1"], "date": ["2024-01-01"],
+                         "quantity": [5.0], "order_value": [10.0]})
+    bad = good.drop(columns=["quantity"])
+
+    transformed = data_transformation.transform_data(data_transformation.clean_data(iter([good, bad, good])))
+
+    # A failure must not pass the aggregates of the chunks before it off as the full result
+    assert transformed.empty
+
+def _raw(dates):
+    return pd.DataFrame({"warehouse_id": ["W1"] * len(dates), "product_id": ["P1"] * len(dates), "date": dates,
+                         "quantity": [float(i + 1) for i in range(len(dates))], "order_value": [10.0] * len(dates)})
+
+def test_non_iso_dates_are_parsed():
+    transformed = data_transformation.transform_data(
+        data_transformation.clean_data(_raw(["01/05/2024", "01/05/2024", "01/06/2024"])))
+
+    assert transformed["date"].tolist() == [pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-06")]
+    assert transformed["total_quantity"].tolist() == [3.0, 3.0]
+
+def test_offset_dates_are_normalized_to_utc():
+    cleaned = data_transformation.clean_data(_raw(["2024-01-05", "2024-01-05T10:30:00+02:00", "2024-01-06"]))
+
+    assert len(cleaned) == 3
+    assert cleaned["date"].dt.tz is None
+    assert cleaned["date"].tolist() == [pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-05 08:30"),
+                                        pd.Timestamp("2024-01-06")]
+
+def test_unparseable_dates_are_counted(capsys):
+    dates = data_transformation.parse_dates(pd.Series(["2024-01-05", "not a date", None], name="date"))
+
+    assert dates.isna().tolist() == [False, True, True]
+    assert "1 date value(s) in 'date'" in capsys.readouterr().out
+
+def test_engines_match_on_messy_input(tmp_path):
+    raw = pd.DataFrame({
+        "warehouse_id": ["W2", "W1", "W1", None, "W2", "W1", "W2", "W1"],
+        "product_id": ["P1", "P1", "P2", "P1", "P3", "P1", "P2", "P2"],
+        "date": ["2024-01-05", "01/05/2024", "2024-01-05T10:30:00+02:00", "2024-01-05", "not a date",
+                 "2024-01-06", "01/06/2024", None],
+        "quantity": [1.5, 2.0, 3.25, 4.0, 5.0, None, 7.0, 8.0],
+        "order_value": [10.0, None, 30.0, 40.0, 50.0, 60.0, 70.5, 80.0]
+    })
+
+    pandas_result = data_transformation.clean_and_transform(raw.copy(), engine="pandas")
+    duckdb_result = data_transformation.clean_and_transform(raw.copy(), engine="duckdb", spill_path=str(tmp_path))
+    parquet_path = str(tmp_path / "raw.parquet")
+    raw.to_parquet(parquet_path, index=False)
+    parquet_result = data_transformation.clean_and_transform(parquet_path, engine="duckdb", spill_path=str(tmp_path))
+
+    assert len(pandas_result) == 4
+    pd.testing.assert_frame_equal(duckdb_result, pandas_result)
+    pd.testing.assert_frame_equal(parquet_result, pandas_result)
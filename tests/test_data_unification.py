@@ -0,0 +1,23 @@
+"""
+test_data_unification.py
+
+Tests of the source unification.
+Author: Satej
+"""
+
+import pandas as pd  # For building test data
+import data_unification  # Module under test
+
+def test_mixed_offset_dates_are_unified():
+    inventory = pd.DataFrame({
+        "warehouse_id": ["W1", "W1", "W2"],
+        "product_id": ["P1", "P2", "P1"],
+        "date": ["2024-01-01", "2024-01-02T01:00:00+02:00", "01/03/2024"],
+        "quantity": [1.0, 2.0, 3.0],
+    })
+
+    fact = data_unification.unify_sources({"sql_server": inventory})
+
+    assert list(fact["warehouse_id"]) == ["W1", "W2"]
+    assert list(fact["date"]) == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-01-03")]
+    assert list(fact["inventory_quantity"]) == [3.0, 3.0]
@@ -0,0 +1,31 @@
+"""
+test_flat_file_ingestion.py
+
+Tests of the flat-file columnar cache.
+Author: Satej
+"""
+
+import os  # For resetting file times
+from concurrent.futures import ThreadPoolExecutor  # For concurrent manifest writers
+import pandas as pd  # For building test workbooks
+import flat_file_ingestion  # Module under test
+
+def test_concurrent_refreshes_share_one_manifest(tmp_path):
+    workbook = tmp_path / "warehouse_data.xlsx"
+    pd.DataFrame({"warehouse_id": ["W1", "W2"], "quantity": [1.0, 2.0]}).to_excel(workbook, index=False)
+    cache_path = str(tmp_path / "cache")
+    flat_file_ingestion.refresh_cache([str(workbook)], cache_path=cache_path)
+    manifest_path = os.path.join(cache_path, flat_file_ingestion.FLAT_FILE_MANIFEST_FILE)
+    os.utime(manifest_path, ns=(0, 0))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        manifests = list(executor.map(
+            lambda _: flat_file_ingestion.refresh_cache([str(workbook)], cache_path=cache_path), range(8)))
+        # The warm cache is only read
+        assert os.stat(manifest_path).st_mtime_ns == 0
+        assert all(manifest == manifests[0] for manifest in manifests)
+        list(executor.map(lambda _: flat_file_ingestion.save_manifest(manifests[0], cache_path), range(50)))
+
+    # Concurrent saves leave no temporary files behind
+    assert [name for name in os.listdir(cache_path) if name.endswith(".tmp")] == []
+    assert flat_file_ingestion.load_manifest(cache_path) == manifests[0]
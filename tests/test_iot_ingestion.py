@@ -0,0 +1,72 @@
+"""
+test_iot_ingestion.py
+
+Tests of the IoT columnar cache.
+Author: Satej
+"""
+
+import os  # For resetting file times
+from concurrent.futures import ThreadPoolExecutor  # For concurrent manifest writers
+import pandas as pd  # For expected dates
+import iot_ingestion  # Module under test
+
+def test_schema_change_invalidates_cache(tmp_path):
+    data_path = tmp_path / "iot"
+    cache_path = tmp_path / "cache"
+    data_path.mkdir()
+    (data_path / "sensor_1.csv").write_text(
+        "sensor_id,warehouse_id,product_id,date,quantity,temperature,humidity\n"
+        "S1,W1,P1,2024-01-01,5,20.5,40\n"
+    )
+    schema = dict(iot_ingestion.IOT_SENSOR_SCHEMA)
+
+    first = iot_ingestion.refresh_cache(str(data_path), str(cache_path), schema, max_workers=1)
+    unchanged = iot_ingestion.refresh_cache(str(data_path), str(cache_path), schema, max_workers=1)
+    changed_schema = dict(schema, temperature="float64")
+    df = iot_ingestion.ingest_iot_data(str(data_path), str(cache_path), changed_schema, max_workers=1)
+
+    entry = next(iter(first.values()))
+    assert next(iter(unchanged.values()))["cache_file"] == entry["cache_file"]
+    assert df["temperature"].dtype == "float64"
+    # The cache file written with the old schema is replaced, not kept alongside
+    assert sorted(path.name for path in cache_path.glob("*.arrow")) == [
+        iot_ingestion._cache_file_name(str(data_path / "sensor_1.csv"), entry["size"], entry["mtime"], changed_schema)
+    ]
+
+def test_sensor_dates_use_the_shared_parser(tmp_path):
+    (tmp_path / "sensor_1.csv").write_text(
+        "sensor_id,warehouse_id,product_id,date,quantity,temperature,humidity\n"
+        "S1,W1,P1,01/02/2024,5,20.5,40\n"
+        "S1,W1,P1,2024-01-02T01:00:00+02:00,6,20.5,40\n"
+    )
+
+    df = iot_ingestion.read_sensor_file(str(tmp_path / "sensor_1.csv"))
+
+    assert list(df["date"]) == [pd.Timestamp("2024-01-02"), pd.Timestamp("2024-01-01 23:00:00")]
+
+def test_concurrent_manifest_saves_do_not_collide(tmp_path):
+    manifests = [{f"sensor_{worker}.csv": {"rows": worker}} for worker in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in executor.map(lambda manifest: [iot_ingestion.save_manifest(manifest, str(tmp_path)) for _ in range(25)],
+                              manifests):
+            pass
+
+    assert iot_ingestion.load_manifest(str(tmp_path)) in manifests
+    assert [path.name for path in tmp_path.iterdir()] == [iot_ingestion.IOT_MANIFEST_FILE]
+
+def test_warm_cache_is_not_rewritten(tmp_path):
+    data_path = tmp_path / "iot"
+    cache_path = tmp_path / "cache"
+    data_path.mkdir()
+    (data_path / "sensor_1.csv").write_text(
+        "sensor_id,warehouse_id,product_id,date,quantity,temperature,humidity\n"
+        "S1,W1,P1,2024-01-01,5,20.5,40\n"
+    )
+    iot_ingestion.refresh_cache(str(data_path), str(cache_path), max_workers=1)
+    manifest_path = cache_path / iot_ingestion.IOT_MANIFEST_FILE
+    os.utime(manifest_path, ns=(0, 0))
+
+    iot_ingestion.refresh_cache(str(data_path), str(cache_path), max_workers=1)
+
+    assert manifest_path.stat().st_mtime_ns == 0
@@ -0,0 +1,82 @@
+"""
+test_kpi_cache.py
+
+Tests of the partitioned KPI cache against a full KPI computation.
+Author: Satej
+"""
+
+import os  # For checking evicted cache files
+import types  # For a controllable clock
+import pandas as pd  # For building test data
+import kpi_analysis  # For the full computation
+import kpi_cache  # Module under test
+
+def _kpi_inputs():
+    return pd.DataFrame({
+        "warehouse_id": ["W1", "W1", "W2", "W2", "W1", "W1", "W2", "W2"],
+        "date": pd.to_datetime(["2024-01-05", "2024-01-20", "2024-01-07", "2024-01-09",
+                                "2024-02-01", "2024-02-11", "2024-02-03", "2024-02-28"]),
+        "cost_of_goods_sold": [100.0, 80.0, 50.0, 0.0, 120.0, 60.0, 30.0, 90.0],
+        "average_inventory": [20.0, 16.0, 0.0, 10.0, 30.0, 12.0, 15.0, 45.0],
+        "correct_orders": [9.0, 8.0, 5.0, 7.0, 10.0, 3.0, 6.0, 2.0],
+        "total_orders": [10.0, 10.0, 5.0, 0.0, 10.0, 4.0, 8.0, 2.0],
+        "used_space": [50.0, 60.0, 70.0, 80.0, 55.0, 65.0, 75.0, 85.0],
+        "total_space": [100.0] * 8,
+    })
+
+def _counting_evaluate(monkeypatch):
+    evaluated = []
+    evaluate = kpi_analysis.evaluate_kpis
+
+    def counting_evaluate(df, names=None):
+        evaluated.append(len(df))
+        return evaluate(df, names)
+    monkeypatch.setattr(kpi_analysis, "evaluate_kpis", counting_evaluate)
+    return evaluated
+
+def test_cached_kpis_match_full_computation_after_changes(monkeypatch, tmp_path):
+    df = _kpi_inputs()
+    changed = df.copy()
+    changed.loc[7, "total_orders"] = 4.0
+    expected = kpi_analysis.calculate_all_kpis(df)
+    expected_changed = kpi_analysis.calculate_all_kpis(changed)
+    evaluated = _counting_evaluate(monkeypatch)
+
+    cold = kpi_cache.compute_kpis_cached(df, cache_path=str(tmp_path))
+    warm = kpi_cache.compute_kpis_cached(df, cache_path=str(tmp_path))
+    after_change = kpi_cache.compute_kpis_cached(changed, cache_path=str(tmp_path))
+    monkeypatch.setattr(kpi_cache, "KPI_CACHE_VERSION", kpi_cache.KPI_CACHE_VERSION + 1)
+    after_version_bump = kpi_cache.compute_kpis_cached(changed, cache_path=str(tmp_path))
+
+    pd.testing.assert_frame_equal(cold, expected)
+    pd.testing.assert_frame_equal(warm, expected)
+    pd.testing.assert_frame_equal(after_change, expected_changed)
+    pd.testing.assert_frame_equal(after_version_bump, expected_changed)
+    # Cold computes everything, warm nothing, a changed row its (W2, February) partition only
+    assert evaluated == [8, 2, 8]
+
+def test_least_recently_used_partitions_are_evicted(monkeypatch, tmp_path):
+    df = _kpi_inputs()
+    clock = [1.0]
+    monkeypatch.setattr(kpi_cache, "time", types.SimpleNamespace(time=lambda: clock[0]))
+    evaluated = _counting_evaluate(monkeypatch)
+
+    kpi_cache.compute_kpis_cached(df, cache_path=str(tmp_path))
+    index = kpi_cache._load_index(str(tmp_path))
+    clock[0] = 2.0
+    w1_january = df[(df["date"].dt.month == 1) & (df["warehouse_id"] == "W1")]
+    kpi_cache.compute_kpis_cached(w1_january, cache_path=str(tmp_path))
+    clock[0] = 3.0
+    max_bytes = index["W1|2024-01"]["size"] + index["W2|2024-02"]["size"]
+    w2_february = df[(df["date"].dt.month == 2) & (df["warehouse_id"] == "W2")]
+    kpi_cache.compute_kpis_cached(w2_february, cache_path=str(tmp_path), max_bytes=max_bytes)
+
+    # Only the two most recently used partitions fit
+    assert sorted(kpi_cache._load_index(str(tmp_path))) == ["W1|2024-01", "W2|2024-02"]
+    assert not any(os.path.exists(tmp_path / index[key]["file"]) for key in ["W1|2024-02", "W2|2024-01"])
+
+    # Evicted partitions are recomputed on the next full read, which matches the full computation
+    expected = kpi_analysis.calculate_all_kpis(df)
+    del evaluated[:]
+    pd.testing.assert_frame_equal(kpi_cache.compute_kpis_cached(df, cache_path=str(tmp_path)), expected)
+    assert evaluated == [4]
@@ -0,0 +1,57 @@
+"""
+test_kpi_rollups.py
+
+Tests of incremental rollup updates against a rollup rebuilt from scratch.
+Author: Satej
+"""
+
+import numpy as np  # For comparing cumulative arrays
+import pandas as pd  # For building test data
+import kpi_rollups  # Module under test
+
+def _daily(warehouse_ids, dates, seed):
+    rng = np.random.default_rng(seed)
+    rows = [(warehouse, date) for warehouse in warehouse_ids for date in pd.to_datetime(dates)]
+    df = pd.DataFrame(rows, columns=["warehouse_id", "date"])
+    for measure in kpi_rollups.ROLLUP_MEASURES:
+        df[measure] = rng.integers(1, 100, len(df)).astype(float)
+    return df
+
+def _assert_same_rollup(incremental, full, end_date):
+    assert incremental.warehouses() == full.warehouses()
+    for warehouse in full.warehouses():
+        assert incremental._start[warehouse] == full._start[warehouse]
+        np.testing.assert_allclose(incremental._cumulative[warehouse], full._cumulative[warehouse])
+    pd.testing.assert_frame_equal(incremental.trailing_kpis(end_date), full.trailing_kpis(end_date))
+    pd.testing.assert_frame_equal(incremental.monthly_kpis(), full.monthly_kpis())
+
+def test_appended_and_restated_days_match_a_full_rebuild():
+    initial = _daily(["W1", "W2"], pd.date_range("2024-01-10", "2024-03-31"), seed=1)
+    # Skips a few days, so W1's calendar has unobserved days
+    initial = initial[~initial["date"].between("2024-02-05", "2024-02-08") | (initial["warehouse_id"] == "W2")]
+    appended = _daily(["W1", "W2"], pd.date_range("2024-04-01", "2024-04-20"), seed=2)
+    restated = _daily(["W1"], ["2024-02-14", "2024-03-30"], seed=3)
+    backfilled = _daily(["W2"], pd.date_range("2023-12-20", "2024-01-15"), seed=4)
+    new_warehouse = _daily(["W3"], pd.date_range("2024-03-01", "2024-04-20"), seed=5)
+
+    rollup = kpi_rollups.WindowedRollup.from_daily(initial)
+    for update in [appended, restated, backfilled, new_warehouse]:
+        rollup.update(update)
+
+    # Later rows of a (warehouse, date) replace earlier ones, as update does
+    final = pd.concat([initial, appended, restated, backfilled, new_warehouse], ignore_index=True)
+    final = final.drop_duplicates(subset=["warehouse_id", "date"], keep="last")
+    _assert_same_rollup(rollup, kpi_rollups.WindowedRollup.from_daily(final), "2024-04-20")
+
+def test_window_sums_match_direct_sums():
+    df = _daily(["W1"], pd.date_range("2024-01-01", "2024-03-31"), seed=6)
+    df = df[df["date"].dt.dayofweek < 5]
+    rollup = kpi_rollups.WindowedRollup.from_daily(df.iloc[:40])
+    rollup.update(df.iloc[40:])
+
+    for end_date, days in [("2024-03-31", 7), ("2024-03-15", 30), ("2024-02-01", 90)]:
+        window = df[df["date"].between(pd.Timestamp(end_date) - pd.Timedelta(days=days - 1), end_date)]
+        sums = rollup.window_sums("W1", end_date, days)
+        assert sums["observed_days"] == len(window)
+        for measure in kpi_rollups.ROLLUP_MEASURES:
+            assert sums[measure] == window[measure].sum()
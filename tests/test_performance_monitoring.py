@@ -0,0 +1,33 @@
+"""
+test_performance_monitoring.py
+
+Tests of the span instrumentation.
+Author: Satej
+"""
+
+import threading  # For holding both branches open at once
+from concurrent.futures import ThreadPoolExecutor  # For overlapping spans on worker threads
+import performance_monitoring  # Module under test
+
+def test_spans_report_process_memory_and_overlapping_spans():
+    both_open = threading.Barrier(2)
+
+    def branch(name):
+        with performance_monitoring.span(name):
+            both_open.wait(timeout=10)
+            with performance_monitoring.span(f"{name}.step"):
+                pass
+
+    with performance_monitoring.span("test.pipeline"), ThreadPoolExecutor(max_workers=2) as executor:
+        for future in [performance_monitoring.submit_with_context(executor, branch, name)
+                       for name in ["test.left", "test.right"]]:
+            future.result()
+    with performance_monitoring.span("test.alone"):
+        pass
+
+    records = {record["name"]: record for record in performance_monitoring.recent_spans()}
+    # Each branch overlapped the other branch and at most the other branch's step; parents and children never count
+    assert records["test.left"]["overlapping_spans"] >= 1 and records["test.right"]["overlapping_spans"] >= 1
+    assert records["test.pipeline"]["overlapping_spans"] == 0
+    assert records["test.alone"]["overlapping_spans"] == 0
+    assert "process_peak_rss_bytes" in records["test.alone"] and "peak_rss_bytes" not in records["test.alone"]
@@ -0,0 +1,35 @@
+"""
+test_pipeline_scheduler.py
+
+Tests of the pipeline runner.
+Author: Satej
+"""
+
+import pandas as pd  # For building test data
+import checkpoint_store  # For the checkpoint store under the runner
+import data_extraction  # For stubbing the sources
+import pipeline_scheduler  # Module under test
+
+EXTRACTION_STAGES = {"extraction": (pipeline_scheduler.run_data_extraction, [])}
+
+def _extract_all(statuses):
+    def extract_all(request=None):
+        data = {name: pd.DataFrame({"warehouse_id": ["W1"]}) if status == "ok" else pd.DataFrame()
+                for name, status in statuses.items()}
+        timings = {name: {"seconds": 0.0, "status": status} for name, status in statuses.items()}
+        return data, timings
+    return extract_all
+
+def test_partial_extraction_is_not_checkpointed(monkeypatch, tmp_path):
+    checkpoints = checkpoint_store.CheckpointStore(str(tmp_path))
+    monkeypatch.setattr(data_extraction, "extract_all", _extract_all({"sql_server": "error", "iot": "ok"}))
+
+    partial = pipeline_scheduler.run_pipeline(EXTRACTION_STAGES, checkpoints=checkpoints, run_id="r1")
+    assert len(partial["extraction"]) == 1
+    assert checkpoints._load_index() == {}
+
+    # The retry of the run extracts again and, with every source back, is checkpointed
+    monkeypatch.setattr(data_extraction, "extract_all", _extract_all({"sql_server": "ok", "iot": "ok"}))
+    retried = pipeline_scheduler.run_pipeline(EXTRACTION_STAGES, checkpoints=checkpoints, run_id="r1")
+    assert len(retried["extraction"]) == 2
+    assert [entry["stage"] for entry in checkpoints._load_index().values()] == ["extraction"]
@@ -0,0 +1,90 @@
+"""
+test_shard_coordinator.py
+
+Tests of the sharded pipeline's work queue and workers.
+Author: Satej
+"""
+
+import time  # For waiting on the coordinator
+from concurrent.futures import ThreadPoolExecutor  # For running the coordinator next to a worker
+import pandas as pd  # For building test data
+import data_extraction  # For stubbing the sources
+import data_unification  # For the single unified run
+import pipeline_scheduler  # For stubbing the dashboard and alerts stages
+import shard_coordinator  # Module under test
+
+def _orders(request=None):
+    return pd.DataFrame({"warehouse_id": ["W1"], "product_id": ["P1"], "date": ["2024-01-01"], "quantity": [1.0],
+                         "order_value": [10.0]})
+
+def _unavailable(request=None):
+    return data_extraction.failed_extraction(ConnectionError("database is unreachable"))
+
+def test_shard_fails_when_a_source_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_extraction, "EXTRACTION_SOURCES", {"sql_server": _unavailable, "flat_files": _orders})
+    queue = shard_coordinator.ShardQueue(str(tmp_path / "queue.sqlite"))
+    queue.enqueue("r1", [["W1"]])
+
+    completed = shard_coordinator.run_worker("r1", queue.path, str(tmp_path / "shards"), worker="w1", load=False,
+                                             poll_seconds=0)
+
+    shard = queue.shards("r1")[0]
+    assert completed == 0
+    assert (shard["status"], shard["attempts"]) == ("failed", shard_coordinator.SHARD_MAX_ATTEMPTS)
+    assert "sql_server" in shard["error"]
+    assert not (tmp_path / "shards").exists()
+
+def test_resuming_a_run_retries_failed_shards(monkeypatch, tmp_path):
+    monkeypatch.setattr(data_extraction, "EXTRACTION_SOURCES", {"sql_server": _unavailable, "flat_files": _orders})
+    monkeypatch.setattr(pipeline_scheduler, "run_dashboard_preparation", lambda df: df)
+    monkeypatch.setattr(pipeline_scheduler, "run_alerts", lambda df: None)
+    warm_ups = []
+    monkeypatch.setattr(shard_coordinator, "_read_file_warehouses", lambda: warm_ups.append(True) or [])
+    queue = shard_coordinator.ShardQueue(str(tmp_path / "queue.sqlite"))
+    results_path = str(tmp_path / "shards")
+    queue.enqueue("r1", [["W1"]])
+    shard_coordinator.run_worker("r1", queue.path, results_path, worker="w1", load=False, poll_seconds=0)
+    assert queue.counts("r1") == {"failed": 1}
+
+    # With the source back, resuming the run puts the failed shard back in the queue for a remote worker
+    monkeypatch.setattr(data_extraction, "EXTRACTION_SOURCES", {"flat_files": _orders})
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        coordinator = executor.submit(shard_coordinator.run_sharded_pipeline, workers=0, run_id="r1",
+                                      queue_path=queue.path, results_path=results_path, load=False, poll_seconds=0.01)
+        while queue.counts("r1") == {"failed": 1} and not coordinator.done():
+            time.sleep(0.01)
+        shard_coordinator.run_worker("r1", queue.path, results_path, worker="w2", load=False, poll_seconds=0)
+        kpi_data, summary = coordinator.result(timeout=60)
+
+    shard = queue.shards("r1")[0]
+    assert (shard["status"], shard["attempts"], shard["worker"]) == ("done", 1, "w2")
+    assert summary["failed"] == [] and len(kpi_data) == 1
+    # The file caches are warmed once by the coordinator before the workers resume
+    assert warm_ups == [True]
+
+def _source(df):
+    def extract(request=None):
+        return df if request is None else request.apply(df)
+    return extract
+
+def test_sharded_unified_run_matches_single_run(monkeypatch, tmp_path):
+    orders = pd.DataFrame({"order_id": ["O1", "O1", "O2", "O3"], "warehouse_id": ["W1", "W1", "W1", "W2"],
+                           "product_id": ["P1", "P1", "P2", "P1"], "date": ["2024-01-01"] * 4,
+                           "quantity": [1.0, 1.0, 2.0, 4.0], "order_value": [10.0, 10.0, 20.0, 40.0]})
+    iot = pd.DataFrame({"sensor_id": ["S1", "S2", "S3"], "warehouse_id": ["W1", "W1", "W2"],
+                        "product_id": ["P1", "P1", "P1"], "date": ["2024-01-01"] * 3, "quantity": [5.0, 5.0, 1.0],
+                        "temperature": [10.0, 20.0, 30.0], "humidity": [40.0, 50.0, 60.0]})
+    monkeypatch.setattr(data_extraction, "EXTRACTION_SOURCES", {"oracle": _source(orders), "iot": _source(iot)})
+
+    single = data_unification.unify_sources(pipeline_scheduler.run_source_extraction())
+    shards = [{"shard_id": shard_id, "warehouse_ids": warehouse_ids, "result": None}
+              for shard_id, warehouse_ids in enumerate(shard_coordinator.plan_shards(["W1", "W2"], 2))]
+    for shard in shards:
+        shard["result"] = shard_coordinator.run_shard(shard, "r1", results_path=str(tmp_path), load=False, unified=True)
+    sharded = shard_coordinator.merge_shard_results(shards, "transformed")
+
+    assert single.loc[0, ["order_quantity", "order_count", "iot_quantity", "temperature", "humidity"]].tolist() == [
+        3.0, 2, 10.0, 15.0, 45.0]
+    # The shard outputs go through Parquet, which stores the categorical warehouse IDs as strings
+    pd.testing.assert_frame_equal(sharded.astype({"warehouse_id": str}),
+                                  single.astype({"warehouse_id": str}).reset_index(drop=True), check_dtype=False)
@@ -0,0 +1,400 @@
+"""
+warehouse_pipeline.py
+
+This module is the single command-line entry point of the pipeline: `warehouse-pipeline <command>`
+runs one stage (extract, transform, load, kpis, dashboard, alerts), the whole pipeline once, the
+scheduler, a run sharded by warehouse across workers, streaming alerts or the benchmarks. Only argparse is imported up front; each command
+imports the stage modules it needs (and those load their drivers on first use), so `--help` and
+light commands start quickly. Logging and metrics are configured when a command runs, not at
+import time. The `startup` command measures the cold-start time of every command against
+CLI_STARTUP_BUDGET_SECONDS. The repository is not an installable package, so `warehouse-pipeline` is
+a shell alias for `python warehouse_pipeline.py`, which is how the command is run.
+Author: Satej
+"""
+
+import os  # For locating this script
+import sys  # For the exit status
+import time  # For cold-start timings
+import argparse  # For the command-line interface
+import subprocess  # For measuring cold starts in fresh interpreters
+
+# Cold-start budget in seconds per command: interpreter start plus the imports the command needs
+CLI_STARTUP_BUDGET_SECONDS = 1.5
+CLI_STARTUP_REPEATS = 3
+
+# Stage modules each command imports, used by the cold-start measurement
+COMMAND_MODULES = {
+    "extract": ["pandas", "data_extraction"],
+    "transform": ["pandas", "data_transformation"],
+    "load": ["pandas", "data_loading"],
+    "kpis": ["pandas", "kpi_cache"],
+    "dashboard": ["pandas", "dashboard_setup"],
+    "alerts": ["pandas", "alerts_automation"],
+    "stream-alerts": ["streaming_alerts"],
+    "run": ["pipeline_scheduler"],
+    "schedule": ["pipeline_scheduler"],
+    "shard": ["shard_coordinator"],
+    "shard-worker": ["shard_coordinator"],
+    "benchmark": ["benchmark_suite"],
+    "startup": []
+}
+
+def _read_frame(paths):
+    """
+    Reads one or more CSV or Parquet files into a single DataFrame.
+
+    Args:
+        paths (list): Input files; the format is taken from each file extension.
+
+    Returns:
+        pd.DataFrame: Concatenated data.
+    """
+    import pandas as pd  # For handling data
+    frames = [pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path) for path in paths]
+    return pd.concat(frames, ignore_index=True)
+
+def _write_frame(df, path):
+    """
+    Writes a DataFrame to a CSV or Parquet file, or prints a preview when no path is given.
+
+    Args:
+        df (pd.DataFrame): Data to write.
+        path (str, optional): Output file; the format is taken from the extension.
+    """
+    if path is None:
+        print(df.head())
+        return
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    print(f"{len(df):,} rows written to: {path}")
+
+def command_extract(args):
+    """
+    Extracts data from the selected sources and writes the combined raw data.
+    """
+    import pandas as pd  # For combining extracted data
+    import data_extraction  # Extraction stage
+
+    names = args.source or list(data_extraction.EXTRACTION_SOURCES)
+    source_data, source_timings = data_extraction.extract_all(
+        sources={name: data_extraction.EXTRACTION_SOURCES[name] for name in names})
+    for source_name, timing in source_timings.items():
+        print(f"Extraction from {source_name}: {timing['status']} in {timing['seconds']:.2f} seconds")
+    _write_frame(pd.concat(list(source_data.values()), ignore_index=True), args.output)
+    return 0 if all(timing["status"] == "ok" for timing in source_timings.values()) else 1
+
+def command_transform(args):
+    """
+    Cleans and aggregates raw data with the selected engine.
+    """
+    import data_transformation  # Transformation stage
+
+    # The duckdb engine reads Parquet inputs itself, so they never have to fit in memory
+    if args.engine == "duckdb" and all(path.endswith(".parquet") for path in args.input):
+        source = args.input
+    else:
+        source = _read_frame(args.input)
+    engine_options = {"memory_limit": args.memory_limit} if args.memory_limit else {}
+    transformed_data = data_transformation.clean_and_transform(
+        source, engine=args.engine, partitions=args.partitions, **engine_options)
+    _write_frame(transformed_data, args.output)
+    return 0 if not transformed_data.empty else 1
+
+def command_load(args):
+    """
+    Upserts transformed data into the Snowflake table.
+    """
+    import data_loading  # Loading stage
+
+    table_name = args.table or data_loading.WAREHOUSE_TABLE_NAME
+    transformed_data = _read_frame(args.input)
+    with data_loading.snowflake_connection() as connection:
+        data_loading.create_table_if_not_exists(connection, table_name, data_loading.WAREHOUSE_TABLE_SCHEMA)
+        loaded = data_loading.bulk_load_to_snowflake(connection, transformed_data, table_name)
+    return 0 if loaded else 1
+
+def command_kpis(args):
+    """
+    Calculates KPIs on transformed data, serving unchanged partitions from the KPI cache.
+    """
+    import kpi_cache  # KPI stage with the materialized cache
+
+    kpi_data = kpi_cache.compute_kpis_cached(_read_frame(args.input))
+    _write_frame(kpi_data, args.output)
+    return 0
+
+def command_dashboard(args):
+    """
+    Prepares and exports dashboard data and refreshes the pre-aggregated cube.
+    """
+    import dashboard_setup  # Dashboard stage
+
+    transformed_data = _read_frame(args.input)
+    dashboard_data = dashboard_setup.prepare_dashboard_data(transformed_data.copy())
+    dashboard_setup.export_dashboard_data(dashboard_data)
+    dashboard_setup.refresh_dashboard_cube(transformed_data)
+    return 0
+
+def command_alerts(args):
+    """
+    Checks alert thresholds on dashboard data, by default the last days of the dashboard export.
+    """
+    import pandas as pd  # For the date window
+    import alerts_automation  # Alerts stage
+    import dashboard_setup  # For reading the partitioned dashboard export
+
+    if args.input:
+        dashboard_data = _read_frame(args.input)
+    else:
+        start_date = pd.Timestamp.today().normalize() - pd.Timedelta(days=args.days)
+        dashboard_data = dashboard_setup.read_dashboard_data(start_date=start_date)
+    alerts_automation.check_thresholds_and_alerts(dashboard_data)
+    return 0
+
+def command_stream_alerts(args):
+    """
+    Runs the streaming alert loop over the IoT directory until interrupted.
+    """
+    import streaming_alerts  # Near-real-time alerts
+
+    streaming_alerts.run_streaming_alerts(data_path=args.data_path or streaming_alerts.IOT_DATA_PATH,
+                                          poll_seconds=args.poll_seconds)
+    return 0
+
+def command_run(args):
+    """
+    Runs the whole pipeline once, resuming from checkpoints unless disabled.
+    """
+    import pipeline_scheduler  # Pipeline graph
+
+    if args.unified:
+        stages = pipeline_scheduler.UNIFIED_PIPELINE_STAGES
+    elif args.incremental:
+        stages = pipeline_scheduler.INCREMENTAL_PIPELINE_STAGES
+    else:
+        stages = pipeline_scheduler.PIPELINE_STAGES
+    if args.no_checkpoints:
+        results = pipeline_scheduler.run_pipeline(stages)
+    else:
+        results = pipeline_scheduler.run_resumable_pipeline(stages, run_id=args.run_id, max_retries=args.retries)
+    return 0 if set(results) == set(stages) else 1
+
+def command_schedule(args):
+    """
+    Starts the daily scheduler; runs until interrupted.
+    """
+    import pipeline_scheduler  # Pipeline graph and scheduler
+
+    pipeline_scheduler.schedule_pipeline(incremental=args.incremental, unified=args.unified)
+    return 0
+
+def command_shard(args):
+    """
+    Runs the pipeline sharded by warehouse across local worker processes and remote workers.
+    """
+    import shard_coordinator  # Shard queue and workers
+
+    _, summary = shard_coordinator.run_sharded_pipeline(
+        workers=shard_coordinator.SHARD_WORKERS if args.workers is None else args.workers,
+        shard_count=args.shards or shard_coordinator.SHARD_COUNT, run_id=args.run_id,
+        queue_path=args.queue or shard_coordinator.SHARD_QUEUE_PATH,
+        results_path=args.results or shard_coordinator.SHARD_RESULTS_PATH,
+        load=not args.no_load, unified=args.unified)
+    print(summary)
+    return 0 if summary["counts"] and set(summary["counts"]) == {"done"} else 1
+
+def command_shard_worker(args):
+    """
+    Joins a sharded run as a worker, e.g. on another node sharing the queue and results directory.
+    """
+    import shard_coordinator  # Shard queue and workers
+
+    shard_coordinator.run_worker(args.run_id, queue_path=args.queue or shard_coordinator.SHARD_QUEUE_PATH,
+                                 results_path=args.results or shard_coordinator.SHARD_RESULTS_PATH,
+                                 load=not args.no_load, unified=args.unified)
+    return 0
+
+def command_benchmark(args):
+    """
+    Benchmarks the stages and compares the results with the stored baseline.
+    """
+    import benchmark_suite  # Stage benchmarks
+
+    sizes = [int(float(size)) for size in args.sizes] if args.sizes else benchmark_suite.BENCHMARK_SIZES
+    results = benchmark_suite.run_benchmarks(sizes=sizes, repeats=args.repeats)
+    print(results[["stage", "size", "seconds", "rows_per_second", "peak_bytes"]])
+
+    baseline = None if args.save_baseline else benchmark_suite.load_baseline()
+    if baseline is None:
+        benchmark_suite.save_baseline(results)
+        return 0
+    return 1 if benchmark_suite.compare_to_baseline(results, baseline)["regression"].any() else 0
+
+def measure_startup(commands=None, repeats=CLI_STARTUP_REPEATS):
+    """
+    Measures the cold-start time of commands, each in fresh interpreters.
+
+    A cold start is the time from launching the interpreter until the command's modules are
+    imported and it is ready to run, i.e. everything before the command does real work.
+
+    Args:
+        commands (list, optional): Commands to measure. Defaults to every command.
+        repeats (int): Launches per command; the fastest is reported.
+
+    Returns:
+        dict: Mapping of command name to cold-start seconds; "--help" is the CLI alone.
+    """
+    commands = list(COMMAND_MODULES) if commands is None else commands
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = {}
+    for command in ["--help"] + commands:
+        modules = [] if command == "--help" else COMMAND_MODULES[command]
+        code = "import warehouse_pipeline, importlib; " + "".join(f"importlib.import_module({name!r}); " for name in modules)
+        best = None
+        for _ in range(repeats):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=script_dir, check=True)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[command] = best
+    return timings
+
+def command_startup(args):
+    """
+    Reports the cold-start time of every command and fails if any exceeds the budget.
+    """
+    unknown = [command for command in args.commands if command not in COMMAND_MODULES]
+    if unknown:
+        print(f"Unknown commands: {unknown}; expected any of {list(COMMAND_MODULES)}")
+        return 2
+    timings = measure_startup(args.commands or None, repeats=args.repeats)
+    over_budget = [command for command, seconds in timings.items() if seconds > args.budget]
+    for command, seconds in timings.items():
+        print(f"{command:<15} {seconds:.3f} s{'  over budget' if command in over_budget else ''}")
+    print(f"Budget: {args.budget:.2f} s per command")
+    return 1 if over_budget else 0
+
+def build_parser():
+    """
+    Builds the argument parser with one subcommand per stage.
+
+    Returns:
+        argparse.ArgumentParser: Parser of the warehouse-pipeline command.
+    """
+    parser = argparse.ArgumentParser(prog="warehouse-pipeline", description="Warehouse analytics pipeline.")
+    parser.add_argument("--log-file", help="Performance log file (default: performance_monitoring.LOG_FILE).")
+    parser.add_argument("--metrics-jsonl", help="Append finished stage spans to this JSON-lines file.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    extract = commands.add_parser("extract", help="Extract raw data from the sources.")
+    extract.add_argument("--source", action="append", choices=["sql_server", "oracle", "iot", "flat_files"],
+                         help="Source to extract; repeat for several (default: all).")
+    extract.add_argument("--output", help="CSV or Parquet output file (default: print a preview).")
+    extract.set_defaults(handler=command_extract)
+
+    transform = commands.add_parser("transform", help="Clean and aggregate raw data.")
+    transform.add_argument("--input", nargs="+", required=True, help="Raw CSV or Parquet files.")
+    transform.add_argument("--output", help="CSV or Parquet output file (default: print a preview).")
+    transform.add_argument("--engine", choices=["pandas", "duckdb"], default="pandas")
+    transform.add_argument("--partitions", type=int, help="Warehouse partitions aggregated in parallel (pandas).")
+    transform.add_argument("--memory-limit", help="Memory limit of the duckdb engine, e.g. 4GB.")
+    transform.set_defaults(handler=command_transform)
+
+    load = commands.add_parser("load", help="Upsert transformed data into Snowflake.")
+    load.add_argument("--input", nargs="+", required=True, help="Transformed CSV or Parquet files.")
+    load.add_argument("--table", help="Target table (default: data_loading.WAREHOUSE_TABLE_NAME).")
+    load.set_defaults(handler=command_load)
+
+    kpis = commands.add_parser("kpis", help="Calculate KPIs on transformed data.")
+    kpis.add_argument("--input", nargs="+", required=True, help="Transformed CSV or Parquet files.")
+    kpis.add_argument("--output", help="CSV or Parquet output file (default: print a preview).")
+    kpis.set_defaults(handler=command_kpis)
+
+    dashboard = commands.add_parser("dashboard", help="Export dashboard data and refresh the cube.")
+    dashboard.add_argument("--input", nargs="+", required=True, help="Transformed CSV or Parquet files.")
+    dashboard.set_defaults(handler=command_dashboard)
+
+    alerts = commands.add_parser("alerts", help="Check alert thresholds.")
+    alerts.add_argument("--input", nargs="+", help="Dashboard CSV or Parquet files (default: the dashboard export).")
+    alerts.add_argument("--days", type=int, default=7, help="Days of the dashboard export to check.")
+    alerts.set_defaults(handler=command_alerts)
+
+    stream_alerts = commands.add_parser("stream-alerts", help="Run near-real-time alerts on incoming IoT files.")
+    stream_alerts.add_argument("--data-path", help="Directory of incoming sensor files.")
+    stream_alerts.add_argument("--poll-seconds", type=float, default=5.0)
+    stream_alerts.set_defaults(handler=command_stream_alerts)
+
+    run = commands.add_parser("run", help="Run the whole pipeline once.")
+    run_mode = run.add_mutually_exclusive_group()
+    run_mode.add_argument("--incremental", action="store_true", help="Process only data changed since the last run.")
+    run_mode.add_argument("--unified", action="store_true", help="Join the sources into a dense fact table.")
+    run.add_argument("--run-id", help="Run identifier; re-running an ID resumes it (default: today).")
+    run.add_argument("--retries", type=int, default=0, help="Retries of a run with failed stages.")
+    run.add_argument("--no-checkpoints", action="store_true", help="Run every stage without checkpoints.")
+    run.set_defaults(handler=command_run)
+
+    schedule = commands.add_parser("schedule", help="Run the pipeline daily at 02:00.")
+    schedule_mode = schedule.add_mutually_exclusive_group()
+    schedule_mode.add_argument("--incremental", action="store_true", help="Process only data changed since the last run.")
+    schedule_mode.add_argument("--unified", action="store_true", help="Join the sources into a dense fact table.")
+    schedule.set_defaults(handler=command_schedule)
+
+    shard = commands.add_parser("shard", help="Run the pipeline sharded by warehouse across workers.")
+    shard.add_argument("--workers", type=int, help="Local worker processes (default: shard_coordinator.SHARD_WORKERS); "
+                                                   "0 waits for remote workers.")
+    shard.add_argument("--shards", type=int, help="Number of warehouse ranges (default: shard_coordinator.SHARD_COUNT).")
+    shard.add_argument("--run-id", help="Run identifier; re-running an ID resumes its unfinished shards.")
+    shard_worker = commands.add_parser("shard-worker", help="Work on the shards of a sharded run.")
+    shard_worker.add_argument("--run-id", required=True, help="Run identifier given to the coordinator.")
+    for sharded in [shard, shard_worker]:
+        sharded.add_argument("--queue", help="Shard queue database on shared storage "
+                                             "(default: shard_coordinator.SHARD_QUEUE_PATH).")
+        sharded.add_argument("--results", help="Shard output directory on shared storage "
+                                               "(default: shard_coordinator.SHARD_RESULTS_PATH).")
+        sharded.add_argument("--unified", action="store_true", help="Join the sources into a dense fact table.")
+        sharded.add_argument("--no-load", action="store_true", help="Skip loading the shards into Snowflake.")
+    shard.set_defaults(handler=command_shard)
+    shard_worker.set_defaults(handler=command_shard_worker)
+
+    benchmark = commands.add_parser("benchmark", help="Benchmark the stages against the stored baseline.")
+    benchmark.add_argument("--sizes", nargs="+", help="Raw row counts, e.g. 1e4 1e5.")
+    benchmark.add_argument("--repeats", type=int, default=3)
+    benchmark.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    benchmark.set_defaults(handler=command_benchmark)
+
+    startup = commands.add_parser("startup", help="Measure the cold-start time of every command.")
+    startup.add_argument("commands", nargs="*", metavar="command", help="Commands to measure (default: all).")
+    startup.add_argument("--budget", type=float, default=CLI_STARTUP_BUDGET_SECONDS)
+    startup.add_argument("--repeats", type=int, default=CLI_STARTUP_REPEATS)
+    startup.set_defaults(handler=command_startup)
+    return parser
+
+def main(argv=None):
+    """
+    Parses the command line, configures logging and runs the selected command.
+
+    Args:
+        argv (list, optional): Arguments without the program name. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit status.
+    """
+    args = build_parser().parse_args(argv)
+
+    import performance_monitoring  # For logging and stage spans, configured only when a command runs
+    performance_monitoring.configure_logging(args.log_file or performance_monitoring.LOG_FILE)
+    if args.metrics_jsonl:
+        performance_monitoring.configure_metrics(args.metrics_jsonl)
+
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        print("Interrupted.")
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())